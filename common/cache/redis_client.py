@@ -1,12 +1,13 @@
 """
 模块: common.cache.redis_client
-职责: 提供 Redis 同步/异步客户端工厂（此处用同步，题目缓存可选异步）。
+职责: 提供 Redis 同步/异步客户端工厂（Worker 用同步；API 的状态推送等需在事件循环内使用异步）。
 输入: settings 中的 Redis 配置。
-输出: get_redis_client() 返回已配置的 Redis 客户端。
+输出: get_redis_client() 返回已配置的 Redis 客户端；get_async_redis_client() 返回进程级共享的异步客户端。
 """
 
 from typing import Optional
 import redis
+import redis.asyncio as aioredis
 
 from common.config.settings import settings
 
@@ -33,3 +34,18 @@ def get_redis_client(db: Optional[int] = None) -> redis.Redis:
     """
     url = build_redis_url(db)
     return redis.from_url(url, decode_responses=True)
+
+
+_async_client: aioredis.Redis | None = None
+
+
+def get_async_redis_client() -> aioredis.Redis:
+    """返回进程级共享的异步 Redis 客户端（默认 db）。
+    输入: 无。
+    输出: redis.asyncio.Redis 客户端。
+    作用: 所有请求复用同一连接池，避免每次请求新建连接。
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.from_url(build_redis_url(), decode_responses=True)
+    return _async_client
@@ -35,6 +35,9 @@ class Settings(BaseSettings):
     postgresPassword: str = Field(default="keshang_password")
     postgresPoolMin: int = Field(default=1)
     postgresPoolMax: int = Field(default=10)
+    postgresPoolTimeout: float = Field(default=30.0)  # 连接池耗尽时获取连接的最长等待秒数
+    postgresReplicaHosts: str = Field(default="")  # 只读副本，逗号分隔的 host[:port]；为空时读请求走主库
+    postgresStickySeconds: float = Field(default=5.0)  # 写后读粘滞期：客户端提交写入后该时长内的读请求走主库
 
     # Redis
     redisHost: str = Field(default="redis")
@@ -54,11 +57,71 @@ class Settings(BaseSettings):
     celeryResultBackend: str = Field(default="redis://redis:6379/1")
     celeryTaskSoftTimeLimit: int = Field(default=60)
     celeryTaskTimeLimit: int = Field(default=120)
+    celeryAcksLate: bool = Field(default=True)  # 任务完成后再确认；幂等的阶段任务在 Worker 异常退出时重新入队
+    celeryMaxRedeliveries: int = Field(default=2)  # Worker 失联导致的重投次数上限，超过后文档标记 failed 不再执行
+    celeryWorkerQueue: str | None = Field(default=None)  # 本 Worker 进程池消费的文档队列，决定其并发/预取/时限配置
+    celerySmallPrefetch: int = Field(default=4)
+    celerySmallConcurrency: int = Field(default=8)
+    celeryLargePrefetch: int = Field(default=1)  # 大文档队列每次只预取一个任务，避免长任务囤积
+    celeryLargeConcurrency: int = Field(default=2)
+    celeryLargeSoftTimeLimit: int = Field(default=1800)
+    celeryLargeTimeLimit: int = Field(default=2100)
+    docLargePdfBytes: int = Field(default=10 * 1024 * 1024)  # 达到该大小的 PDF 路由到大文档队列
+    docLargeSlidesBytes: int = Field(default=50 * 1024 * 1024)  # 演示文稿体积主要来自媒体，阈值更高
+
+    # 文档解析
+    docParseParallelMinPages: int = Field(default=80)  # 页数达到该值时按页区间扇出并行解析
+    docParseChunkPages: int = Field(default=40)  # 每个并行子任务解析的页数
+    docParseMaxChunks: int = Field(default=8)  # 并行解析的页区间数上限，超过时放大每个区间的页数
+    docParseMaxFetchBytes: int = Field(default=2 * 1024 * 1024 * 1024)  # 各子任务累计下载量上限（每个子任务各下载一次完整对象）
+    docSpillThresholdBytes: int = Field(default=64 * 1024 * 1024)  # 超过该大小的对象溢写到临时文件，否则在内存中解析
+    docSpillDir: str | None = Field(default=None)  # 溢写目录，默认系统临时目录
+    docProgressEveryPages: int = Field(default=10)  # 解析阶段每处理该页数更新一次 Redis 进度
+    docProgressTtlSeconds: int = Field(default=24 * 3600)  # 状态缓存与进度键的过期时间
+    docStatusHeartbeatSeconds: int = Field(default=15)  # 状态流无事件时的 SSE 心跳间隔
+    docStatusStreamMaxSeconds: int = Field(default=3600)  # 单个状态流的最长存活时间，超过后结束（客户端可重连）
+    docBatchMaxFiles: int = Field(default=200)  # 单次批量上传（含 zip 展开后）最多接收的课件数
+    docBatchMaxFileBytes: int = Field(default=512 * 1024 * 1024)  # 批量上传中单个课件（普通文件或 zip 条目解压后）的大小上限
+    docArtifactsEnabled: bool = Field(default=True)  # 持久化逐页文本产物，重新处理时跳过下载与解析
+    docRevisionWeightTolerance: float = Field(default=0.05)  # 修订时未触及改动页的关系，PMI 变化不超过该值则不重写
+    reindexBatchSize: int = Field(default=200)  # 重建索引每个键集分页的文档数（也是检查点粒度）
+    reindexWorkers: int = Field(default=4)  # 本地进程池模式的进程数
+
+    # 概念识别
+    conceptLexiconPath: str | None = Field(default=None)  # 学科词典文件，每行一个词
+    conceptMatcherRebuildThreshold: int = Field(default=5000)  # 增量词数达到该值时合并重建自动机
+    conceptVocabularyRefreshSeconds: int = Field(default=3600)  # 从 Neo4j 增量刷新词表的周期
+    conceptMinDocuments: int = Field(default=2)  # Neo4j 概念进入匹配词表所需的最少提及文档数（词典词不受限）
+    nerMaxEntities: int = Field(default=10_000)  # 单篇文档保留的概念数上限（入选概念全部参与共现打分）
+    nerMaxRelations: int = Field(default=20_000)  # 单篇文档保留的关系数上限（按 PMI 取前若干）
+    termDiscoveryMaxChars: int = Field(default=200_000)  # 参与新词发现的中文字符上限（后缀自动机耗时与内存随之线性增长），0 表示关闭
 
     # Neo4j
     neo4jUri: str = Field(default="bolt://neo4j:7687")
     neo4jUser: str = Field(default="neo4j")
     neo4jPassword: str = Field(default="neo4j_password")
+    neo4jMaxPoolSize: int = Field(default=50)
+    neo4jConnectionAcquisitionTimeout: float = Field(default=30.0)
+    neo4jMaxConnectionLifetime: float = Field(default=3600.0)  # 连接最长存活秒数，超时后在归还时关闭重建
+    neo4jLivenessCheckTimeout: float | None = Field(default=60.0)  # 空闲超过该秒数的连接取出前先做存活检测，None 关闭
+    neo4jWriteBatchSize: int = Field(default=1000)  # UNWIND 单批行数
+
+    # 图谱写后入库（write-behind）
+    graphWriteBehind: bool = Field(default=True)  # True 时 Worker 仅投递到 Redis 队列，由 graph_sink 统一入图
+    graphIngestShards: int = Field(default=1)  # 按概念名哈希分片，每分片一个消费者
+    graphIngestBatchSize: int = Field(default=200)  # 每次合并的最大载荷条数
+    graphIngestPollTimeout: int = Field(default=1)  # 阻塞等待新载荷的秒数
+    graphIngestMaxAttempts: int = Field(default=5)  # 同一批次连续写入失败该次数后移入死信队列
+
+    # 任务发件箱（transactional outbox）
+    outboxBatchSize: int = Field(default=100)  # 中继每轮投递的最大任务数
+    outboxPollSeconds: float = Field(default=0.5)  # 发件箱为空时的轮询间隔
+    outboxMaxAttempts: int = Field(default=10)  # 单条任务投递失败（非 Broker 连接错误）达到该次数后移入死信
+    # Worker 已完成投递标记的保留时间（重复投递去重窗口）。须明显长于所有可能的重复投递间隔：
+    # 中继投递后提交前崩溃的重投（秒级）、acks_late 下 Worker 失联后 RabbitMQ 的重投（最长为任务时限
+    # celeryLargeTimeLimit 加 RabbitMQ consumer_timeout，默认 30 分钟）以及运维 --requeue-dead 补投；
+    # 过期后同一 task_id 会被再次执行。
+    outboxDedupTtlSeconds: int = Field(default=24 * 3600)
 
     # MinIO (模拟 COS)
     minioEndpoint: str = Field(default="minio:9000")
@@ -66,6 +129,12 @@ class Settings(BaseSettings):
     minioSecretKey: str = Field(default="minioadmin")
     minioSecure: bool = Field(default=False)
     minioBucket: str = Field(default="keshang-documents")
+    minioPartSize: int = Field(default=10 * 1024 * 1024)  # multipart 分片大小，最小 5MiB
+    minioPublicEndpoint: str | None = Field(default=None)  # 预签名 URL 对外可达的端点，默认同 minioEndpoint
+    minioRegion: str = Field(default="us-east-1")
+    minioPresignExpireSeconds: int = Field(default=3600)
+    uploadStaleGraceSeconds: int = Field(default=3600)  # 预签名过期后再等待该时长，仍未完成的直传记录标记为 failed
+    uploadSweepSeconds: int = Field(default=300)  # 直传超时清理的轮询间隔
 
     # 服务端口
     authServicePort: int = Field(default=8001)
@@ -0,0 +1,34 @@
+"""
+模块: common.db.migrate
+职责: 一次性建表与增量升级步骤：在服务进程启动之前对主库执行 Base.metadata.create_all，
+      随后按顺序执行各服务声明的幂等升级语句。
+输入: 已导入各服务 ORM 模型的 Base.metadata；各服务的升级语句；settings 中的数据库配置。
+输出: create_schema, run_create_schema。
+说明: create_all 只创建缺失的表与索引，不修改已有表结构；已有表新增的列与索引由服务 migrate 模块以
+      ADD COLUMN IF NOT EXISTS / CREATE INDEX IF NOT EXISTS 语句补齐，可重复执行。
+"""
+
+import asyncio
+from typing import Sequence
+
+from sqlalchemy import text
+
+from common.db.base import Base
+from common.db.postgres import get_async_engine
+
+
+async def create_schema(upgrade_steps: Sequence[str] = ()) -> None:
+    """使用独立引擎建表、执行升级语句并释放连接池（同一事务内完成，任一步失败整体回滚）。"""
+    engine = get_async_engine()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            for statement in upgrade_steps:
+                await conn.execute(text(statement))
+    finally:
+        await engine.dispose()
+
+
+def run_create_schema(upgrade_steps: Sequence[str] = ()) -> None:
+    """命令行入口：同步执行 create_schema。"""
+    asyncio.run(create_schema(upgrade_steps))
@@ -1,41 +1,118 @@
 """
 模块: common.db.postgres
-职责: 提供 PostgreSQL 的异步连接引擎与会话工厂。
+职责: 提供 PostgreSQL 的异步连接引擎与会话工厂；API 进程内共享随应用生命周期创建与释放的主库引擎与只读副本引擎，
+      路由显式选择读写会话（async_session）或只读会话（async_read_session）。
 输入: 读取 settings 中的数据库配置。
-输出: get_async_engine, get_session_maker, async_session 供服务使用。
+输出: get_async_engine, get_session_maker, init_engine, dispose_engine, db_lifespan,
+      async_session, async_read_session, primary_session, is_replica_session, pool_metrics 供服务使用。
 """
 
-from typing import AsyncGenerator
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Iterator, List
 
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from common.config.settings import settings
 
 
-def build_database_url() -> str:
+class _PoolWaitStats:
+    """连接获取耗时统计（进程内累计）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.acquired += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.acquired + self.timeouts
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "waitSecondsTotal": round(self.wait_seconds_total, 6),
+                "waitSecondsAvg": round(self.wait_seconds_total / attempts, 6) if attempts else 0.0,
+                "waitSecondsMax": round(self.wait_seconds_max, 6),
+            }
+
+
+_pool_wait_stats = _PoolWaitStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """记录每次从池中获取连接耗时（含排队等待与新建连接）的连接池。"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            _pool_wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        _pool_wait_stats.record(time.perf_counter() - start, timed_out=False)
+        return connection
+
+
+# 读写会话提交后写入的 Cookie（提交时间戳），粘滞期内同一客户端的只读会话改走主库，保证读己之写
+DB_WRITE_COOKIE = "db_last_write"
+
+
+def build_database_url(host: str | None = None, port: int | None = None) -> str:
     """构建异步数据库连接 URL。
-    输入: 无，使用全局 settings。
+    输入: 可选主机与端口（只读副本使用），默认主库。
     输出: str 形式的数据库连接串。
-    作用: 统一拼接数据库连接参数。
+    作用: 统一拼接数据库连接参数；副本与主库共用库名与凭据。
     """
     return (
         f"postgresql+asyncpg://{settings.postgresUser}:{settings.postgresPassword}"
-        f"@{settings.postgresHost}:{settings.postgresPort}/{settings.postgresDb}"
+        f"@{host or settings.postgresHost}:{port or settings.postgresPort}/{settings.postgresDb}"
     )
 
 
-def get_async_engine() -> AsyncEngine:
-    """创建并返回异步引擎实例。
-    输入: 无。
+def replica_database_urls() -> List[str]:
+    """解析 postgresReplicaHosts（逗号分隔的 host[:port]）为副本连接 URL 列表。"""
+    urls = []
+    for item in settings.postgresReplicaHosts.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        urls.append(build_database_url(host, int(port) if port else None))
+    return urls
+
+
+def get_async_engine(database_url: str | None = None) -> AsyncEngine:
+    """创建并返回新的异步引擎实例（带独立连接池）。
+    输入: 可选连接 URL，默认主库。
     输出: AsyncEngine 实例。
-    作用: 供应用启动或模块按需获取数据库引擎。
+    作用: 引擎工厂；API 进程应使用 init_engine 创建的共享引擎，Worker 进程由 worker_db 各自创建一个。
+          池大小取 postgresPoolMin，溢出上限取 postgresPoolMax。
     """
-    database_url = build_database_url()
+    database_url = database_url or build_database_url()
     engine = create_async_engine(
         database_url,
+        poolclass=InstrumentedQueuePool,
         pool_size=settings.postgresPoolMin,
         max_overflow=max(0, settings.postgresPoolMax - settings.postgresPoolMin),
+        pool_timeout=settings.postgresPoolTimeout,
         pool_pre_ping=True,
         future=True,
         echo=False,
@@ -52,13 +129,132 @@ def get_session_maker(engine: AsyncEngine) -> sessionmaker[AsyncSession]:
     return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
-async def async_session() -> AsyncGenerator[AsyncSession, None]:
-    """FastAPI 依赖：提供一个作用域内的异步会话。
+_engine: AsyncEngine | None = None
+_session_maker: sessionmaker[AsyncSession] | None = None
+_replica_engines: List[AsyncEngine] = []
+_replica_session_makers: Iterator[sessionmaker[AsyncSession]] | None = None
+
+
+def init_engine() -> AsyncEngine:
+    """创建（或返回已创建的）进程级共享主库引擎、副本引擎与会话工厂。
+    输入: 无。
+    输出: 主库 AsyncEngine。
+    作用: 在应用 lifespan 启动阶段调用；未经 lifespan 启动时（脚本等）由会话依赖懒初始化。
+    """
+    global _engine, _session_maker, _replica_engines, _replica_session_makers
+    if _engine is None:
+        _engine = get_async_engine()
+        _session_maker = get_session_maker(_engine)
+        _replica_engines = [get_async_engine(url) for url in replica_database_urls()]
+        if _replica_engines:
+            _replica_session_makers = itertools.cycle([get_session_maker(engine) for engine in _replica_engines])
+    return _engine
+
+
+async def dispose_engine() -> None:
+    """释放主库与副本引擎的连接池（应用关闭时调用）。"""
+    global _engine, _session_maker, _replica_engines, _replica_session_makers
+    for engine in [_engine, *_replica_engines]:
+        if engine is not None:
+            await engine.dispose()
+    _engine, _session_maker, _replica_engines, _replica_session_makers = None, None, [], None
+
+
+@asynccontextmanager
+async def db_lifespan() -> AsyncIterator[AsyncEngine]:
+    """应用生命周期内的共享引擎：进入时创建，退出时释放。
     输入: 无。
+    输出: 主库 AsyncEngine（供启动阶段的初始化逻辑使用）。
+    作用: 在各服务的 FastAPI lifespan 中使用。
+    """
+    engine = init_engine()
+    try:
+        yield engine
+    finally:
+        await dispose_engine()
+
+
+async def async_session(response: Response) -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依赖：提供一个作用域内的读写会话（主库）。
+    输入: 当前响应（由 FastAPI 注入）。
+    输出: AsyncSession 异步生成器。
+    作用: 在请求生命周期内提供事务性数据库访问；配置副本时，每次提交都会写入 DB_WRITE_COOKIE，
+          使该客户端随后的只读请求在 postgresStickySeconds 内走主库。
+    """
+    init_engine()
+    async with _session_maker() as session:
+        if _replica_engines:
+            @event.listens_for(session.sync_session, "after_commit")
+            def _mark_write(_session) -> None:
+                response.set_cookie(
+                    DB_WRITE_COOKIE,
+                    str(time.time()),
+                    max_age=max(1, int(settings.postgresStickySeconds)),
+                    httponly=True,
+                    samesite="lax",
+                )
+
+        yield session
+
+
+def _recently_wrote(request: Request) -> bool:
+    try:
+        written_at = float(request.cookies.get(DB_WRITE_COOKIE, "0"))
+    except ValueError:
+        return False
+    return time.time() - written_at < settings.postgresStickySeconds
+
+
+async def async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依赖：提供一个只读会话。
+    输入: 当前请求（由 FastAPI 注入）。
     输出: AsyncSession 异步生成器。
-    作用: 在请求生命周期内提供事务性数据库访问。
+    作用: 在副本间轮询分摊读流量；未配置副本或客户端处于写后粘滞期时使用主库。
+          副本会话 info["replica"] 为 True，路由可在未命中时以 primary_session 回源主库。
     """
-    engine = get_async_engine()
-    SessionLocal = get_session_maker(engine)
-    async with SessionLocal() as session:
+    init_engine()
+    if _replica_session_makers is None or _recently_wrote(request):
+        async with _session_maker() as session:
+            yield session
+        return
+    async with next(_replica_session_makers)() as session:
+        session.info["replica"] = True
         yield session
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """会话是否连接只读副本。"""
+    return bool(session.info.get("replica"))
+
+
+@asynccontextmanager
+async def primary_session() -> AsyncIterator[AsyncSession]:
+    """主库会话上下文：副本读取未命中（可能是复制延迟）时回源使用。"""
+    init_engine()
+    async with _session_maker() as session:
+        yield session
+
+
+def _pool_status(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checkedOut": pool.checkedout(),
+        "checkedIn": pool.checkedin(),
+        # QueuePool 的溢出计数从 -size 起算，未超出池大小时记为 0
+        "overflow": max(0, pool.overflow()),
+        "maxOverflow": max(0, settings.postgresPoolMax - settings.postgresPoolMin),
+    }
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """返回进程级共享引擎连接池的实时指标。
+    输入: 无。
+    输出: 主库池大小、已签出/空闲连接数、当前溢出数，各副本池的同类指标，以及连接获取次数、超时次数与等待耗时统计（全部池合计）。
+    作用: 供服务的指标端点与排障使用；引擎未初始化时池指标为空。
+    """
+    metrics: Dict[str, Any] = {"wait": _pool_wait_stats.snapshot()}
+    if _engine is not None:
+        metrics.update(_pool_status(_engine))
+        metrics["replicas"] = [_pool_status(engine) for engine in _replica_engines]
+    return metrics
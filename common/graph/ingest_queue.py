@@ -0,0 +1,95 @@
+"""
+模块: common.graph.ingest_queue
+职责: 图谱写后入库队列：Worker 投递概念/关系载荷到 Redis 列表，按概念名哈希分片。
+输入: 文档ID、概念名称列表与带权关系三元组。
+输出: publish_graph_payload, supersede_graph_payloads, shard_of, ingest_keys, dead_letter_key, graph_doc_key。
+"""
+
+import json
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+from common.cache.redis_client import get_redis_client
+from common.config.settings import settings
+
+
+GRAPH_INGEST_KEY = "graph:ingest:{shard}"
+GRAPH_INGEST_PROCESSING_KEY = "graph:ingest:{shard}:processing"
+GRAPH_INGEST_DEAD_KEY = "graph:ingest:dead:{shard}"
+# 每篇文档的当前载荷版本（version）与尚未写入的分片载荷数（pending），由 graph_sink 写入成功后递减，归零即确认入图
+GRAPH_DOC_KEY = "graph:doc:{document_id}"
+
+
+def shard_of(name: str, shards: int) -> int:
+    """按概念名的稳定哈希计算分片号。
+    输入: 概念名、分片总数。
+    输出: 分片号 [0, shards)。
+    作用: 同一概念的链接写入始终落在同一消费者；跨分片的关系端点由 write_graph_batch 按全局顺序预先 MERGE。
+    """
+    return zlib.crc32(name.encode("utf-8")) % max(1, shards)
+
+
+def ingest_keys(shard: int) -> Tuple[str, str]:
+    """返回分片的待处理队列键与处理中队列键。"""
+    return GRAPH_INGEST_KEY.format(shard=shard), GRAPH_INGEST_PROCESSING_KEY.format(shard=shard)
+
+
+def dead_letter_key(shard: int) -> str:
+    """返回分片的死信队列键（多次写入失败的批次，需人工排查后重新投递）。"""
+    return GRAPH_INGEST_DEAD_KEY.format(shard=shard)
+
+
+def graph_doc_key(document_id: str) -> str:
+    """返回文档的入图确认状态键。"""
+    return GRAPH_DOC_KEY.format(document_id=document_id)
+
+
+def publish_graph_payload(
+    document_id: str,
+    concepts: Iterable[str],
+    relations: Iterable[Tuple[str, str, float]],
+    version: int = 1,
+) -> int:
+    """将一篇文档的图谱写入拆分到各分片并投递。
+    输入: 文档ID、概念名称迭代器、带权关系 (a, b, weight) 迭代器、文档版本号。
+    输出: 投递的载荷条数（0 表示没有需要入图的内容）。
+    作用: 概念按自身分片；关系按较小端点分片。与载荷同一事务记录版本与待确认条数，
+          全部载荷写入后 graph_sink 才将文档标记为 ready；版本落后的载荷由 graph_sink 丢弃。
+    """
+    shards = max(1, settings.graphIngestShards)
+    payloads: Dict[int, Dict[str, List]] = {}
+
+    def _payload(shard: int) -> Dict[str, List]:
+        return payloads.setdefault(shard, {"doc": document_id, "version": version, "concepts": [], "relations": []})
+
+    for name in dict.fromkeys(concepts):
+        _payload(shard_of(name, shards))["concepts"].append(name)
+    for a, b, weight in relations:
+        low, high = (a, b) if a <= b else (b, a)
+        _payload(shard_of(low, shards))["relations"].append([low, high, weight])
+
+    if not payloads:
+        return 0
+    client = get_redis_client()
+    pipe = client.pipeline()
+    doc_key = graph_doc_key(document_id)
+    pipe.hset(doc_key, mapping={"version": version, "pending": len(payloads)})
+    pipe.expire(doc_key, settings.docProgressTtlSeconds)
+    for shard, payload in payloads.items():
+        pipe.rpush(ingest_keys(shard)[0], json.dumps(payload, ensure_ascii=False))
+    pipe.execute()
+    return len(payloads)
+
+
+def supersede_graph_payloads(document_id: str, version: int) -> None:
+    """将文档的载荷版本提升到 version：队列中尚未写入的旧版本载荷此后由 graph_sink 丢弃。
+    输入: 文档ID、新版本号。
+    输出: None。
+    作用: 修订直接修补图谱前调用，避免旧载荷稍后重新 MERGE 修订已删除的链接。
+    """
+    client = get_redis_client()
+    pipe = client.pipeline()
+    doc_key = graph_doc_key(document_id)
+    pipe.hset(doc_key, mapping={"version": version, "pending": 0})
+    pipe.expire(doc_key, settings.docProgressTtlSeconds)
+    pipe.execute()
@@ -1,23 +1,56 @@
 """
 模块: common.graph.neo4j_client
-职责: 提供 Neo4j 驱动连接工厂与最小查询工具。
+职责: 提供进程级共享的 Neo4j 驱动（带连接池）与最小查询工具；同步驱动供 Worker 等同步代码使用，
+      异步驱动随 API 应用生命周期创建，供 async 路由在事件循环内查询。
 输入: settings 中的 Neo4j 配置。
-输出: get_neo4j_driver, run_query。
+输出: get_neo4j_driver, close_neo4j_driver, run_query（同步）；
+      init_async_neo4j_driver, close_async_neo4j_driver, neo4j_lifespan, run_query_async（异步）。
 """
 
-from typing import Any, Dict, Iterable
-from neo4j import GraphDatabase, Driver
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List
+from neo4j import GraphDatabase, AsyncGraphDatabase, Driver, AsyncDriver, RoutingControl
 
 from common.config.settings import settings
 
 
+_driver: Driver | None = None
+_async_driver: AsyncDriver | None = None
+
+
+def _driver_options() -> Dict[str, Any]:
+    """同步与异步驱动共用的认证与连接池参数。"""
+    return {
+        "auth": (settings.neo4jUser, settings.neo4jPassword),
+        "max_connection_pool_size": settings.neo4jMaxPoolSize,
+        "connection_acquisition_timeout": settings.neo4jConnectionAcquisitionTimeout,
+        "max_connection_lifetime": settings.neo4jMaxConnectionLifetime,
+        "liveness_check_timeout": settings.neo4jLivenessCheckTimeout,
+    }
+
+
 def get_neo4j_driver() -> Driver:
-    """创建 Neo4j 驱动。
+    """获取进程级共享的 Neo4j 驱动。
+    输入: 无。
+    输出: neo4j.Driver 实例（首次调用时创建，之后复用其连接池）。
+    作用: 统一获取图数据库连接，避免每次调用重复握手与泄漏驱动。
+    """
+    global _driver
+    if _driver is None:
+        _driver = GraphDatabase.driver(settings.neo4jUri, **_driver_options())
+    return _driver
+
+
+def close_neo4j_driver() -> None:
+    """关闭进程级驱动并释放连接池。
     输入: 无。
-    输出: neo4j.Driver 实例。
-    作用: 统一获取图数据库连接。
+    输出: None。
+    作用: 供进程退出钩子调用。
     """
-    return GraphDatabase.driver(settings.neo4jUri, auth=(settings.neo4jUser, settings.neo4jPassword))
+    global _driver
+    if _driver is not None:
+        _driver.close()
+        _driver = None
 
 
 def run_query(cypher: str, parameters: Dict[str, Any] | None = None) -> Iterable[Dict[str, Any]]:
@@ -31,3 +64,45 @@ def run_query(cypher: str, parameters: Dict[str, Any] | None = None) -> Iterable
         result = session.run(cypher, parameters or {})
         for record in result:
             yield dict(record)
+
+
+def init_async_neo4j_driver() -> AsyncDriver:
+    """创建（或返回已创建的）进程级共享异步驱动。
+    输入: 无。
+    输出: neo4j.AsyncDriver 实例。
+    作用: 在应用 lifespan 启动阶段调用；连接在首次查询时按需建立，之后由连接池复用。
+    """
+    global _async_driver
+    if _async_driver is None:
+        _async_driver = AsyncGraphDatabase.driver(settings.neo4jUri, **_driver_options())
+    return _async_driver
+
+
+async def close_async_neo4j_driver() -> None:
+    """关闭进程级异步驱动并释放连接池（应用关闭时调用）。"""
+    global _async_driver
+    if _async_driver is not None:
+        await _async_driver.close()
+        _async_driver = None
+
+
+@asynccontextmanager
+async def neo4j_lifespan() -> AsyncIterator[AsyncDriver]:
+    """应用生命周期内的共享异步驱动：进入时创建，退出时关闭。"""
+    driver = init_async_neo4j_driver()
+    try:
+        yield driver
+    finally:
+        await close_async_neo4j_driver()
+
+
+async def run_query_async(cypher: str, parameters: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+    """在事件循环内执行只读查询。
+    输入: Cypher 字符串与参数。
+    输出: 结果字典列表。
+    作用: 使用共享异步驱动的连接池，以读路由执行（集群下可分摊到从节点），瞬时错误由驱动自动重试；
+          等待网络期间不阻塞事件循环，并发请求可同时在途。
+    """
+    driver = init_async_neo4j_driver()
+    records, _, _ = await driver.execute_query(cypher, parameters or {}, routing_=RoutingControl.READ)
+    return [record.data() for record in records]
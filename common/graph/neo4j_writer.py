@@ -1,55 +1,284 @@
 """
 模块: common.graph.neo4j_writer
-职责: 提供最小的写接口：创建 Document 节点、Concept 节点与简单关系。
-输入: 文档ID、概念名称列表与关系三元组。
+职责: 提供批量写接口：以 UNWIND 参数列表创建 Document/Concept 节点与关系，并保证唯一约束。
+输入: 文档ID、概念名称列表与带权关系三元组。
 输出: 无（写入图数据库）。
 """
 
-from typing import Iterable, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 from neo4j import Driver
 
+from common.config.settings import settings
 from common.graph.neo4j_client import get_neo4j_driver
 
 
+GRAPH_CONSTRAINTS = (
+    "CREATE CONSTRAINT concept_name_unique IF NOT EXISTS FOR (c:Concept) REQUIRE c.name IS UNIQUE",
+    "CREATE CONSTRAINT document_id_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+)
+
+# 概念间关系跨文档共享，权重取各文档 PMI 的最大值（重放同一载荷结果不变）
+_MERGE_WEIGHTED_EDGES = (
+    "MERGE (a)-[r1:RELATED_TO]->(b) "
+    "SET r1.weight = CASE WHEN r1.weight IS NULL OR r1.weight < row.w THEN row.w ELSE r1.weight END "
+    "MERGE (b)-[r2:RELATED_TO]->(a) "
+    "SET r2.weight = CASE WHEN r2.weight IS NULL OR r2.weight < row.w THEN row.w ELSE r2.weight END"
+)
+
+_constraints_ensured = False
+
+
+def ensure_graph_constraints() -> None:
+    """确保 Concept.name 与 Document.id 的唯一约束存在（每进程执行一次）。
+    输入: 无。
+    输出: None。
+    作用: 唯一约束自带索引，MERGE 走索引查找而非标签扫描。
+    """
+    global _constraints_ensured
+    if _constraints_ensured:
+        return
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        for statement in GRAPH_CONSTRAINTS:
+            session.run(statement).consume()
+    _constraints_ensured = True
+
+
+def _batched(rows: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    step = max(1, size)
+    for start in range(0, len(rows), step):
+        yield rows[start:start + step]
+
+
 def ensure_document_and_concepts(document_id: str, concepts: Iterable[str]) -> None:
     """创建 Document 节点与 Concept 节点，并建立 MENTIONED_IN 关系。
     输入: document_id, 概念名称迭代器。
     输出: None。
-    作用: MVP 入图占位，后续可扩展属性与权重。
+    作用: 按 neo4jWriteBatchSize 分批，每批一条 UNWIND 语句、一个事务。
     """
+    ensure_graph_constraints()
+    rows = [{"name": name} for name in dict.fromkeys(concepts)]
     driver: Driver = get_neo4j_driver()
     with driver.session() as session:
-        session.execute_write(_create_doc_and_concepts_tx, document_id, list(concepts))
+        session.execute_write(_merge_document_tx, document_id)
+        for batch in _batched(rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_concepts_tx, document_id, batch)
+
+
+def _merge_document_tx(tx, document_id: str) -> None:
+    tx.run("MERGE (d:Document {id: $doc})", doc=document_id).consume()
 
 
-def _create_doc_and_concepts_tx(tx, document_id: str, concepts: list[str]) -> None:
+def _merge_concepts_tx(tx, document_id: str, rows: List[Dict[str, Any]]) -> None:
     tx.run(
-        "MERGE (d:Document {id: $doc}) RETURN d",
+        "MATCH (d:Document {id: $doc}) "
+        "UNWIND $rows AS row "
+        "MERGE (c:Concept {name: row.name}) "
+        "MERGE (c)-[:MENTIONED_IN]->(d)",
         doc=document_id,
-    )
-    for name in concepts:
-        tx.run(
-            "MERGE (c:Concept {name: $name})",
-            name=name,
-        )
+        rows=rows,
+    ).consume()
+
+
+def create_related_edges(pairs: Iterable[Tuple[str, str, float]]) -> None:
+    """为概念对建立 RELATED_TO 关系（无向，用双向有向边表示）并记录权重。
+    输入: 带权概念对迭代器 (a, b, weight)。
+    输出: None。
+    作用: 按批 UNWIND 写入，替代逐对自动提交。
+    """
+    rows = [{"a": a, "b": b, "w": weight} for a, b, weight in pairs]
+    if not rows:
+        return
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        for batch in _batched(rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_related_tx, batch)
+
+
+def _merge_related_tx(tx, rows: List[Dict[str, Any]]) -> None:
+    tx.run(
+        "UNWIND $rows AS row "
+        "MATCH (a:Concept {name: row.a}) "
+        "MATCH (b:Concept {name: row.b}) "
+        + _MERGE_WEIGHTED_EDGES,
+        rows=rows,
+    ).consume()
+
+
+def write_graph_batch(mentions: Iterable[Tuple[str, str]], edges: Iterable[Tuple[str, str, float]]) -> None:
+    """写入合并后的大批次：MENTIONED_IN (概念, 文档) 与带权 RELATED_TO (a, b, weight)。
+    输入: (概念名, 文档ID) 迭代器、(a, b, weight) 迭代器。
+    输出: None。
+    作用: 先按名称全局排序 MERGE 本批涉及的全部 Concept/Document 节点（含其他分片的关系端点），
+          再以 MATCH 写入链接与关系：各分片消费者创建节点时按同一全局顺序加锁，写关系时不再创建节点；
+          同一对出现多次时取最大权重。
+    """
+    ensure_graph_constraints()
+    mention_pairs = sorted(set(mentions))
+    best: Dict[Tuple[str, str], float] = {}
+    for a, b, weight in edges:
+        if a == b:
+            continue
+        key = (a, b) if a <= b else (b, a)
+        best[key] = max(weight, best.get(key, weight))
+    concept_rows = [
+        {"name": name}
+        for name in sorted({name for name, _ in mention_pairs} | {name for pair in best for name in pair})
+    ]
+    document_rows = [{"doc": doc} for doc in sorted({doc for _, doc in mention_pairs})]
+    mention_rows = [{"name": name, "doc": doc} for name, doc in mention_pairs]
+    edge_rows = [{"a": a, "b": b, "w": best[(a, b)]} for a, b in sorted(best)]
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        for batch in _batched(concept_rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_concept_nodes_tx, batch)
+        for batch in _batched(document_rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_document_nodes_tx, batch)
+        for batch in _batched(mention_rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_mentions_tx, batch)
+        for batch in _batched(edge_rows, settings.neo4jWriteBatchSize):
+            session.execute_write(_merge_related_tx, batch)
+
+
+def _merge_concept_nodes_tx(tx, rows: List[Dict[str, Any]]) -> None:
+    tx.run("UNWIND $rows AS row MERGE (:Concept {name: row.name})", rows=rows).consume()
+
+
+def _merge_document_nodes_tx(tx, rows: List[Dict[str, Any]]) -> None:
+    tx.run("UNWIND $rows AS row MERGE (:Document {id: row.doc})", rows=rows).consume()
+
+
+def _merge_mentions_tx(tx, rows: List[Dict[str, Any]]) -> None:
+    tx.run(
+        "UNWIND $rows AS row "
+        "MATCH (c:Concept {name: row.name}) "
+        "MATCH (d:Document {id: row.doc}) "
+        "MERGE (c)-[:MENTIONED_IN]->(d)",
+        rows=rows,
+    ).consume()
+
+
+def _merge_ordered_edges_tx(tx, rows: List[Dict[str, Any]]) -> None:
+    # 单事务替换/修补子图时端点可能尚未创建，此处以 MERGE 保证存在；row.a <= row.b 保证加锁顺序一致
+    tx.run(
+        "UNWIND $rows AS row "
+        "MERGE (a:Concept {name: row.a}) "
+        "MERGE (b:Concept {name: row.b}) "
+        + _MERGE_WEIGHTED_EDGES,
+        rows=rows,
+    ).consume()
+
+
+def replace_document_graph(document_id: str, concepts: Iterable[str], relations: Iterable[Tuple[str, str, float]]) -> None:
+    """在单个事务内替换文档子图：删除旧 MENTIONED_IN，写入新概念链接与带权关系。
+    输入: 文档ID、概念名称迭代器、带权关系迭代器。
+    输出: None。
+    作用: 重建索引时原子替换，读者不会看到新旧概念混杂的中间状态；
+          RELATED_TO 为跨文档共享的概念边，不随单个文档删除。
+    """
+    ensure_graph_constraints()
+    concept_rows = [{"name": name} for name in dict.fromkeys(concepts)]
+    edge_rows = [{"a": a, "b": b, "w": weight} for a, b, weight in relations if a != b]
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        session.execute_write(_replace_document_graph_tx, document_id, concept_rows, edge_rows)
+
+
+def _replace_document_graph_tx(tx, document_id: str, concept_rows: List[Dict[str, Any]], edge_rows: List[Dict[str, Any]]) -> None:
+    tx.run("MERGE (d:Document {id: $doc})", doc=document_id).consume()
+    tx.run(
+        "MATCH (:Concept)-[m:MENTIONED_IN]->(:Document {id: $doc}) DELETE m",
+        doc=document_id,
+    ).consume()
+    for batch in _batched(concept_rows, settings.neo4jWriteBatchSize):
+        _merge_concepts_tx(tx, document_id, batch)
+    for batch in _batched(edge_rows, settings.neo4jWriteBatchSize):
+        _merge_ordered_edges_tx(tx, batch)
+
+
+def patch_document_graph(
+    document_id: str,
+    added: Iterable[str],
+    removed: Iterable[str],
+    relations: Iterable[Tuple[str, str, float]],
+) -> None:
+    """在单个事务内按差异修补文档子图：删除已移除概念的 MENTIONED_IN，链接新增概念并写入新增/变更的带权关系。
+    输入: 文档ID、新增概念、移除概念、新增或权重变化的关系。
+    输出: None。
+    作用: 修订版只改动少数页时写入量与差异成正比，无需重建整个子图；
+          RELATED_TO 为跨文档共享的概念边，不随单个文档的差异删除。
+    """
+    ensure_graph_constraints()
+    removed_rows = [{"name": name} for name in dict.fromkeys(removed)]
+    concept_rows = [{"name": name} for name in dict.fromkeys(added)]
+    edge_rows = [
+        {"a": min(a, b), "b": max(a, b), "w": weight}
+        for a, b, weight in sorted(relations, key=lambda r: (min(r[0], r[1]), max(r[0], r[1])))
+        if a != b
+    ]
+    if not (removed_rows or concept_rows or edge_rows):
+        return
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        session.execute_write(_patch_document_graph_tx, document_id, removed_rows, concept_rows, edge_rows)
+
+
+def _patch_document_graph_tx(
+    tx,
+    document_id: str,
+    removed_rows: List[Dict[str, Any]],
+    concept_rows: List[Dict[str, Any]],
+    edge_rows: List[Dict[str, Any]],
+) -> None:
+    tx.run("MERGE (d:Document {id: $doc})", doc=document_id).consume()
+    for batch in _batched(removed_rows, settings.neo4jWriteBatchSize):
         tx.run(
-            "MATCH (c:Concept {name: $name}), (d:Document {id: $doc}) MERGE (c)-[:MENTIONED_IN]->(d)",
-            name=name,
+            "UNWIND $rows AS row "
+            "MATCH (:Concept {name: row.name})-[m:MENTIONED_IN]->(:Document {id: $doc}) DELETE m",
+            rows=batch,
             doc=document_id,
-        )
+        ).consume()
+    for batch in _batched(concept_rows, settings.neo4jWriteBatchSize):
+        _merge_concepts_tx(tx, document_id, batch)
+    for batch in _batched(edge_rows, settings.neo4jWriteBatchSize):
+        _merge_ordered_edges_tx(tx, batch)
 
 
-def create_related_edges(pairs: Iterable[Tuple[str, str]]) -> None:
-    """为概念对建立 RELATED_TO 关系（无向，用双向有向边表示）。
-    输入: 概念对迭代器 (a, b)。
+def count_document_mentions(document_id: str) -> int:
+    """返回文档节点现有的 MENTIONED_IN 链接数（只读）。
+    输入: 文档ID。
+    输出: 链接数，文档节点不存在时为 0。
+    作用: 内容去重前与源文档的概念明细数比对，确认源文档图谱已完整写入。
+    """
+    driver: Driver = get_neo4j_driver()
+    with driver.session() as session:
+        return session.execute_read(_count_document_mentions_tx, document_id)
+
+
+def _count_document_mentions_tx(tx, document_id: str) -> int:
+    record = tx.run(
+        "MATCH (:Concept)-[m:MENTIONED_IN]->(:Document {id: $doc}) RETURN count(m) AS linked",
+        doc=document_id,
+    ).single()
+    return record["linked"] if record is not None else 0
+
+
+def clone_document_mentions(source_document_id: str, target_document_id: str) -> None:
+    """将源文档的全部 MENTIONED_IN 链接复制到目标文档节点。
+    输入: 源文档ID、目标文档ID。
     输出: None。
-    作用: 可视化邻接示例。
+    作用: 内容去重命中时复用已有概念节点，单条语句完成，无需重新入图。
     """
     driver: Driver = get_neo4j_driver()
     with driver.session() as session:
-        for a, b in pairs:
-            session.run(
-                "MATCH (a:Concept {name: $a}), (b:Concept {name: $b}) MERGE (a)-[:RELATED_TO]->(b) MERGE (b)-[:RELATED_TO]->(a)",
-                a=a,
-                b=b,
-            )
+        session.execute_write(_clone_document_mentions_tx, source_document_id, target_document_id)
+
+
+def _clone_document_mentions_tx(tx, source_document_id: str, target_document_id: str) -> None:
+    tx.run(
+        "MERGE (t:Document {id: $dst}) "
+        "WITH t MATCH (c:Concept)-[:MENTIONED_IN]->(:Document {id: $src}) "
+        "MERGE (c)-[:MENTIONED_IN]->(t)",
+        src=source_document_id,
+        dst=target_document_id,
+    ).consume()
@@ -1,19 +1,48 @@
 """
 模块: common.mq.celery_app
 职责: 提供 Celery 应用实例与统一配置，供各服务的任务使用。
-输入: settings 中的 Broker/Backend 配置。
-输出: celery_app Celery 实例。
+输入: settings 中的 Broker/Backend 与队列配置。
+输出: celery_app Celery 实例、文档队列名 DOC_QUEUE_SMALL / DOC_QUEUE_LARGE / LEGACY_QUEUE 与各队列的 Worker 配置 QUEUE_PROFILES。
 """
 
+from typing import Any, Dict
+
 from celery import Celery
+from kombu import Queue
+
 from common.config.settings import settings
 
 
+DOC_QUEUE_SMALL = "doc.small"
+DOC_QUEUE_LARGE = "doc.large"
+# 拆分文档队列之前的默认队列：切换期间由小文档 Worker 一并消费（-Q doc.small,celery），
+# 存量消息清空后即可从 Worker 命令中移除
+LEGACY_QUEUE = "celery"
+
+# 各文档队列由独立的 Worker 进程池消费（celery worker -Q <queue>，并设置 celeryWorkerQueue），
+# 预取、并发与时限互不影响，大文档不会阻塞小文档
+QUEUE_PROFILES: Dict[str, Dict[str, Any]] = {
+    DOC_QUEUE_SMALL: {
+        "worker_prefetch_multiplier": settings.celerySmallPrefetch,
+        "worker_concurrency": settings.celerySmallConcurrency,
+        "task_soft_time_limit": settings.celeryTaskSoftTimeLimit,
+        "task_time_limit": settings.celeryTaskTimeLimit,
+    },
+    DOC_QUEUE_LARGE: {
+        "worker_prefetch_multiplier": settings.celeryLargePrefetch,
+        "worker_concurrency": settings.celeryLargeConcurrency,
+        "task_soft_time_limit": settings.celeryLargeSoftTimeLimit,
+        "task_time_limit": settings.celeryLargeTimeLimit,
+    },
+}
+
+
 def create_celery_app() -> Celery:
     """创建并返回 Celery 应用实例。
     输入: 无。
     输出: Celery 实例。
-    作用: 统一 Celery 配置，便于被各微服务导入。
+    作用: 统一 Celery 配置，便于被各微服务导入；未指定队列的任务进入小文档队列。
+          Worker 失联时是否重新入队由各任务按幂等性单独声明（reject_on_worker_lost），默认不重投。
     """
     app = Celery(
         "keshang",
@@ -26,7 +55,13 @@ def create_celery_app() -> Celery:
         task_soft_time_limit=settings.celeryTaskSoftTimeLimit,
         task_time_limit=settings.celeryTaskTimeLimit,
         task_always_eager=False,
+        task_queues=(Queue(DOC_QUEUE_SMALL), Queue(DOC_QUEUE_LARGE), Queue(LEGACY_QUEUE)),
+        task_default_queue=DOC_QUEUE_SMALL,
+        task_acks_late=settings.celeryAcksLate,
     )
+    profile = QUEUE_PROFILES.get(settings.celeryWorkerQueue or "")
+    if profile is not None:
+        app.conf.update(profile)
     return app
 
 
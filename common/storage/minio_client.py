@@ -2,11 +2,19 @@
 模块: common.storage.minio_client
 职责: 提供 MinIO 客户端与基础存储操作（桶创建、文件上传/下载）。
 输入: settings（MinIO 端点与凭证）。
-输出: get_minio_client, ensure_bucket, put_object_from_path, get_object_to_path。
+输出: get_minio_client, ensure_bucket, put_object_from_path, put_object_stream, get_object_to_path,
+      presigned_put_url, stat_object_size, open_object_buffer。
 """
 
+import hashlib
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Iterator, Optional
 from minio import Minio
 from minio.error import S3Error
 
@@ -26,6 +34,22 @@ def get_minio_client() -> Minio:
     return Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=secure)
 
 
+def get_public_minio_client() -> Minio:
+    """创建用于签发预签名 URL 的 MinIO 客户端。
+    输入: 无。
+    输出: Minio 客户端实例（端点为对外可达地址）。
+    作用: 签名包含 Host，必须以客户端实际访问的端点签发；显式 region 避免签名时回源探测。
+    """
+    endpoint = settings.minioPublicEndpoint or settings.minioEndpoint
+    return Minio(
+        endpoint,
+        access_key=settings.minioAccessKey,
+        secret_key=settings.minioSecretKey,
+        secure=settings.minioSecure,
+        region=settings.minioRegion,
+    )
+
+
 def ensure_bucket(client: Minio, bucket_name: Optional[str] = None) -> None:
     """确保桶存在，不存在则创建。
     输入: Minio 客户端，可选桶名（默认从 settings）。
@@ -48,6 +72,66 @@ def put_object_from_path(client: Minio, local_path: Path, object_name: str, buck
     client.fput_object(bucket, object_name, str(local_path))
 
 
+class HashingReader:
+    """带摘要计算的只读流包装器。
+    输入: 任意提供 read(size) 的二进制流。
+    输出: 与原流一致的字节块，同时累计 SHA-256 与字节数。
+    作用: 在分片上传的同一次读取中完成内容摘要，避免二次遍历文件。
+    """
+
+    def __init__(self, raw: BinaryIO) -> None:
+        self._raw = raw
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._raw.read(size)
+        if chunk:
+            self._hasher.update(chunk)
+            self.size += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+@dataclass
+class StreamUploadResult:
+    """流式上传结果。
+    字段:
+    - size: 实际写入的字节数
+    - sha256: 内容 SHA-256 十六进制摘要
+    """
+
+    size: int
+    sha256: str
+
+
+def put_object_stream(
+    client: Minio,
+    stream: BinaryIO,
+    object_name: str,
+    content_type: str = "application/octet-stream",
+    bucket_name: Optional[str] = None,
+) -> StreamUploadResult:
+    """将二进制流以分片方式上传到对象存储，并同步计算内容摘要。
+    输入: Minio 客户端、可读二进制流、对象名、可选内容类型与桶名。
+    输出: StreamUploadResult(size, sha256)。
+    作用: 长度未知时走 multipart 上传，内存占用仅为单个分片大小，与文件大小无关。
+    """
+    bucket = bucket_name or settings.minioBucket
+    reader = HashingReader(stream)
+    client.put_object(
+        bucket,
+        object_name,
+        reader,
+        length=-1,
+        part_size=settings.minioPartSize,
+        content_type=content_type,
+    )
+    return StreamUploadResult(size=reader.size, sha256=reader.hexdigest())
+
+
 def get_object_to_path(client: Minio, object_name: str, local_path: Path, bucket_name: Optional[str] = None) -> None:
     """从对象存储下载文件到本地路径。
     输入: Minio 客户端、对象名、本地路径、可选桶名。
@@ -56,3 +140,120 @@ def get_object_to_path(client: Minio, object_name: str, local_path: Path, bucket
     """
     bucket = bucket_name or settings.minioBucket
     client.fget_object(bucket, object_name, str(local_path))
+
+
+def presigned_put_url(object_name: str, expires_seconds: Optional[int] = None, bucket_name: Optional[str] = None) -> str:
+    """签发对象直传的预签名 PUT URL。
+    输入: 对象名、可选有效期（秒）与桶名。
+    输出: 预签名 URL 字符串。
+    作用: 客户端直接向对象存储上传，字节不经过 API 进程。
+    """
+    bucket = bucket_name or settings.minioBucket
+    expires = timedelta(seconds=expires_seconds or settings.minioPresignExpireSeconds)
+    return get_public_minio_client().presigned_put_object(bucket, object_name, expires=expires)
+
+
+def stat_object_size(client: Minio, object_name: str, bucket_name: Optional[str] = None) -> Optional[int]:
+    """查询对象大小。
+    输入: Minio 客户端、对象名、可选桶名。
+    输出: 字节数；对象不存在时返回 None。
+    作用: 直传完成回调时校验对象是否已落盘且大小一致。
+    """
+    bucket = bucket_name or settings.minioBucket
+    try:
+        stat = client.stat_object(bucket, object_name)
+    except S3Error as exc:
+        if exc.code in ("NoSuchKey", "NoSuchObject", "NotFound"):
+            return None
+        raise
+    return stat.size
+
+
+# 已删除临时文件的可打开路径：文件在创建后立即 unlink，只要描述符未关闭即可经 /proc 按路径独立打开
+_PROC_FD_DIR = Path("/proc/self/fd")
+
+
+@dataclass
+class ObjectBuffer:
+    """对象内容的只读缓冲。
+    字段:
+    - size: 字节数
+    - sha256: 内容 SHA-256 十六进制摘要
+    - data: 内存缓冲（小对象）；溢写到磁盘时为 None
+    - path: 溢写文件的可打开路径（大对象）；内存缓冲时为 None
+    """
+
+    size: int
+    sha256: str
+    data: Optional[bytes] = None
+    path: Optional[Path] = None
+
+    def open(self) -> BinaryIO:
+        """返回一个新的可 seek 只读文件对象，供 python-pptx 等按文件对象读取的库使用。"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return self.path.open("rb")
+
+
+@contextmanager
+def open_object_buffer(
+    client: Minio,
+    object_name: str,
+    spill_threshold: int,
+    spill_dir: Optional[str] = None,
+    bucket_name: Optional[str] = None,
+) -> Iterator[ObjectBuffer]:
+    """流式下载对象到有界内存缓冲，超过阈值时溢写到私有临时文件。
+    输入: Minio 客户端、对象名、溢写阈值（字节）、可选溢写目录与桶名。
+    输出: ObjectBuffer 上下文；退出时关闭并删除临时文件。
+    作用: 替代按对象名落盘的下载方式，避免磁盘泄漏与并发任务间的文件名冲突；下载同时计算摘要。
+          溢写文件创建后立即 unlink，仅由打开的描述符持有，进程被强制终止时由内核回收，不残留在溢写目录；
+          内存缓冲直接写入 BytesIO，getvalue() 返回其内部缓冲，不再另行拼接出第二份副本。
+    """
+    bucket = bucket_name or settings.minioBucket
+    size = stat_object_size(client, object_name, bucket)
+    if size is None:
+        raise FileNotFoundError(object_name)
+
+    hasher = hashlib.sha256()
+    spill_fd: Optional[int] = None
+    spill_path: Optional[Path] = None
+    response = client.get_object(bucket, object_name)
+    try:
+        if size <= spill_threshold:
+            memory = io.BytesIO()
+            for chunk in response.stream(settings.minioPartSize):
+                hasher.update(chunk)
+                memory.write(chunk)
+            buffer = ObjectBuffer(size=size, sha256="", data=memory.getvalue())
+            del memory
+        else:
+            spill_fd, name = tempfile.mkstemp(prefix="keshang-", dir=spill_dir)
+            spill_path = Path(name)
+            if _PROC_FD_DIR.is_dir():
+                spill_path.unlink()
+                spill_path = None
+            for chunk in response.stream(settings.minioPartSize):
+                hasher.update(chunk)
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(spill_fd, view):]
+            buffer = ObjectBuffer(size=size, sha256="", path=spill_path or _PROC_FD_DIR / str(spill_fd))
+    except BaseException:
+        if spill_fd is not None:
+            os.close(spill_fd)
+        if spill_path is not None:
+            spill_path.unlink(missing_ok=True)
+        raise
+    finally:
+        response.close()
+        response.release_conn()
+
+    buffer.sha256 = hasher.hexdigest()
+    try:
+        yield buffer
+    finally:
+        if spill_fd is not None:
+            os.close(spill_fd)
+        if spill_path is not None:
+            spill_path.unlink(missing_ok=True)
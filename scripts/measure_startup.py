@@ -0,0 +1,55 @@
+"""
+脚本: scripts/measure_startup.py
+作用: 以子进程启动某个服务的 uvicorn，轮询 /health，输出从进程启动到首个健康响应的耗时（time-to-first-healthy-request）。
+用法示例:
+    python scripts/measure_startup.py services.document_service.main:app --port 8002 --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def measure_once(app: str, port: int, timeout: float) -> float:
+    """启动一次服务并返回首个健康响应的耗时（秒），结束后终止子进程。"""
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"service exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise TimeoutError(f"no healthy response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="测量服务冷启动到首个健康请求的耗时")
+    parser.add_argument("app", help="uvicorn 应用路径，如 services.document_service.main:app")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    samples = [measure_once(args.app, args.port, args.timeout) for _ in range(args.runs)]
+    for index, seconds in enumerate(samples, 1):
+        print(f"run {index}: {seconds:.3f}s")
+    print(f"median: {statistics.median(samples):.3f}s  min: {min(samples):.3f}s  max: {max(samples):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+模块: services.auth_service.migrate
+职责: auth_service 的一次性建表步骤（部署时先于服务进程运行，服务启动不再建表）。
+输入: 无。
+输出: 无（在主库上创建缺失的表）。
+用法: python -m services.auth_service.migrate
+"""
+
+from common.db.migrate import run_create_schema
+from services.auth_service import models  # 注册 ORM 模型到 Base.metadata
+
+
+if __name__ == "__main__":
+    run_create_schema()
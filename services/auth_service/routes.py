@@ -9,7 +9,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from common.db.postgres import async_session
+from common.db.postgres import async_session, async_read_session, is_replica_session, primary_session
 from common.security.auth import hash_password, verify_password, create_access_token
 from services.auth_service.models import User
 from services.auth_service.schemas import RegisterRequest, LoginRequest, AuthResponse
@@ -38,14 +38,17 @@ async def register(payload: RegisterRequest, session: AsyncSession = Depends(asy
 
 
 @router.post("/login", response_model=AuthResponse)
-async def login(payload: LoginRequest, session: AsyncSession = Depends(async_session)) -> AuthResponse:
+async def login(payload: LoginRequest, session: AsyncSession = Depends(async_read_session)) -> AuthResponse:
     """用户登录并返回访问令牌。
     输入: LoginRequest(email, password)。
     输出: AuthResponse(accessToken)。
-    作用: 校验口令并签发 JWT。
+    作用: 校验口令并签发 JWT；从只读副本查询用户，刚注册的用户在副本上未命中时回源主库。
     """
-    result = await session.execute(select(User).where(User.email == payload.email))
-    user = result.scalar_one_or_none()
+    query = select(User).where(User.email == payload.email)
+    user = (await session.execute(query)).scalar_one_or_none()
+    if user is None and is_replica_session(session):
+        async with primary_session() as primary:
+            user = (await primary.execute(query)).scalar_one_or_none()
     if user is None or not verify_password(payload.password, user.passwordHash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
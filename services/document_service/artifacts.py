@@ -0,0 +1,139 @@
+"""
+模块: services.document_service.artifacts
+职责: 逐页抽取文本的持久化产物：zstd 压缩 JSONL，按文档与解析器版本存放在原文件旁的对象存储中；
+      以及分阶段流水线中抽取阶段的中间结果（zstd 压缩 JSONL：首行实体与关系，其后每行一页记录）。
+输入: 文档ID、逐页文本、抽取结果。
+输出: PARSER_VERSION, artifact_object_name, has_page_artifact, iter_page_artifact, PageArtifactWriter,
+      write_extract_result, read_extract_result。
+"""
+
+import io
+import json
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import zstandard as zstd
+from minio import Minio
+
+from common.config.settings import settings
+from common.storage.minio_client import put_object_stream, stat_object_size
+from services.document_service.pipeline import PageRecord, RecordSpool
+
+
+# 解析器输出发生变化（页切分、文本清洗等）时递增，旧版本产物随之失效
+PARSER_VERSION = "2"
+ARTIFACT_PREFIX = "artifacts/{document_id}/"
+ARTIFACT_NAME = "pages.v{version}.jsonl.zst"
+EXTRACT_NAME = "extract.jsonl.zst"
+ARTIFACT_ZSTD_LEVEL = 3
+
+
+def artifact_object_name(document_id: str, version: str = PARSER_VERSION) -> str:
+    """返回逐页文本产物的对象键名 artifacts/<document_id>/pages.v<version>.jsonl.zst。"""
+    return ARTIFACT_PREFIX.format(document_id=document_id) + ARTIFACT_NAME.format(version=version)
+
+
+def has_page_artifact(client: Minio, document_id: str) -> bool:
+    """当前解析器版本的产物是否存在。"""
+    return stat_object_size(client, artifact_object_name(document_id)) is not None
+
+
+def iter_page_artifact(client: Minio, document_id: str) -> Iterator[str]:
+    """流式解压并逐页产出产物中的文本（保持页序）。
+    输入: Minio 客户端、文档ID。
+    输出: 逐页文本生成器。
+    作用: 后续阶段（抽取、重建索引）直接读取产物，无需重新下载与解析原文件。
+    """
+    response = client.get_object(settings.minioBucket, artifact_object_name(document_id))
+    try:
+        reader = zstd.ZstdDecompressor().stream_reader(response)
+        for line in io.TextIOWrapper(reader, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)["text"]
+    finally:
+        response.close()
+        response.release_conn()
+
+
+class PageArtifactWriter:
+    """逐页文本产物写入器。
+    作用: tee() 在页面流经下游时同步压缩写入有界缓冲（超过阈值溢写磁盘），
+          commit() 上传并清理其他解析器版本的旧产物；未 commit 即关闭时不产生任何对象。
+    """
+
+    def __init__(self, document_id: str) -> None:
+        self.document_id = document_id
+        self.pages = 0
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=settings.docSpillThresholdBytes, dir=settings.docSpillDir)
+        self._writer = zstd.ZstdCompressor(level=ARTIFACT_ZSTD_LEVEL).stream_writer(self._buffer, closefd=False)
+
+    def __enter__(self) -> "PageArtifactWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def tee(self, pages: Iterable[str]) -> Iterator[str]:
+        """逐页写入产物并原样产出。"""
+        for page in pages:
+            record = {"page": self.pages, "text": page}
+            self._writer.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.pages += 1
+            yield page
+
+    def commit(self, client: Minio) -> None:
+        """结束压缩帧、上传产物并删除其他版本的旧产物。"""
+        self._writer.close()
+        self._buffer.seek(0)
+        object_name = artifact_object_name(self.document_id)
+        put_object_stream(client, self._buffer, object_name, content_type="application/zstd")
+        prefix = ARTIFACT_PREFIX.format(document_id=self.document_id) + "pages."
+        for obj in client.list_objects(settings.minioBucket, prefix=prefix):
+            if obj.object_name != object_name:
+                client.remove_object(settings.minioBucket, obj.object_name)
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+def _extract_object_name(document_id: str) -> str:
+    return ARTIFACT_PREFIX.format(document_id=document_id) + EXTRACT_NAME
+
+
+def write_extract_result(
+    client: Minio,
+    document_id: str,
+    entities: List[str],
+    relations: Sequence[Sequence[Any]],
+    pages: Iterable[PageRecord],
+) -> None:
+    """保存抽取阶段结果（实体、关系、逐页记录），供后续入库/入图阶段独立重试时读取。
+    作用: 逐页记录逐行压缩写入有界缓冲（超过阈值溢写磁盘），不在内存中拼出整份结果。
+    """
+    with tempfile.SpooledTemporaryFile(max_size=settings.docSpillThresholdBytes, dir=settings.docSpillDir) as buffer:
+        with zstd.ZstdCompressor(level=ARTIFACT_ZSTD_LEVEL).stream_writer(buffer, closefd=False) as writer:
+            header = {"entities": entities, "relations": [list(rel) for rel in relations]}
+            writer.write((json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8"))
+            for record in pages:
+                writer.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        buffer.seek(0)
+        put_object_stream(client, buffer, _extract_object_name(document_id), content_type="application/zstd")
+
+
+def read_extract_result(client: Minio, document_id: str) -> Dict[str, Any]:
+    """读取抽取阶段结果。
+    输出: {"entities", "relations", "pages"}，pages 为按页序可重复迭代的 RecordSpool。
+    """
+    response = client.get_object(settings.minioBucket, _extract_object_name(document_id))
+    try:
+        reader = zstd.ZstdDecompressor().stream_reader(response)
+        lines = io.TextIOWrapper(reader, encoding="utf-8")
+        result = json.loads(next(lines))
+        pages = RecordSpool()
+        for index, line in enumerate(line for line in lines if line.strip()):
+            pages.put(index, json.loads(line))
+        result["pages"] = pages
+        return result
+    finally:
+        response.close()
+        response.release_conn()
@@ -0,0 +1,174 @@
+"""
+模块: services.document_service.batch
+职责: 批量上传：展开多文件与 zip 压缩包中的课件，逐个流式转存到对象存储。
+输入: 上传文件对象列表（普通课件或 .zip）。
+输出: SUPPORTED_SUFFIXES, StoredFile, BatchStoreResult, store_batch_files, remove_stored_files。
+"""
+
+import io
+import logging
+import mimetypes
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, List, Tuple
+
+from minio import Minio
+
+from common.config.settings import settings
+from common.storage.minio_client import put_object_stream
+
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = (".pdf", ".ppt", ".pptx")
+
+
+@dataclass
+class StoredFile:
+    """已转存的单个课件。
+    字段:
+    - document_id: 预分配的文档ID
+    - file_name: 课件文件名（zip 条目取其基本名）
+    - object_name: 对象存储键名
+    - size / sha256: 实际写入的字节数与内容摘要
+    """
+
+    document_id: str
+    file_name: str
+    object_name: str
+    size: int
+    sha256: str
+
+
+@dataclass
+class BatchStoreResult:
+    """批量转存结果。
+    字段:
+    - stored: 已转存的课件（保持上传顺序）
+    - skipped: 被跳过的文件或条目名（不支持的格式、损坏的压缩包、超出大小或数量上限）
+    """
+
+    stored: List[StoredFile] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+
+def _is_supported(name: str) -> bool:
+    return PurePosixPath(name).suffix.lower() in SUPPORTED_SUFFIXES
+
+
+class _BoundedReader:
+    """最多读取 limit + 1 字节的只读流包装器。
+    作用: 转存量不超过上限加一字节；读到第 limit + 1 字节即说明原流超限（exceeded），调用方删除已写对象并跳过。
+    """
+
+    def __init__(self, raw: BinaryIO, limit: int) -> None:
+        self._raw = raw
+        self._limit = limit
+        self._read = 0
+
+    @property
+    def exceeded(self) -> bool:
+        return self._read > self._limit
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self._limit + 1 - self._read
+        if remaining <= 0:
+            return b""
+        if size < 0 or size > remaining:
+            size = remaining
+        chunk = self._raw.read(size)
+        self._read += len(chunk)
+        return chunk
+
+
+def _declared_size(fh: BinaryIO) -> int | None:
+    """可 seek 的上传文件返回其字节数（读位置不变），否则返回 None。"""
+    try:
+        position = fh.tell()
+        size = fh.seek(0, io.SEEK_END)
+        fh.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return size - position
+
+
+def _iter_zip_entries(fh: BinaryIO, archive_name: str, skipped: List[str]) -> Iterator[Tuple[str, BinaryIO]]:
+    """逐个产出压缩包内受支持的课件条目 (文件名, 解压流)；目录、系统元数据与超限条目记入 skipped。
+    解压流按条目声明的大小截断读取，单个条目的转存量不会超过 docBatchMaxFileBytes。
+    """
+    try:
+        archive = zipfile.ZipFile(fh)
+    except zipfile.BadZipFile:
+        skipped.append(archive_name)
+        return
+    with archive:
+        for info in archive.infolist():
+            name = PurePosixPath(info.filename).name
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or name.startswith("."):
+                continue
+            if not _is_supported(name) or info.file_size > settings.docBatchMaxFileBytes:
+                skipped.append(f"{archive_name}/{info.filename}")
+                continue
+            with archive.open(info) as entry:
+                yield name, entry
+
+
+def _iter_batch_entries(files: List[Tuple[str, BinaryIO]], skipped: List[str]) -> Iterator[Tuple[str, BinaryIO]]:
+    """将上传文件展开为课件条目：.zip 按条目展开，其余按原文件名校验格式（只保留最后一段路径）与大小。"""
+    for file_name, fh in files:
+        suffix = PurePosixPath(file_name).suffix.lower()
+        if suffix == ".zip":
+            yield from _iter_zip_entries(fh, file_name, skipped)
+        elif suffix in SUPPORTED_SUFFIXES:
+            size = _declared_size(fh)
+            if size is not None and size > settings.docBatchMaxFileBytes:
+                skipped.append(file_name)
+                continue
+            yield PurePosixPath(file_name).name, fh
+        else:
+            skipped.append(file_name)
+
+
+def store_batch_files(client: Minio, files: List[Tuple[str, BinaryIO]]) -> BatchStoreResult:
+    """逐个课件分片流式转存到 uploads/<document_id>/<file_name>，同时计算大小与 SHA-256。
+    输入: Minio 客户端、(文件名, 可读文件对象) 列表。
+    输出: BatchStoreResult。
+    作用: 同步阻塞调用，路由中整体放入线程池执行；内存占用与文件大小无关，条目数超过 docBatchMaxFiles 的部分跳过。
+          每个课件经有界读取转存，无法预先得知大小的流超过 docBatchMaxFileBytes 时删除已写对象并跳过。
+          中途失败时删除本批已转存的对象后重新抛出，不留下无记录的对象。
+    """
+    result = BatchStoreResult()
+    try:
+        for file_name, stream in _iter_batch_entries(files, result.skipped):
+            if len(result.stored) >= settings.docBatchMaxFiles:
+                result.skipped.append(file_name)
+                continue
+            document_id = str(uuid.uuid4())
+            object_name = f"uploads/{document_id}/{file_name}"
+            content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            reader = _BoundedReader(stream, settings.docBatchMaxFileBytes)
+            uploaded = put_object_stream(client, reader, object_name, content_type)
+            if reader.exceeded:
+                client.remove_object(settings.minioBucket, object_name)
+                result.skipped.append(file_name)
+                continue
+            result.stored.append(StoredFile(document_id, file_name, object_name, uploaded.size, uploaded.sha256))
+    except Exception:
+        remove_stored_files(client, result.stored)
+        raise
+    return result
+
+
+def remove_stored_files(client: Minio, stored: List[StoredFile]) -> None:
+    """删除已转存的课件对象（批量登记失败时的清理）。
+    输入: Minio 客户端、已转存课件列表。
+    输出: None。
+    作用: 逐个删除，单个删除失败只记录日志，不掩盖调用方正在处理的原始异常。
+    """
+    for item in stored:
+        try:
+            client.remove_object(settings.minioBucket, item.object_name)
+        except Exception:
+            logger.exception("failed to remove orphaned batch object %s", item.object_name)
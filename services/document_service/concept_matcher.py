@@ -0,0 +1,205 @@
+"""
+模块: services.document_service.concept_matcher
+职责: 基于 Aho-Corasick 自动机的词典概念匹配：词表来自学科词典与 Neo4j 中被足够多文档提及的 Concept，
+      在 Worker 主进程 fork 前编译一次，新概念写入增量自动机，超过阈值后合并重建。
+输入: 概念词表、待匹配文本。
+输出: AhoCorasick, ConceptMatcher, get_concept_matcher。
+"""
+
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from common.config.settings import settings
+from common.graph.neo4j_client import run_query
+
+
+MIN_TERM_LENGTH = 2
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机。
+    作用: 单次线性扫描文本即可找出全部词表命中，匹配耗时与词表规模无关。
+    结构: 节点以下标表示；构建时用逐节点字典，构建完成后压缩为 CSR 形式的定长整型数组：
+          节点 i 的子节点位于 child_chars/child_nodes 的 [child_start[i], child_start[i + 1]) 区间（按字符码升序，二分查找），
+          fail 为失配链接，out 为在该节点结束的词长（0 表示无），dict_link 为最近的带输出后缀节点（-1 表示无）。
+          数十万词的词表占用从数百 MB 的字典对象降到数十 MB 的连续数组，fork 后的子进程共享同一份内存页。
+    """
+
+    def __init__(self, terms: Iterable[str] = ()) -> None:
+        goto: List[Dict[int, int]] = [{}]
+        out: List[int] = [0]
+        self.size = 0
+        for term in terms:
+            node = 0
+            for ch in term:
+                code = ord(ch)
+                nxt = goto[node].get(code)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][code] = nxt
+                    goto.append({})
+                    out.append(0)
+                node = nxt
+            if not out[node]:
+                out[node] = len(term)
+                self.size += 1
+        self._compact(goto, out)
+
+    def _compact(self, goto: List[Dict[int, int]], out: List[int]) -> None:
+        count = len(goto)
+        self._child_start = array("i", [0]) * (count + 1)
+        self._child_chars = array("i")
+        self._child_nodes = array("i")
+        for node, children in enumerate(goto):
+            for code in sorted(children):
+                self._child_chars.append(code)
+                self._child_nodes.append(children[code])
+            self._child_start[node + 1] = len(self._child_chars)
+        self._out = array("i", out)
+        self._fail = array("i", [0]) * count
+        self._dict_link = array("i", [-1]) * count
+        # BFS 逐层计算失配链接与输出后缀链接
+        queue: deque[int] = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for code, child in goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and code not in goto[fail]:
+                    fail = self._fail[fail]
+                target = goto[fail].get(code, 0)
+                self._fail[child] = target if target != child else 0
+                link = self._fail[child]
+                self._dict_link[child] = link if self._out[link] else self._dict_link[link]
+
+    def _goto(self, node: int, code: int) -> int:
+        """节点 node 经字符码 code 的转移目标，无转移时返回 -1。"""
+        lo, hi = self._child_start[node], self._child_start[node + 1]
+        index = bisect_left(self._child_chars, code, lo, hi)
+        if index < hi and self._child_chars[index] == code:
+            return self._child_nodes[index]
+        return -1
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """线性扫描文本，产出全部命中区间 (start, end)。"""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        node = 0
+        for index, ch in enumerate(text):
+            code = ord(ch)
+            nxt = goto(node, code)
+            while nxt < 0 and node:
+                node = fail[node]
+                nxt = goto(node, code)
+            node = nxt if nxt >= 0 else 0
+            hit = node if out[node] else dict_link[node]
+            while hit > 0:
+                end = index + 1
+                yield end - out[hit], end
+                hit = dict_link[hit]
+
+
+class ConceptMatcher:
+    """基础自动机 + 增量自动机的概念匹配器。
+    作用: 新概念只重建体量很小的增量自动机；增量词数超过阈值时与基础词表合并重建。
+    """
+
+    def __init__(self, terms: Iterable[str] = (), rebuild_threshold: int = 5000) -> None:
+        self.rebuild_threshold = rebuild_threshold
+        self._base_terms: Set[str] = {t for t in terms if len(t) >= MIN_TERM_LENGTH}
+        self._delta_terms: Set[str] = set()
+        self._base = AhoCorasick(self._base_terms)
+        self._delta = AhoCorasick()
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._base_terms or term in self._delta_terms
+
+    def __len__(self) -> int:
+        return len(self._base_terms) + len(self._delta_terms)
+
+    def add_terms(self, terms: Iterable[str]) -> int:
+        """增量加入新概念。
+        输入: 概念名迭代器。
+        输出: 实际新增的词数。
+        """
+        fresh = {t for t in terms if len(t) >= MIN_TERM_LENGTH and t not in self}
+        if not fresh:
+            return 0
+        self._delta_terms |= fresh
+        if len(self._delta_terms) >= self.rebuild_threshold:
+            self._base_terms |= self._delta_terms
+            self._delta_terms = set()
+            self._base = AhoCorasick(self._base_terms)
+            self._delta = AhoCorasick()
+        else:
+            self._delta = AhoCorasick(self._delta_terms)
+        return len(fresh)
+
+    def find(self, text: str, extra: AhoCorasick | None = None) -> List[Tuple[int, int]]:
+        """返回最左最长、互不重叠的命中区间列表（按起点升序）。
+        输入: 文本、可选附加自动机（如本篇文档新发现的词）。
+        输出: [(start, end)]。
+        作用: “数据结构”命中时不再重复计入其中的“数据”“结构”。
+        """
+        matches = list(self._base.iter_matches(text))
+        if self._delta_terms:
+            matches.extend(self._delta.iter_matches(text))
+        if extra is not None:
+            matches.extend(extra.iter_matches(text))
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected: List[Tuple[int, int]] = []
+        cursor = 0
+        for start, end in matches:
+            if start >= cursor:
+                selected.append((start, end))
+                cursor = end
+        return selected
+
+
+def load_concept_vocabulary() -> Set[str]:
+    """加载概念词表：学科词典文件（每行一个词）+ Neo4j 中被至少 conceptMinDocuments 篇文档提及的 Concept 名称。
+    输入: 无（读取 settings.conceptLexiconPath、settings.conceptMinDocuments）。
+    输出: 概念名集合。
+    作用: 只出现在单篇文档中的抽取结果（多为噪声）不进入词表，词表规模随语料而非文档数增长；
+          图数据库不可用时退化为仅词典，不阻塞文档处理。
+    """
+    terms: Set[str] = set()
+    if settings.conceptLexiconPath:
+        path = Path(settings.conceptLexiconPath)
+        if path.is_file():
+            with path.open(encoding="utf-8") as fh:
+                terms.update(line.strip() for line in fh if line.strip())
+    try:
+        rows = run_query(
+            "MATCH (c:Concept) WHERE COUNT { (c)-[:MENTIONED_IN]->(:Document) } >= $min RETURN c.name AS name",
+            {"min": settings.conceptMinDocuments},
+        )
+        terms.update(row["name"] for row in rows)
+    except Exception:
+        pass
+    return terms
+
+
+_matcher: ConceptMatcher | None = None
+_loaded_at = 0.0
+
+
+def get_concept_matcher() -> ConceptMatcher:
+    """获取进程级概念匹配器（首次调用时编译，按 conceptVocabularyRefreshSeconds 增量刷新）。
+    输入: 无。
+    输出: ConceptMatcher。
+    作用: Worker 主进程在 fork 前调用一次（worker_init），子进程共享已编译的自动机；
+          新写入且达到文档数门槛的概念在刷新周期后可被识别。
+    """
+    global _matcher, _loaded_at
+    now = time.monotonic()
+    if _matcher is None:
+        _matcher = ConceptMatcher(load_concept_vocabulary(), settings.conceptMatcherRebuildThreshold)
+        _loaded_at = now
+    elif now - _loaded_at >= settings.conceptVocabularyRefreshSeconds:
+        _matcher.add_terms(load_concept_vocabulary())
+        _loaded_at = now
+    return _matcher
@@ -0,0 +1,74 @@
+"""
+模块: services.document_service.dedup
+职责: 基于内容 SHA-256 的课件去重：查找已处理的同内容文档并复用其概念/关系与图谱链接。
+输入: AsyncSession、内容哈希、源/目标文档ID。
+输出: find_ready_duplicate, count_document_concepts, clone_document_results, reuse_duplicate
+      （图谱链接复用见 neo4j_writer.clone_document_mentions）。
+"""
+
+from sqlalchemy import select, insert, update, literal, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.document_service.models import Document, DocumentConcept, DocumentRelation, DocumentPage
+
+
+async def find_ready_duplicate(session: AsyncSession, content_hash: str, exclude_id: str | None = None) -> Document | None:
+    """查找同内容且已处理完成的文档。
+    输入: 会话、内容哈希、需排除的文档ID（通常为自身）。
+    输出: Document 或 None。
+    作用: 命中时新文档可直接复用解析结果，跳过 Worker。写后入库时 ready 由 graph_sink 在入图确认后设置，
+          历史数据可能在入图完成前已标记 ready，调用方复用前以 count_document_mentions 的链接数与
+          count_document_concepts 比对，源文档图谱不完整时按新文档处理。
+    """
+    stmt = select(Document).where(Document.contentHash == content_hash, Document.status == "ready")
+    if exclude_id is not None:
+        stmt = stmt.where(Document.id != exclude_id)
+    result = await session.execute(stmt.limit(1))
+    return result.scalar_one_or_none()
+
+
+async def count_document_concepts(session: AsyncSession, document_id: str) -> int:
+    """返回文档的概念明细行数（即其图谱中应有的 MENTIONED_IN 链接数）。"""
+    stmt = select(func.count()).select_from(DocumentConcept).where(DocumentConcept.documentId == document_id)
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def clone_document_results(session: AsyncSession, source_id: str, target_id: str) -> None:
+    """以 INSERT ... SELECT 复制源文档的概念、关系与逐页记录行到目标文档。
+    输入: 会话、源文档ID、目标文档ID。
+    输出: None（由调用方提交事务）。
+    作用: 数据库内一次性复制，不经过应用进程搬运行数据。
+    """
+    concepts = select(literal(target_id), DocumentConcept.conceptName).where(DocumentConcept.documentId == source_id)
+    await session.execute(
+        insert(DocumentConcept).from_select(["documentId", "conceptName"], concepts)
+    )
+    relations = select(
+        literal(target_id), DocumentRelation.sourceConcept, DocumentRelation.targetConcept, DocumentRelation.weight
+    ).where(DocumentRelation.documentId == source_id)
+    await session.execute(
+        insert(DocumentRelation).from_select(["documentId", "sourceConcept", "targetConcept", "weight"], relations)
+    )
+    pages = select(
+        literal(target_id), literal(1), DocumentPage.pageIndex, DocumentPage.fingerprint, DocumentPage.mentions
+    ).where(DocumentPage.documentId == source_id)
+    await session.execute(
+        insert(DocumentPage).from_select(["documentId", "version", "pageIndex", "fingerprint", "mentions"], pages)
+    )
+
+
+async def reuse_duplicate(session: AsyncSession, source: Document, target_id: str) -> None:
+    """将目标文档标记为 ready 并复用源文档的全部解析结果。
+    输入: 会话、已处理完成的源文档、目标文档ID（行需已 flush 到数据库）。
+    输出: None（提交事务）。
+    作用: SQL 行复制与状态更新同事务提交。
+    注意: 调用方应先执行 clone_document_mentions 补齐图谱链接（同步驱动，异步路由中需放入线程池），
+          图谱失败时文档不会被误标为 ready。
+    """
+    await clone_document_results(session, source.id, target_id)
+    await session.execute(
+        update(Document)
+        .where(Document.id == target_id)
+        .values(status="ready", knowledgeGraphId=source.knowledgeGraphId)
+    )
+    await session.commit()
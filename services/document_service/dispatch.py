@@ -0,0 +1,34 @@
+"""
+模块: services.document_service.dispatch
+职责: 文档处理任务的名称常量与按名称构造的轻量签名，供 API 进程投递任务。
+输入: 任务名、任务参数、目标队列。
+输出: EXTRACT_TEXT_TASK, REVISE_TASK 等任务名常量，task_signature。
+说明: 仅依赖 Celery 应用本身，不导入 worker 模块（PyMuPDF、python-pptx 与 Worker 数据库运行时），缩短 API 冷启动。
+"""
+
+from typing import Any
+
+from celery.canvas import Signature
+
+from common.mq.celery_app import celery_app
+
+
+EXTRACT_TEXT_TASK = "document.extract_text"
+PARSE_PAGE_RANGE_TASK = "document.parse_page_range"
+FINISH_PAGES_TASK = "document.finish_pages"
+MARK_FAILED_TASK = "document.mark_failed"
+EXTRACT_STAGE_TASK = "document.extract"
+PERSIST_SQL_TASK = "document.persist_sql"
+PERSIST_GRAPH_TASK = "document.persist_graph"
+REVISE_TASK = "document.revise"
+REINDEX_TASK = "document.reindex"
+
+
+def task_signature(name: str, *args: Any, queue: str | None = None) -> Signature:
+    """按任务名构造不可变签名。
+    输入: 任务名、位置参数、可选目标队列。
+    输出: celery Signature，可直接 apply_async 或组成 group。
+    作用: 投递方无需导入任务函数；任务由消费对应队列的 Worker 按名称解析执行。
+    """
+    options = {"queue": queue} if queue is not None else {}
+    return celery_app.signature(name, args=args, immutable=True, **options)
@@ -0,0 +1,253 @@
+"""
+模块: services.document_service.graph_sink
+职责: 图谱写后入库消费者：从 Redis 分片队列批量取出载荷，合并排序后一次性写入 Neo4j，
+      文档的全部分片载荷写入后将其标记为 ready。
+输入: Redis 队列 graph:ingest:<shard> 中的 JSON 载荷。
+输出: 无（写入图数据库，更新文档状态）。
+用法: python -m services.document_service.graph_sink [--shard 0]（不指定分片时为每个分片各启动一个消费进程）
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import redis
+from sqlalchemy import update, tuple_
+
+from common.cache.redis_client import get_redis_client
+from common.config.settings import settings
+from common.graph.ingest_queue import ingest_keys, dead_letter_key, graph_doc_key
+from common.graph.neo4j_client import close_neo4j_driver
+from common.graph.neo4j_writer import write_graph_batch
+from services.document_service.models import Document
+from services.document_service.progress import cache_status, record_stage
+from services.document_service.worker_db import get_worker_engine, run_async, shutdown_worker_db
+
+
+RETRY_BACKOFF_SECONDS = 5
+ATTEMPTS_KEY = "graph:ingest:{shard}:attempts"
+
+logger = logging.getLogger(__name__)
+
+
+def decode_payload(raw: str) -> Dict[str, Any] | None:
+    """解码并校验单条载荷；格式不符时记录告警并返回 None。"""
+    try:
+        payload = json.loads(raw)
+        return {
+            "doc": str(payload["doc"]),
+            "version": int(payload.get("version", 0)),
+            "concepts": [str(name) for name in payload.get("concepts", [])],
+            "relations": [(str(a), str(b), float(weight)) for a, b, weight in payload.get("relations", [])],
+        }
+    except (ValueError, TypeError, KeyError, AttributeError) as exc:
+        logger.warning("graph sink: undecodable payload %.200r: %s", raw, exc)
+        return None
+
+
+def merge_payloads(payloads: List[Dict[str, Any]]) -> Tuple[Set[Tuple[str, str]], List[Tuple[str, str, float]]]:
+    """合并多篇文档的载荷。
+    输入: decode_payload 解码后的载荷列表。
+    输出: (MENTIONED_IN 集合 {(概念, 文档)}, RELATED_TO 列表 [(a, b, weight)]，同一对保留最大权重)。
+    作用: 跨文档去重，热点概念在一个批次内只 MERGE 一次。
+    """
+    mentions: Set[Tuple[str, str]] = set()
+    edges: Dict[Tuple[str, str], float] = {}
+    for payload in payloads:
+        doc = payload["doc"]
+        mentions.update((name, doc) for name in payload["concepts"])
+        for a, b, weight in payload["relations"]:
+            edges[(a, b)] = max(weight, edges.get((a, b), weight))
+    return mentions, [(a, b, weight) for (a, b), weight in edges.items()]
+
+
+def _take_batch(client: redis.Redis, shard: int) -> List[str]:
+    """取出一个批次；上次未确认的处理中批次优先重放（at-least-once）。"""
+    pending_key, processing_key = ingest_keys(shard)
+    leftover = client.lrange(processing_key, 0, -1)
+    if leftover:
+        return leftover
+
+    first = client.blmove(pending_key, processing_key, settings.graphIngestPollTimeout, "LEFT", "RIGHT")
+    if first is None:
+        return []
+    items = [first]
+    while len(items) < settings.graphIngestBatchSize:
+        item = client.lmove(pending_key, processing_key, "LEFT", "RIGHT")
+        if item is None:
+            break
+        items.append(item)
+    return items
+
+
+def _write_payloads(payloads: List[Dict[str, Any]]) -> None:
+    mentions, edges = merge_payloads(payloads)
+    write_graph_batch(mentions, edges)
+
+
+def _drop_superseded(
+    client: redis.Redis,
+    entries: List[Tuple[str, Dict[str, Any]]],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """丢弃版本落后于文档当前载荷版本的 (原始载荷, 解码载荷)（文档已被修订，旧载荷会重新链接修订删除的概念）。"""
+    if not entries:
+        return entries
+    pipe = client.pipeline(transaction=False)
+    for _, payload in entries:
+        pipe.hget(graph_doc_key(payload["doc"]), "version")
+    current = pipe.execute()
+    kept = []
+    for entry, version in zip(entries, current):
+        payload = entry[1]
+        if version is not None and payload["version"] < int(version):
+            logger.info("graph sink: dropping superseded payload for %s v%s", payload["doc"], payload["version"])
+            continue
+        kept.append(entry)
+    return kept
+
+
+def _set_documents_status(documents: Dict[str, int], status: str) -> List[str]:
+    """将仍处于 processing 且版本一致的文档更新为 status，返回实际更新的文档ID（已修订或失败的文档不受影响）。
+    输入: {文档ID: 载荷版本}（版本 0 表示未携带版本的旧载荷，不校验版本）。
+    """
+
+    async def _do_update() -> List[str]:
+        versioned = sorted((doc, version) for doc, version in documents.items() if version)
+        unversioned = sorted(doc for doc, version in documents.items() if not version)
+        updated: List[str] = []
+        async with get_worker_engine().begin() as conn:
+            for condition in (
+                tuple_(Document.id, Document.version).in_(versioned) if versioned else None,
+                Document.id.in_(unversioned) if unversioned else None,
+            ):
+                if condition is None:
+                    continue
+                result = await conn.execute(
+                    update(Document)
+                    .where(condition, Document.status == "processing")
+                    .values(status=status)
+                    .returning(Document.id)
+                )
+                updated.extend(document_id for (document_id,) in result)
+        return updated
+
+    if not documents:
+        return []
+    updated = run_async(_do_update())
+    for document_id in updated:
+        cache_status(document_id, status)
+    return updated
+
+
+def _confirm_documents(client: redis.Redis, payloads: List[Dict[str, Any]]) -> None:
+    """递减各文档待确认的载荷数，全部分片载荷均已写入的文档标记为 ready（阶段 done）。"""
+    if not payloads:
+        return
+    pipe = client.pipeline(transaction=False)
+    for payload in payloads:
+        pipe.hincrby(graph_doc_key(payload["doc"]), "pending", -1)
+    remaining = pipe.execute()
+    written = {payload["doc"]: payload["version"] for payload, count in zip(payloads, remaining) if count <= 0}
+    for document_id in _set_documents_status(written, "ready"):
+        record_stage(document_id, "done")
+
+
+def _dead_letter(client: redis.Redis, shard: int, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """逐条重写已达失败上限的批次：成功的载荷照常确认，仍失败的移入死信队列并将其文档标记为 failed。"""
+    dead: List[str] = []
+    written: List[Dict[str, Any]] = []
+    failed: Dict[str, int] = {}
+    for item, payload in entries:
+        try:
+            _write_payloads([payload])
+        except Exception:
+            logger.exception("graph sink shard %s: payload moved to %s", shard, dead_letter_key(shard))
+            dead.append(item)
+            failed[payload["doc"]] = payload["version"]
+            continue
+        written.append(payload)
+    if dead:
+        client.rpush(dead_letter_key(shard), *dead)
+    _confirm_documents(client, written)
+    _set_documents_status(failed, "failed")
+
+
+def drain_once(client: redis.Redis, shard: int) -> int:
+    """处理一个批次。
+    输入: Redis 客户端、分片号。
+    输出: 本批处理的载荷条数（0 表示队列为空）。
+    作用: 写入成功后确认相关文档并清空处理中队列；失败时批次保留并累计失败次数，下一轮重放（MERGE 幂等）。
+          连续失败 graphIngestMaxAttempts 次后逐条隔离，写不进去的载荷移入死信队列，分片不再被单条坏数据阻塞；
+          无法解码的载荷直接移入死信队列。
+    """
+    items = _take_batch(client, shard)
+    if not items:
+        return 0
+    processing_key = ingest_keys(shard)[1]
+    attempts_key = ATTEMPTS_KEY.format(shard=shard)
+    decoded = [(item, decode_payload(item)) for item in items]
+    entries = _drop_superseded(client, [(item, payload) for item, payload in decoded if payload is not None])
+    payloads = [payload for _, payload in entries]
+    try:
+        _write_payloads(payloads)
+    except Exception:
+        attempts = client.incr(attempts_key)
+        if attempts < settings.graphIngestMaxAttempts:
+            raise
+        logger.exception("graph sink shard %s: batch failed %s times, isolating payloads", shard, attempts)
+        _dead_letter(client, shard, entries)
+    else:
+        _confirm_documents(client, payloads)
+    undecodable = [item for item, payload in decoded if payload is None]
+    if undecodable:
+        client.rpush(dead_letter_key(shard), *undecodable)
+    client.delete(processing_key, attempts_key)
+    return len(items)
+
+
+def run_graph_sink(shard: int) -> None:
+    """消费循环：持续批量入图，写入失败时记录日志并退避重试。
+    输入: 分片号。
+    输出: 无（常驻进程）。
+    """
+    client = get_redis_client()
+    try:
+        while True:
+            try:
+                drain_once(client, shard)
+            except Exception:
+                logger.exception("graph sink shard %s: batch write failed, retrying in %ss", shard, RETRY_BACKOFF_SECONDS)
+                time.sleep(RETRY_BACKOFF_SECONDS)
+    finally:
+        close_neo4j_driver()
+        shutdown_worker_db()
+
+
+def run_all_shards() -> None:
+    """为 [0, graphIngestShards) 的每个分片启动一个消费进程并等待其退出，进程数始终与分片配置一致。"""
+    processes = [
+        multiprocessing.Process(target=run_graph_sink, args=(shard,), name=f"graph-sink-{shard}")
+        for shard in range(max(1, settings.graphIngestShards))
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KeShang graph ingestion sink")
+    parser.add_argument("--shard", type=int, default=None, help="分片号，取值 [0, graphIngestShards)；默认消费全部分片")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.appLogLevel, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.shard is None:
+        run_all_shards()
+    else:
+        run_graph_sink(args.shard)
+
+
+if __name__ == "__main__":
+    main()
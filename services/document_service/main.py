@@ -5,25 +5,27 @@
 输出: JSON 响应。
 """
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
-from sqlalchemy.ext.asyncio import AsyncEngine
 
 from common.config.settings import settings
-from common.db.postgres import get_async_engine
-from common.db.base import Base
+from common.db.postgres import db_lifespan, pool_metrics
 from services.document_service.routes import router as document_router
-from services.document_service import models  # ensure models imported
 
-app = FastAPI(title="Document Service", version="0.1.0")
-app.include_router(document_router)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """应用生命周期：创建进程级共享数据库引擎，关闭时释放连接池。
+    建表由部署时的一次性步骤 python -m services.document_service.migrate 完成，不在服务启动时执行。
+    """
+    async with db_lifespan():
+        yield
 
-@app.on_event("startup")
-async def on_startup() -> None:
-    """启动时创建表（开发模式）。"""
-    engine: AsyncEngine = get_async_engine()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+app = FastAPI(title="Document Service", version="0.1.0", lifespan=lifespan)
+app.include_router(document_router)
 
 
 @app.get("/health")
@@ -44,3 +46,13 @@ def version() -> dict:
     作用: 排障与可观测性。
     """
     return {"version": app.version, "env": settings.appEnv}
+
+
+@app.get("/metrics/db")
+def db_metrics() -> dict:
+    """数据库连接池指标。
+    输入: 无。
+    输出: 已签出连接数、溢出数与连接获取等待耗时等。
+    作用: 观察连接池压力，辅助调整 postgresPoolMin/Max。
+    """
+    return pool_metrics()
@@ -0,0 +1,29 @@
+"""
+模块: services.document_service.migrate
+职责: document_service 的一次性建表与增量升级步骤（部署时先于服务进程运行，服务启动不再建表）。
+输入: 无。
+输出: 无（在主库上创建缺失的表，并为已有表补齐新增列与索引）。
+用法: python -m services.document_service.migrate
+"""
+
+from common.db.migrate import run_create_schema
+from services.document_service import models  # 注册 ORM 模型到 Base.metadata
+
+
+# 已有表上新增的列与索引（create_all 不修改已有表）；语句须幂等，按顺序执行。
+# 非空列带服务端默认值，存量行取默认值后即满足约束。
+UPGRADE_STEPS = (
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS "fileSize" BIGINT',
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS "contentHash" VARCHAR(64)',
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS "version" INTEGER NOT NULL DEFAULT 1',
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS "batchId" VARCHAR(64)',
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS "createdAt" TIMESTAMP WITH TIME ZONE DEFAULT now()',
+    'CREATE INDEX IF NOT EXISTS "ix_documents_contentHash" ON documents ("contentHash")',
+    'CREATE INDEX IF NOT EXISTS "ix_documents_batchId" ON documents ("batchId")',
+    'ALTER TABLE document_relations ADD COLUMN IF NOT EXISTS "weight" DOUBLE PRECISION',
+    'ALTER TABLE task_outbox ADD COLUMN IF NOT EXISTS "deadAt" TIMESTAMP WITH TIME ZONE',
+)
+
+
+if __name__ == "__main__":
+    run_create_schema(UPGRADE_STEPS)
@@ -5,7 +5,9 @@
 输出: SQLAlchemy ORM 模型。
 """
 
-from sqlalchemy import String, Integer
+from datetime import datetime
+
+from sqlalchemy import String, Integer, BigInteger, Float, Text, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from common.db.base import Base
@@ -18,8 +20,13 @@ class Document(Base):
     - uploaderId: 上传者用户ID（可空）
     - fileName: 原始文件名
     - objectPath: 对象存储中的对象键名
-    - status: 处理状态 processing/ready/failed
+    - status: 处理状态 uploading/processing/ready/failed
     - knowledgeGraphId: 关联的图谱标识（MVP 用 docId 占位）
+    - fileSize: 文件字节数（直传模式下为客户端声明值，完成时校验）
+    - contentHash: 内容 SHA-256（索引），用于相同课件去重复用解析结果
+    - version: 课件版本号，每次上传修订版递增
+    - batchId: 批量上传批次ID（索引，可空）
+    - createdAt: 登记时间；直传超时未完成的 uploading 记录据此清理
     """
 
     __tablename__ = "documents"
@@ -30,6 +37,11 @@ class Document(Base):
     objectPath: Mapped[str] = mapped_column(String(512), nullable=False)
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="processing")
     knowledgeGraphId: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    fileSize: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    contentHash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    batchId: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    createdAt: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, server_default=func.now())
 
 
 class DocumentConcept(Base):
@@ -43,7 +55,7 @@ class DocumentConcept(Base):
 
 
 class DocumentRelation(Base):
-    """文档关系表：存储概念之间的简单关系（占位）。"""
+    """文档关系表：存储概念之间的共现关系，weight 为滑动句窗共现的 PMI 得分。"""
 
     __tablename__ = "document_relations"
 
@@ -51,3 +63,38 @@ class DocumentRelation(Base):
     documentId: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
     sourceConcept: Mapped[str] = mapped_column(String(255), nullable=False)
     targetConcept: Mapped[str] = mapped_column(String(255), nullable=False)
+    weight: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+
+class DocumentPage(Base):
+    """文档逐页记录表：当前版本每页（幻灯片）的内容指纹与句内提及（JSON），修订时未变更的页直接复用。"""
+
+    __tablename__ = "document_pages"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    documentId: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    pageIndex: Mapped[int] = mapped_column(Integer, nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(40), nullable=False)
+    mentions: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class TaskOutbox(Base):
+    """任务发件箱：与业务记录在同一事务内写入待投递的 Celery 任务，由 outbox_relay 批量投递后删除。
+    字段:
+    - taskName / args / queue: 任务名、位置参数（JSON 数组）与目标队列
+    - dedupKey: 去重键（唯一），同时作为投递时的 Celery task_id，Worker 据此丢弃重复投递
+    - attempts / lastError: 投递失败次数与最近一次错误
+    - deadAt: 失败次数达到 outboxMaxAttempts 后移出投递的时间（非空即死信，中继不再取出，可用 --requeue-dead 重新投递）
+    """
+
+    __tablename__ = "task_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    taskName: Mapped[str] = mapped_column(String(128), nullable=False)
+    args: Mapped[str] = mapped_column(Text, nullable=False)
+    queue: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    dedupKey: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lastError: Mapped[str | None] = mapped_column(Text, nullable=True)
+    deadAt: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,59 @@
+"""
+模块: services.document_service.outbox
+职责: 事务性发件箱：API 在写入业务记录的同一事务内登记待投递任务；Worker 按投递去重键丢弃重复投递。
+输入: 任务名、任务参数、目标队列；Celery task_id（即去重键）。
+输出: outbox_entry, enqueue_tasks（API 侧，异步）；delivery_done, mark_delivery_done（Worker 侧，同步）。
+说明: 投递由 outbox_relay 进程完成，请求耗时不再依赖 Broker；中继至少投递一次，重复投递由去重键吸收。
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.cache.redis_client import get_redis_client
+from common.config.settings import settings
+from services.document_service.models import TaskOutbox
+
+
+DELIVERY_DONE_KEY = "task:done:{task_id}"
+
+
+def outbox_entry(name: str, *args: Any, queue: str | None = None) -> Dict[str, Any]:
+    """构造一条发件箱记录。
+    输入: 任务名、位置参数（需可 JSON 序列化）、可选目标队列。
+    输出: TaskOutbox 列值字典；去重键由任务名与参数摘要组成，同一任务与参数只登记一次。
+    """
+    payload = json.dumps(args, ensure_ascii=False)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return {"taskName": name, "args": payload, "queue": queue, "dedupKey": f"{name}:{digest}", "attempts": 0}
+
+
+async def enqueue_tasks(session: AsyncSession, entries: List[Dict[str, Any]]) -> None:
+    """在当前事务内登记待投递任务（单条多值 INSERT，去重键冲突时忽略）。
+    输入: 会话、outbox_entry 构造的记录列表。
+    输出: None；随调用方的 commit 一同生效，回滚则任务不会被投递。
+    """
+    if not entries:
+        return
+    await session.execute(insert(TaskOutbox).values(entries).on_conflict_do_nothing(index_elements=["dedupKey"]))
+
+
+def _done_key(task_id: str) -> str:
+    return DELIVERY_DONE_KEY.format(task_id=task_id)
+
+
+def delivery_done(task_id: str | None) -> bool:
+    """该投递（task_id）是否已成功处理过；用于丢弃中继或 Broker 的重复投递。"""
+    return bool(task_id) and bool(get_redis_client().exists(_done_key(task_id)))
+
+
+def mark_delivery_done(task_id: str | None) -> None:
+    """记录投递已成功处理，保留 outboxDedupTtlSeconds；失败重试沿用同一 task_id，故仅在成功后记录。
+    作用: 重复投递来自中继提交前崩溃（秒级）与 RabbitMQ 对未确认消息的重投（至多任务时限加 consumer_timeout，
+          约 1 小时），保留时间（默认 24 小时）取其数十倍，使去重窗口覆盖全部重投来源；标记过期后的同一投递会被再次执行。
+    """
+    if task_id:
+        get_redis_client().set(_done_key(task_id), 1, ex=settings.outboxDedupTtlSeconds)
@@ -0,0 +1,141 @@
+"""
+模块: services.document_service.outbox_relay
+职责: 发件箱中继：批量取出已提交的待投递任务，按登记顺序投递到 Celery，投递成功后删除。
+输入: task_outbox 表中的记录。
+输出: 无（投递 Celery 任务）。
+用法: python -m services.document_service.outbox_relay [--once] [--requeue-dead]
+说明: 行锁使用 SKIP LOCKED，可并行运行多个中继；投递后、提交前崩溃会重投同一批，
+      各任务以去重键作为 task_id，Worker 据此丢弃重复投递（至少一次投递）。
+      单条任务自身的投递错误不阻塞其后的任务，失败 outboxMaxAttempts 次后移入死信（deadAt 非空）。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+
+from kombu.exceptions import OperationalError
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from common.config.settings import settings
+from common.db.postgres import get_async_engine, get_session_maker
+from services.document_service.dispatch import task_signature
+from services.document_service.models import TaskOutbox
+
+
+RETRY_BACKOFF_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+async def relay_once(session_maker: sessionmaker[AsyncSession]) -> int:
+    """投递一个批次。
+    输入: 会话工厂。
+    输出: 本批投递成功的任务数（0 表示发件箱为空）。
+    作用: Broker 不可用（连接错误）时记录错误并保留剩余任务，已投递的部分照常删除，随后抛出异常由调用方退避；
+          单条任务自身的投递错误只记录到该行并跳过，失败次数达到 outboxMaxAttempts 时标记为死信。
+    """
+    async with session_maker() as session:
+        query = (
+            select(TaskOutbox)
+            .where(TaskOutbox.deadAt.is_(None))
+            .order_by(TaskOutbox.id)
+            .limit(settings.outboxBatchSize)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await session.execute(query)).scalars().all()
+        published = []
+        error: Exception | None = None
+        for row in rows:
+            try:
+                task_signature(row.taskName, *json.loads(row.args), queue=row.queue).apply_async(task_id=row.dedupKey)
+            except OperationalError as exc:
+                row.attempts += 1
+                row.lastError = repr(exc)[:2000]
+                error = exc
+                break
+            except Exception as exc:
+                row.attempts += 1
+                row.lastError = repr(exc)[:2000]
+                if row.attempts >= settings.outboxMaxAttempts:
+                    row.deadAt = datetime.now(timezone.utc)
+                    logger.error("outbox %s (%s) dead after %s attempts: %s", row.id, row.dedupKey, row.attempts, row.lastError)
+                else:
+                    logger.warning("outbox %s (%s) attempt %s failed: %s", row.id, row.dedupKey, row.attempts, row.lastError)
+                continue
+            published.append(row.id)
+        if published:
+            await session.execute(delete(TaskOutbox).where(TaskOutbox.id.in_(published)))
+        await session.commit()
+    if error is not None:
+        raise error
+    return len(published)
+
+
+async def requeue_dead(session_maker: sessionmaker[AsyncSession]) -> int:
+    """将死信任务放回发件箱（清空 deadAt 与失败次数），用于修复问题后补投。
+    输入: 会话工厂。
+    输出: 放回的任务数。
+    """
+    async with session_maker() as session:
+        result = await session.execute(
+            update(TaskOutbox).where(TaskOutbox.deadAt.is_not(None)).values(deadAt=None, attempts=0)
+        )
+        await session.commit()
+    return result.rowcount or 0
+
+
+async def _relay_loop(once: bool) -> None:
+    engine = get_async_engine()
+    session_maker = get_session_maker(engine)
+    try:
+        while True:
+            try:
+                count = await relay_once(session_maker)
+            except Exception:
+                if once:
+                    raise
+                logger.exception("outbox relay failed, retrying in %ss", RETRY_BACKOFF_SECONDS)
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS)
+                continue
+            if count < settings.outboxBatchSize:
+                if once:
+                    return
+                await asyncio.sleep(settings.outboxPollSeconds)
+    finally:
+        await engine.dispose()
+
+
+async def _requeue_dead() -> int:
+    engine = get_async_engine()
+    try:
+        return await requeue_dead(get_session_maker(engine))
+    finally:
+        await engine.dispose()
+
+
+def run_outbox_relay(once: bool = False) -> None:
+    """中继循环：发件箱非空时连续投递，为空时按 outboxPollSeconds 轮询，投递失败时退避重试。
+    输入: once 为 True 时清空发件箱后退出（运维补投）。
+    输出: 无（常驻进程）。
+    """
+    asyncio.run(_relay_loop(once))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KeShang task outbox relay")
+    parser.add_argument("--once", action="store_true", help="投递完当前积压后退出")
+    parser.add_argument("--requeue-dead", action="store_true", help="将死信任务放回发件箱后退出")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.appLogLevel, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.requeue_dead:
+        logger.info("requeued %s dead outbox tasks", asyncio.run(_requeue_dead()))
+        return
+    run_outbox_relay(args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+模块: services.document_service.pipeline
+职责: 流式 NER/RE 流水线：逐页消费文本，增量记录“句子 × 概念”提及，
+      结束时以稀疏矩阵计算滑动句窗共现并按 PMI 为关系打分。
+输入: 逐页文本的可迭代对象（生成器），可选词典概念匹配器与新词发现器。
+输出: StreamingNerRe, RecordSpool，(实体列表, 带权关系列表)。
+"""
+
+import hashlib
+import io
+import json
+import re
+import tempfile
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from services.document_service.concept_matcher import AhoCorasick, ConceptMatcher
+from services.document_service.term_discovery import TermDiscoverer
+
+
+TOKEN_PATTERN = re.compile(r"[\w\u4e00-\u9fa5]+")
+CJK_CHAR_PATTERN = re.compile(r"[\u4e00-\u9fa5]")
+SENTENCE_SPLIT_PATTERN = re.compile(r"[。！？!?；;\n]+|\.\s+")
+MIN_TOKEN_LENGTH = 2
+MIN_ENTITY_FREQ = 2
+MAX_ENTITIES = 10_000  # 默认上限，与 settings.nerMaxEntities 一致；Worker 按配置传入
+CO_OCCURRENCE_WINDOW = 3  # 滑动窗口包含的句子数，窗口不跨页
+MIN_CO_OCCURRENCE = 2  # 共现窗口数下限，抑制低频对的 PMI 偏高
+MAX_RELATIONS = 20_000  # 默认上限，与 settings.nerMaxRelations 一致
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024  # 逐页记录与暂存页面在内存中的上限，超过后溢写到匿名临时文件
+
+WeightedRelation = Tuple[str, str, float]
+# 逐页提及记录: {"fp": 页指纹, "s": [[句内提及...], ...], "k": [本页词典/新词命中], "d": 是否参与了新词发现}
+PageRecord = Dict[str, Any]
+
+
+def page_fingerprint(page: str) -> str:
+    """页面内容指纹：空白归一化后的 SHA-1，排版空白变化不视为修改。"""
+    normalized = " ".join(page.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class RecordSpool:
+    """按页序号暂存 JSON 记录，可按页序重复读取。
+    作用: 记录逐条序列化写入有界缓冲（超过 SPOOL_MEMORY_BYTES 溢写到创建即删除的临时文件，进程被杀也不残留），
+          内存中只保留每页的偏移与长度；写入顺序可与页序不同。
+    """
+
+    def __init__(self, max_memory: int = SPOOL_MEMORY_BYTES) -> None:
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+b")
+        self._offsets: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, record in self.items():
+            yield record
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        for index in sorted(self._offsets):
+            yield index, self.get(index)
+
+    def put(self, index: int, record: Any) -> None:
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        offset = self._file.seek(0, io.SEEK_END)
+        self._file.write(data)
+        self._offsets[index] = (offset, len(data))
+
+    def get(self, index: int) -> Any:
+        offset, size = self._offsets[index]
+        self._file.seek(offset)
+        return json.loads(self._file.read(size))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _as_int64(values: array) -> np.ndarray:
+    """零拷贝地将 array('q') 视为 int64 向量。"""
+    return np.frombuffer(values, dtype=np.int64) if len(values) else np.zeros(0, dtype=np.int64)
+
+
+class StreamingNerRe:
+    """流式 NER/RE 累加器（规则占位实现）。
+    - NER: 词典概念匹配（Aho-Corasick，可选） + 中文新词发现（后缀自动机，可选） + 规则分词 + 频次/长度过滤
+    - RE: 滑动句窗共现，PMI 打分（稀疏矩阵向量化计算）
+    作用: 每次只持有一页文本，提及以整型数组记录，逐页记录写入 RecordSpool；启用新词发现时新词依赖全文统计，
+          在发现器达到字符上限前的页面文本同样暂存到 RecordSpool，result() 时逐页读回计数。
+    """
+
+    def __init__(
+        self,
+        window: int = CO_OCCURRENCE_WINDOW,
+        matcher: ConceptMatcher | None = None,
+        discoverer: TermDiscoverer | None = None,
+    ) -> None:
+        self.window = window
+        self.matcher = matcher
+        self.discoverer = discoverer
+        self.freq: Counter[str] = Counter()
+        self.known: Set[str] = set()
+        # 本篇发现的新词 -> 发现得分（频次 × 左右邻接熵较小值）
+        self.term_scores: Dict[str, float] = {}
+        # 暂存页: 页序号 -> {"t": 页面文本, "r": 可复用的旧记录或 None}
+        self._deferred = RecordSpool()
+        self._page_count = 0
+        self._records = RecordSpool()
+        # 句子 × 概念 提及记录（COO 形式），以及每个句子所在页的末句下标（不含）
+        self._vocab: Dict[str, int] = {}
+        self._mention_sentences = array("q")
+        self._mention_terms = array("q")
+        self._page_ends = array("q")
+
+    def _find(self, page: str, extra: AhoCorasick | None) -> List[Tuple[int, int]]:
+        if self.matcher is not None:
+            return self.matcher.find(page, extra)
+        if extra is not None:
+            return ConceptMatcher().find(page, extra)
+        return []
+
+    def _mentions(
+        self, page: str, extra: AhoCorasick | None = None, discovered: bool = False
+    ) -> Iterator[Tuple[str, bool]]:
+        """按出现位置产出本页提及 (词, 是否为词典/新词命中)：命中优先，被命中覆盖的规则分词不再计入。
+        本页参与了新词发现时，未被命中覆盖的中文规则分词（整段无空格长串）不再视为候选；
+        超出发现字符上限的页面保留这些规则分词。
+        """
+        hits = self._find(page, extra)
+        cursor = 0
+        for match in TOKEN_PATTERN.finditer(page):
+            start, end = match.span()
+            covered = False
+            while cursor < len(hits) and hits[cursor][0] < end:
+                hit_start, hit_end = hits[cursor]
+                yield page[hit_start:hit_end], True
+                covered = covered or hit_end > start
+                cursor += 1
+            token = match.group()
+            if covered or len(token) < MIN_TOKEN_LENGTH:
+                continue
+            if discovered and CJK_CHAR_PATTERN.search(token):
+                continue
+            yield token, False
+        for hit_start, hit_end in hits[cursor:]:
+            yield page[hit_start:hit_end], True
+
+    def _count(self, index: int, page: str, extra: AhoCorasick | None = None, discovered: bool = False) -> None:
+        """按句切分一页并抽取提及，登记为第 index 页；discovered 表示该页文本已计入新词发现。"""
+        sentences: List[List[str]] = []
+        known: Set[str] = set()
+        for sentence in SENTENCE_SPLIT_PATTERN.split(page):
+            if not sentence.strip():
+                continue
+            terms: List[str] = []
+            for term, is_hit in self._mentions(sentence, extra, discovered):
+                terms.append(term)
+                if is_hit:
+                    known.add(term)
+            sentences.append(terms)
+        self._register(index, {"fp": page_fingerprint(page), "s": sentences, "k": sorted(known), "d": discovered})
+
+    def _register(self, index: int, record: PageRecord) -> None:
+        """将一页的提及记录并入词频与“句子 × 概念”提及矩阵；该页全部句子的页末下标统一记为本页结束位置。"""
+        self._records.put(index, record)
+        self.known.update(record["k"])
+        first = len(self._page_ends)
+        for terms in record["s"]:
+            sentence_index = len(self._page_ends)
+            self._page_ends.append(0)
+            for term in terms:
+                self.freq[term] += 1
+                self._mention_sentences.append(sentence_index)
+                self._mention_terms.append(self._vocab.setdefault(term, len(self._vocab)))
+        end = len(self._page_ends)
+        for sentence_index in range(first, end):
+            self._page_ends[sentence_index] = end
+
+    def feed(self, page: str) -> None:
+        """消费一页文本，更新词频与提及记录。
+        输入: 单页文本（空页同样占用页序号）。
+        输出: None。
+        作用: 共现窗口不跨页，避免跨页的无关邻接。
+        """
+        index = self._page_count
+        self._page_count += 1
+        if self.discoverer is not None and not self.discoverer.saturated:
+            self.discoverer.feed(page)
+            self._deferred.put(index, {"t": page, "r": None})
+            return
+        self._count(index, page)
+
+    def feed_page(self, page: str, extra: AhoCorasick | None = None) -> None:
+        """立即抽取一页（不参与新词发现），可附加文档级自动机。
+        作用: 增量修订时只对变更页调用。
+        """
+        index = self._page_count
+        self._page_count += 1
+        self._count(index, page, extra)
+
+    def feed_record(self, record: PageRecord, page: str | None = None) -> None:
+        """重放一页已存储的提及记录，不重新抽取。
+        输入: 上一版本的逐页记录、可选的该页文本。
+        作用: 增量修订时未变更的页直接复用上一版本的结果。提供文本且新词发现未饱和时，该页同样计入新词统计，
+              发现输入与完整抽取一致；本篇新词在该页的命中与旧记录不符时改为重新抽取该页。
+              页面相对发现上限的位置变化（旧记录是否参与发现与本次不同）时同样重新抽取。
+        """
+        index = self._page_count
+        self._page_count += 1
+        if page is not None and self.discoverer is not None and not self.discoverer.saturated:
+            self.discoverer.feed(page)
+            self._deferred.put(index, {"t": page, "r": record})
+            return
+        if page is not None and self.discoverer is not None and record.get("d", True):
+            self._count(index, page)
+            return
+        self._register(index, record)
+
+    def page_records(self) -> RecordSpool:
+        """返回逐页提及记录（需在 result() 之后调用），可按页序重复迭代，不整体载入内存。"""
+        return self._records
+
+    def _replayable(self, page: str, record: PageRecord, extra: AhoCorasick | None, discovered: Set[str]) -> bool:
+        """旧记录是否与本次抽取一致：旧记录同样参与了新词发现，本篇新词在该页的命中均已记录，且记录中的命中词仍可被识别。"""
+        if not record.get("d", True):
+            return False
+        known = set(record["k"])
+        if extra is not None and any(page[start:end] not in known for start, end in extra.iter_matches(page)):
+            return False
+        return all(term in discovered or (self.matcher is not None and term in self.matcher) for term in known)
+
+    def _flush_deferred(self, max_terms: int) -> None:
+        """以发现的新词补充匹配后，对暂存页面统一计数（可复用的旧记录直接重放）。"""
+        if self.discoverer is None:
+            return
+        self.term_scores = dict(self.discoverer.top_terms(max_terms))
+        terms = list(self.term_scores)
+        extra = AhoCorasick(terms) if terms else None
+        discovered = set(terms)
+        for index, entry in self._deferred.items():
+            page, record = entry["t"], entry["r"]
+            if record is not None and self._replayable(page, record, extra, discovered):
+                self._register(index, record)
+            else:
+                self._count(index, page, extra, discovered=True)
+        self._deferred.close()
+        self._deferred = RecordSpool()
+
+    def _window_incidence(self, columns: np.ndarray) -> sparse.csr_matrix:
+        """构造“窗口 × 概念”二值关联矩阵。
+        输入: 概念ID -> 列号映射（-1 表示未入选）。
+        输出: CSR 矩阵 X，X[w, j] = 1 当且仅当概念 j 出现在窗口 w 中。
+        作用: 窗口 w 覆盖第 w 句起的 window 个句子（截止于页末），X = (A · S) > 0，
+              A 为“窗口 × 句子”带状矩阵，S 为“句子 × 概念”提及矩阵。
+        """
+        num_sentences = len(self._page_ends)
+        sentences = _as_int64(self._mention_sentences)
+        terms = _as_int64(self._mention_terms)
+        cols = columns[terms]
+        keep = cols >= 0
+        s_matrix = sparse.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=np.float64), (sentences[keep], cols[keep])),
+            shape=(num_sentences, int(columns.max()) + 1),
+        )
+        s_matrix.data[:] = 1.0
+
+        starts = np.arange(num_sentences, dtype=np.int64)
+        page_ends = _as_int64(self._page_ends)
+        band_rows, band_cols = [], []
+        for offset in range(self.window):
+            covered = starts + offset
+            valid = covered < page_ends
+            band_rows.append(starts[valid])
+            band_cols.append(covered[valid])
+        rows = np.concatenate(band_rows)
+        band = sparse.csr_matrix(
+            (np.ones(rows.size, dtype=np.float64), (rows, np.concatenate(band_cols))),
+            shape=(num_sentences, num_sentences),
+        )
+        incidence = (band @ s_matrix).tocsr()
+        incidence.data[:] = 1.0
+        return incidence
+
+    def _score_relations(self, entities: List[str], max_relations: int) -> List[WeightedRelation]:
+        """以 PMI 为入选概念对打分。
+        输入: 入选实体列表、关系数量上限。
+        输出: [(a, b, pmi)]，按 PMI 降序，仅保留共现窗口数 >= MIN_CO_OCCURRENCE 且 PMI > 0 的对。
+        作用: C = Xᵀ·X 一次稀疏乘法得到全部概念对的共现窗口数，无 Python 级成对循环。
+        """
+        if len(entities) < 2 or not len(self._page_ends):
+            return []
+        columns = np.full(len(self._vocab), -1, dtype=np.int64)
+        for position, name in enumerate(entities):
+            columns[self._vocab[name]] = position
+
+        incidence = self._window_incidence(columns)
+        num_windows = incidence.shape[0]
+        term_windows = np.asarray(incidence.sum(axis=0)).ravel()
+        co_counts = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+        mask = co_counts.data >= MIN_CO_OCCURRENCE
+        rows, cols, counts = co_counts.row[mask], co_counts.col[mask], co_counts.data[mask]
+        if not counts.size:
+            return []
+        pmi = np.log(counts * num_windows / (term_windows[rows] * term_windows[cols]))
+        positive = pmi > 0
+        rows, cols, pmi = rows[positive], cols[positive], pmi[positive]
+        order = np.argsort(-pmi, kind="stable")[:max_relations]
+        return [(entities[rows[i]], entities[cols[i]], round(float(pmi[i]), 6)) for i in order]
+
+    def result(
+        self,
+        max_entities: int = MAX_ENTITIES,
+        max_relations: int = MAX_RELATIONS,
+    ) -> Tuple[List[str], List[WeightedRelation]]:
+        """产出实体与关系。
+        输入: 实体与关系数量上限。
+        输出: (实体列表, 按 PMI 降序的带权关系列表 [(a, b, weight)])。
+        作用: 词典命中的已知概念与新发现的词出现一次即保留，规则分词需达到最小频次；
+              截断时已知概念（按频次）优先，其次为新词（按发现得分），最后为规则分词（按频次）。
+        """
+        self._flush_deferred(max_entities)
+
+        def rank(item: Tuple[str, int]) -> Tuple[int, float]:
+            term, count = item
+            if term in self.term_scores and not (self.matcher is not None and term in self.matcher):
+                return 1, -self.term_scores[term]
+            return (0 if term in self.known else 2), -count
+
+        candidates = [(t, c) for t, c in self.freq.most_common() if c >= MIN_ENTITY_FREQ or t in self.known]
+        entities = [t for t, _ in sorted(candidates, key=rank)[:max_entities]]
+        return entities, self._score_relations(entities, max_relations)
+
+
+def run_ner_re(
+    pages: Iterable[str],
+    matcher: ConceptMatcher | None = None,
+    discoverer: TermDiscoverer | None = None,
+) -> Tuple[List[str], List[WeightedRelation]]:
+    """逐页驱动 StreamingNerRe 并返回结果。
+    输入: 逐页文本的可迭代对象、可选词典概念匹配器与新词发现器。
+    输出: (实体列表, 带权关系列表)。
+    作用: Worker 调用入口；后续可替换为 spaCy/Transformers/LLM。
+    """
+    stage = StreamingNerRe(matcher=matcher, discoverer=discoverer)
+    for page in pages:
+        stage.feed(page)
+    return stage.result()
@@ -0,0 +1,138 @@
+"""
+模块: services.document_service.pptx_text
+职责: 轻量流式 PPTX 文本抽取：直接读取 zip 包内的幻灯片与备注 XML，增量解析 a:t 文本，不构建 python-pptx 对象模型。
+输入: 可 seek 的 .pptx 二进制文件对象。
+输出: PptxFormatError, PptxTextReader。
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, Tuple
+
+
+_NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_NOTES_REL_TYPE = _NS_R + "/notesSlide"
+
+_PRESENTATION_PART = "ppt/presentation.xml"
+_TAG_SLIDE_ID = f"{{{_NS_P}}}sldId"
+_TAG_REL = f"{{{_NS_REL}}}Relationship"
+_TAG_TEXT = f"{{{_NS_A}}}t"
+_TAG_BREAK = f"{{{_NS_A}}}br"
+_TAG_PARAGRAPH = f"{{{_NS_A}}}p"
+_TAG_FIELD = f"{{{_NS_A}}}fld"
+_ATTR_REL_ID = f"{{{_NS_R}}}id"
+
+
+class PptxFormatError(ValueError):
+    """包结构不符合预期（非 zip、缺少部件或关系、XML 损坏），调用方应回退到 python-pptx。"""
+
+
+def _rels_part(part: str) -> str:
+    """返回部件对应的关系部件名，如 ppt/slides/slide1.xml -> ppt/slides/_rels/slide1.xml.rels。"""
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _resolve_target(part: str, target: str) -> str:
+    """将关系目标解析为包内部件名（支持相对路径与以 / 开头的绝对路径）。"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+class PptxTextReader:
+    """PPTX 逐张幻灯片文本读取器。
+    作用: 构造时只读取 presentation.xml 与关系部件确定幻灯片顺序（结构异常抛出 PptxFormatError）；
+          iter_texts() 按序流式解析各幻灯片及其备注，媒体部件从不读取，解析中途的部件缺失或损坏同样抛出 PptxFormatError。
+          文本以段落为行拼接，与 python-pptx 逐形状 .text 换行拼接的结果一致，备注追加在幻灯片文本之后。
+    """
+
+    def __init__(self, fh: IO[bytes]) -> None:
+        try:
+            self._zip = zipfile.ZipFile(fh)
+        except zipfile.BadZipFile as exc:
+            raise PptxFormatError(str(exc)) from exc
+        try:
+            self.slides = self._slide_parts()
+        except (KeyError, ET.ParseError) as exc:
+            self._zip.close()
+            raise PptxFormatError(str(exc)) from exc
+
+    def __enter__(self) -> "PptxTextReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.slides)
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def _relationships(self, part: str) -> List[Tuple[str, str, str]]:
+        """读取部件的关系 (Id, Type, 解析后的目标部件名)；关系部件缺失时返回空列表。"""
+        name = _rels_part(part)
+        if name not in self._zip.NameToInfo:
+            return []
+        root = ET.fromstring(self._zip.read(name))
+        return [
+            (rel.get("Id", ""), rel.get("Type", ""), _resolve_target(part, rel.get("Target", "")))
+            for rel in root.iter(_TAG_REL)
+            if rel.get("TargetMode") != "External"
+        ]
+
+    def _slide_parts(self) -> List[Tuple[str, str | None]]:
+        """按 sldIdLst 顺序返回 (幻灯片部件名, 备注部件名或 None)。"""
+        targets = {rel_id: target for rel_id, _, target in self._relationships(_PRESENTATION_PART)}
+        slides: List[Tuple[str, str | None]] = []
+        with self._zip.open(_PRESENTATION_PART) as stream:
+            for _, elem in ET.iterparse(stream):
+                if elem.tag != _TAG_SLIDE_ID:
+                    continue
+                slide = targets[elem.get(_ATTR_REL_ID)]
+                notes = next(
+                    (target for _, rel_type, target in self._relationships(slide) if rel_type == _NOTES_REL_TYPE),
+                    None,
+                )
+                slides.append((slide, notes if notes in self._zip.NameToInfo else None))
+        return slides
+
+    def _iter_paragraphs(self, part: str, skip_fields: bool = False) -> Iterator[str]:
+        """增量解析部件 XML，逐段产出 a:t 文本（a:br 记为换行），已处理的段落元素随即清空。"""
+        runs: List[str] = []
+        field_depth = 0
+        with self._zip.open(part) as stream:
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                tag = elem.tag
+                if tag == _TAG_FIELD:
+                    field_depth += 1 if event == "start" else -1
+                    continue
+                if event != "end":
+                    continue
+                if tag == _TAG_TEXT:
+                    if not (skip_fields and field_depth):
+                        runs.append(elem.text or "")
+                elif tag == _TAG_BREAK:
+                    runs.append("\n")
+                elif tag == _TAG_PARAGRAPH:
+                    yield "".join(runs)
+                    runs = []
+                    elem.clear()
+
+    def iter_texts(self, start: int = 0, end: int | None = None) -> Iterator[str]:
+        """逐张产出 [start, end) 区间内的幻灯片文本（含备注，备注中的页码等字段不计入）。
+        作用: 某张幻灯片解析失败时抛出 PptxFormatError，此前各张已完整产出，调用方可从失败的一张起回退。
+        """
+        for slide, notes in self.slides[start:end]:
+            try:
+                lines = list(self._iter_paragraphs(slide))
+                if notes is not None:
+                    lines.extend(line for line in self._iter_paragraphs(notes, skip_fields=True) if line.strip())
+            except (KeyError, ET.ParseError, zipfile.BadZipFile) as exc:
+                raise PptxFormatError(f"{slide}: {exc}") from exc
+            yield "\n".join(lines)
@@ -0,0 +1,154 @@
+"""
+模块: services.document_service.progress
+职责: 在 Redis 中维护文档状态缓存与处理进度（状态、阶段、已解析页数/总页数），每次变更经 pub/sub 推送快照。
+输入: 文档ID、状态、阶段名、页数。
+输出: STAGES, STREAM_END_STATUSES, record_stage, advance_pages, cache_status（Worker 侧，同步）；
+      get_cached_status, get_cached_snapshots, cache_status_async, cache_statuses_async, backfill_status_async,
+      status_subscription, next_status_event（API 侧，异步）。
+"""
+
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from redis.asyncio.client import PubSub
+
+from common.cache.redis_client import get_redis_client, get_async_redis_client
+from common.config.settings import settings
+
+
+# 分阶段处理流水线的阶段顺序
+STAGES = ("fetch", "parse", "extract", "persist_sql", "persist_graph", "done")
+# 状态流在文档进入终态后结束：failed 只在重试耗尽后写入，不会再自行恢复
+STREAM_END_STATUSES = frozenset({"ready", "failed"})
+STATUS_KEY = "doc:status:{document_id}"
+EVENTS_CHANNEL = "doc:events:{document_id}"
+
+
+def _key(document_id: str) -> str:
+    return STATUS_KEY.format(document_id=document_id)
+
+
+def _channel(document_id: str) -> str:
+    return EVENTS_CHANNEL.format(document_id=document_id)
+
+
+def _update(document_id: str, fields: Dict[str, str | int], incr_pages: int = 0) -> None:
+    """写入字段（可选累加已解析页数），刷新过期时间并发布最新快照。"""
+    key = _key(document_id)
+    client = get_redis_client()
+    pipe = client.pipeline()
+    if incr_pages:
+        pipe.hincrby(key, "pagesDone", incr_pages)
+    pipe.hset(key, mapping={**fields, "updatedAt": int(time.time())})
+    pipe.expire(key, settings.docProgressTtlSeconds)
+    pipe.hgetall(key)
+    snapshot = pipe.execute()[-1]
+    client.publish(_channel(document_id), json.dumps(snapshot, ensure_ascii=False))
+
+
+def record_stage(document_id: str, stage: str, pages_total: int | None = None) -> None:
+    """记录文档进入某一阶段，可同时写入总页数。
+    输入: 文档ID、阶段名、可选总页数。
+    输出: None。
+    作用: 供状态查询与状态流展示；键在 docProgressTtlSeconds 后过期。
+    """
+    fields: Dict[str, str | int] = {"stage": stage}
+    if pages_total is not None:
+        fields["pagesTotal"] = pages_total
+        fields["pagesDone"] = 0
+    _update(document_id, fields)
+
+
+def advance_pages(document_id: str, pages: int) -> None:
+    """已解析页数增加 pages（并行解析的各页区间子任务可并发累加）。"""
+    _update(document_id, {}, incr_pages=pages)
+
+
+def cache_status(document_id: str, status: str, knowledge_graph_id: str | None = None) -> None:
+    """数据库状态变更提交后同步写入状态缓存并推送事件（Worker 侧）。"""
+    fields: Dict[str, str | int] = {"status": status}
+    if knowledge_graph_id is not None:
+        fields["knowledgeGraphId"] = knowledge_graph_id
+    _update(document_id, fields)
+
+
+async def get_cached_status(document_id: str) -> Dict[str, str] | None:
+    """读取状态缓存；未缓存状态（仅有进度或无记录）时返回 None，由调用方回源数据库。"""
+    snapshot = await get_async_redis_client().hgetall(_key(document_id))
+    return snapshot if "status" in snapshot else None
+
+
+async def cache_status_async(
+    document_id: str,
+    status: str,
+    knowledge_graph_id: str | None = None,
+    reset_progress: bool = False,
+) -> None:
+    """API 侧状态变更：提交数据库事务（含发件箱任务）后立即写入缓存并推送事件；
+    任务需经中继轮询投递后才开始执行，不会覆盖 Worker 的后续状态。
+    reset_progress 为 True 时清除上一轮处理遗留的阶段与页数（重新处理修订版时使用）。
+    """
+    key = _key(document_id)
+    fields: Dict[str, str | int] = {"status": status, "updatedAt": int(time.time())}
+    if knowledge_graph_id is not None:
+        fields["knowledgeGraphId"] = knowledge_graph_id
+    client = get_async_redis_client()
+    async with client.pipeline() as pipe:
+        if reset_progress:
+            pipe.hdel(key, "stage", "pagesDone", "pagesTotal")
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, settings.docProgressTtlSeconds)
+        pipe.hgetall(key)
+        snapshot = (await pipe.execute())[-1]
+    await client.publish(_channel(document_id), json.dumps(snapshot, ensure_ascii=False))
+
+
+async def cache_statuses_async(document_ids: List[str], status: str) -> None:
+    """批量写入一组新文档的状态缓存并推送事件，单次往返（批量上传提交后调用）。"""
+    now = int(time.time())
+    async with get_async_redis_client().pipeline(transaction=False) as pipe:
+        for document_id in document_ids:
+            key = _key(document_id)
+            pipe.hset(key, mapping={"status": status, "updatedAt": now})
+            pipe.expire(key, settings.docProgressTtlSeconds)
+            pipe.publish(_channel(document_id), json.dumps({"status": status, "updatedAt": now}))
+        await pipe.execute()
+
+
+async def get_cached_snapshots(document_ids: List[str]) -> List[Dict[str, str]]:
+    """批量读取状态快照（与 document_ids 顺序一致，无记录时为空字典），单次往返。"""
+    async with get_async_redis_client().pipeline(transaction=False) as pipe:
+        for document_id in document_ids:
+            pipe.hgetall(_key(document_id))
+        return await pipe.execute()
+
+
+async def backfill_status_async(document_id: str, status: str, knowledge_graph_id: str | None = None) -> None:
+    """缓存未命中回源数据库后回填；仅在字段不存在时写入，不会覆盖期间 Worker 写入的更新状态。"""
+    key = _key(document_id)
+    async with get_async_redis_client().pipeline() as pipe:
+        pipe.hsetnx(key, "status", status)
+        if knowledge_graph_id is not None:
+            pipe.hsetnx(key, "knowledgeGraphId", knowledge_graph_id)
+        pipe.expire(key, settings.docProgressTtlSeconds)
+        await pipe.execute()
+
+
+@asynccontextmanager
+async def status_subscription(document_id: str) -> AsyncIterator[PubSub]:
+    """订阅文档状态事件频道，退出时取消订阅并释放连接。"""
+    pubsub = get_async_redis_client().pubsub()
+    await pubsub.subscribe(_channel(document_id))
+    try:
+        yield pubsub
+    finally:
+        await pubsub.unsubscribe(_channel(document_id))
+        await pubsub.aclose()
+
+
+async def next_status_event(pubsub: PubSub, timeout: float) -> Dict[str, str] | None:
+    """等待下一条状态快照；timeout 秒内无事件时返回 None（调用方据此发送心跳）。"""
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+    return json.loads(message["data"]) if message is not None else None
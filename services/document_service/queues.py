@@ -0,0 +1,24 @@
+"""
+模块: services.document_service.queues
+职责: 按文件大小与类型为文档处理任务选择 Celery 队列。
+输入: 文件字节数、文件名或对象键名。
+输出: document_queue。
+"""
+
+from pathlib import PurePosixPath
+
+from common.config.settings import settings
+from common.mq.celery_app import DOC_QUEUE_SMALL, DOC_QUEUE_LARGE
+
+
+def document_queue(file_size: int | None, file_name: str) -> str:
+    """返回文档处理任务应投递的队列。
+    输入: 文件字节数（未知时为 None）、文件名或对象键名。
+    输出: DOC_QUEUE_SMALL 或 DOC_QUEUE_LARGE。
+    作用: PDF 文本量随体积增长，阈值较低；演示文稿体积主要来自媒体，阈值较高。大小未知时按小文档处理。
+    """
+    if file_size is None:
+        return DOC_QUEUE_SMALL
+    suffix = PurePosixPath(file_name).suffix.lower()
+    threshold = settings.docLargePdfBytes if suffix == ".pdf" else settings.docLargeSlidesBytes
+    return DOC_QUEUE_LARGE if file_size >= threshold else DOC_QUEUE_SMALL
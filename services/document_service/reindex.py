@@ -0,0 +1,182 @@
+"""
+模块: services.document_service.reindex
+职责: 全量重建索引：按键集分页遍历 documents，扇出到本地进程池或 Celery 队列，
+      以检查点支持断点续跑，失败文档记入独立集合并在续跑时优先重试，实时报告吞吐（docs/s）。
+输入: 命令行参数（运行ID、模式、并发、分页大小）。
+输出: 无（重建 document_concepts、document_relations 与文档图谱子图）。
+用法: python -m services.document_service.reindex --run-id 2026-10-upgrade --mode celery
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Tuple
+
+from celery import group
+from sqlalchemy import select
+
+from common.cache.redis_client import get_redis_client
+from common.config.settings import settings
+from common.mq.celery_app import DOC_QUEUE_LARGE
+from services.document_service.models import Document
+from services.document_service.worker import reindex_document, reindex_document_task
+from services.document_service.worker_db import get_worker_session_maker, run_async
+
+
+REINDEX_CHECKPOINT_KEY = "reindex:{run_id}"
+REINDEX_FAILED_KEY = "reindex:{run_id}:failed"  # 本次运行中重建失败的文档ID集合，续跑时先重试
+REINDEX_STATUSES = ("ready", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_page(after_id: str, limit: int) -> List[Tuple[str, str]]:
+    """键集分页读取一批待重建文档。
+    输入: 上一批最后一个文档ID（首批为空串）、批大小。
+    输出: [(document_id, object_path)]，按 id 升序。
+    作用: WHERE id > :after ORDER BY id LIMIT :n 走主键索引，深分页不退化。
+    """
+
+    async def _do_fetch() -> List[Tuple[str, str]]:
+        async with get_worker_session_maker()() as session:
+            result = await session.execute(
+                select(Document.id, Document.objectPath)
+                .where(Document.id > after_id, Document.status.in_(REINDEX_STATUSES))
+                .order_by(Document.id)
+                .limit(limit)
+            )
+            return [(row.id, row.objectPath) for row in result]
+
+    return run_async(_do_fetch())
+
+
+def fetch_documents(document_ids: Sequence[str]) -> List[Tuple[str, str]]:
+    """按ID读取待重试文档（已删除或不再处于可重建状态的文档不返回）。
+    输入: 文档ID序列。
+    输出: [(document_id, object_path)]，按 id 升序。
+    """
+
+    async def _do_fetch() -> List[Tuple[str, str]]:
+        async with get_worker_session_maker()() as session:
+            result = await session.execute(
+                select(Document.id, Document.objectPath)
+                .where(Document.id.in_(list(document_ids)), Document.status.in_(REINDEX_STATUSES))
+                .order_by(Document.id)
+            )
+            return [(row.id, row.objectPath) for row in result]
+
+    return run_async(_do_fetch())
+
+
+def _reindex_one(item: Tuple[str, str]) -> bool:
+    """本地进程池中的单文档重建；失败记录日志，不中断整批。"""
+    try:
+        reindex_document(*item)
+        return True
+    except Exception:
+        logger.exception("reindex %s failed", item[0])
+        return False
+
+
+def _run_local(pool: ProcessPoolExecutor, batch: List[Tuple[str, str]]) -> List[str]:
+    return [doc_id for (doc_id, _), ok in zip(batch, pool.map(_reindex_one, batch)) if not ok]
+
+
+def _run_celery(batch: List[Tuple[str, str]]) -> List[str]:
+    # 批量重建为后台作业，进入大文档队列，不占用小课件的处理进程
+    result = group(reindex_document_task.s(doc_id, path) for doc_id, path in batch).apply_async(queue=DOC_QUEUE_LARGE)
+    outcomes = result.get(propagate=False, disable_sync_subtasks=False)
+    failed = []
+    for (doc_id, _), outcome in zip(batch, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("reindex %s failed: %r", doc_id, outcome)
+            failed.append(doc_id)
+    return failed
+
+
+def run_reindex(run_id: str, mode: str, workers: int, batch_size: int, restart: bool) -> None:
+    """执行（或续跑）一次全量重建。
+    输入: 运行ID、模式 local|celery、进程数、批大小、是否忽略已有检查点。
+    输出: None。
+    作用: 每批全部完成后才推进检查点，中断后以相同 run-id 重跑即从最后完成的批次之后继续；
+          失败的文档ID记入 REINDEX_FAILED_KEY，重跑时先重试这些文档，成功后移出集合。
+          吞吐只统计重建成功的文档。
+    """
+    checkpoint = get_redis_client()
+    key = REINDEX_CHECKPOINT_KEY.format(run_id=run_id)
+    failed_key = REINDEX_FAILED_KEY.format(run_id=run_id)
+    if restart:
+        checkpoint.delete(key, failed_key)
+    state = checkpoint.hgetall(key)
+    last_id = state.get("lastId", "")
+    done = int(state.get("done", 0))
+
+    # spawn 启动子进程：父进程已持有数据库连接池，fork 会让子进程共享同一批连接
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        if mode == "local"
+        else None
+    )
+    started = time.monotonic()
+    succeeded_this_run = 0
+
+    def run_batch(batch: List[Tuple[str, str]]) -> int:
+        batch_failed = _run_local(pool, batch) if pool is not None else _run_celery(batch)
+        with checkpoint.pipeline(transaction=True) as pipe:
+            pipe.srem(failed_key, *[doc_id for doc_id, _ in batch])
+            if batch_failed:
+                pipe.sadd(failed_key, *batch_failed)
+            pipe.execute()
+        return len(batch) - len(batch_failed)
+
+    def report(label: str) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        logger.info(
+            "reindex %s %s done=%d failed=%d lastId=%s rate=%.2f docs/s",
+            run_id, label, done, checkpoint.scard(failed_key), last_id, succeeded_this_run / elapsed,
+        )
+
+    try:
+        retry_ids = sorted(checkpoint.smembers(failed_key))
+        for start in range(0, len(retry_ids), batch_size):
+            chunk = retry_ids[start:start + batch_size]
+            batch = fetch_documents(chunk)
+            gone = set(chunk) - {doc_id for doc_id, _ in batch}
+            if gone:
+                checkpoint.srem(failed_key, *gone)
+            if batch:
+                succeeded_this_run += run_batch(batch)
+            report("retry")
+
+        while True:
+            batch = fetch_page(last_id, batch_size)
+            if not batch:
+                break
+            succeeded_this_run += run_batch(batch)
+
+            last_id = batch[-1][0]
+            done += len(batch)
+            checkpoint.hset(key, mapping={"lastId": last_id, "done": done})
+            report("scan")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    checkpoint.hset(key, "finished", int(time.time()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KeShang document corpus re-index")
+    parser.add_argument("--run-id", required=True, help="运行标识，相同标识重跑时从检查点续跑")
+    parser.add_argument("--mode", choices=("local", "celery"), default="celery", help="本地进程池或 Celery 队列")
+    parser.add_argument("--workers", type=int, default=settings.reindexWorkers, help="本地模式进程数")
+    parser.add_argument("--batch-size", type=int, default=settings.reindexBatchSize, help="每批文档数（检查点粒度）")
+    parser.add_argument("--restart", action="store_true", help="忽略已有检查点与失败集合，从头开始")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.appLogLevel, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run_reindex(args.run_id, args.mode, args.workers, args.batch_size, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,75 +5,482 @@
 输出: 文档ID、处理状态、图谱ID等。
 """
 
+import json
+import time
 import uuid
-from pathlib import Path
+from pathlib import PurePosixPath
+from typing import AsyncIterator, Dict, List
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
-from common.db.postgres import async_session
-from common.storage.minio_client import get_minio_client, ensure_bucket, put_object_from_path
+from common.db.postgres import async_session, async_read_session, is_replica_session, primary_session
+from common.config.settings import settings
+from common.storage.minio_client import (
+    get_minio_client,
+    ensure_bucket,
+    put_object_stream,
+    presigned_put_url,
+    stat_object_size,
+)
 from common.security.deps import jwt_auth
+from common.graph.neo4j_writer import clone_document_mentions, count_document_mentions
+from services.document_service.dedup import find_ready_duplicate, count_document_concepts, reuse_duplicate
 from services.document_service.models import Document
-from services.document_service.schemas import UploadResponse, StatusResponse
-from services.document_service.worker import extract_text_task
+from services.document_service.queues import document_queue
+from services.document_service.batch import remove_stored_files, store_batch_files
+from services.document_service.progress import (
+    STREAM_END_STATUSES,
+    get_cached_status,
+    get_cached_snapshots,
+    cache_status_async,
+    cache_statuses_async,
+    backfill_status_async,
+    status_subscription,
+    next_status_event,
+)
+from services.document_service.schemas import (
+    UploadResponse,
+    StatusResponse,
+    PresignRequest,
+    PresignResponse,
+    BatchDocument,
+    BatchUploadResponse,
+    BatchStatusResponse,
+)
+from services.document_service.dispatch import EXTRACT_TEXT_TASK, REVISE_TASK
+from services.document_service.outbox import outbox_entry, enqueue_tasks
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
+def _uploader_id(claims: dict) -> int | None:
+    """从 JWT claims 提取上传者ID。
+    输入: claims。
+    输出: 整数用户ID；sub 非数字时返回 None。
+    作用: 统一上传类接口的归属解析。
+    """
+    sub = str(claims.get("sub", "0"))
+    return int(sub) if sub.isdigit() else None
+
+
+def _safe_file_name(file_name: str | None) -> str:
+    """取客户端文件名的最后一段，拒绝空名与 "."/".."。
+    输入: 客户端提供的文件名（可能包含目录或 ../ 片段）。
+    输出: 可直接拼入对象键名的文件名。
+    作用: 防止对象键名越出 uploads/<document_id>/ 前缀。
+    """
+    name = PurePosixPath(file_name or "").name
+    if name in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid file")
+    return name
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
     session: AsyncSession = Depends(async_session),
     claims: dict = Depends(jwt_auth),
 ) -> UploadResponse:
-    """上传课件文件，存入 MinIO 并创建 DB 记录，同时触发解析任务。
+    """上传课件文件，流式存入 MinIO 并创建 DB 记录，同时登记解析任务。
     输入: UploadFile (PPT/PDF)。
-    输出: UploadResponse(documentId, status)。
-    作用: 串起对象存储、数据库与 Celery 任务。
+    输出: UploadResponse(documentId, status, sha256)。
+    作用: 串起对象存储、数据库与 Celery 任务；按分片转存，内存占用与文件大小无关。
+          解析任务与文档记录在同一事务内写入发件箱，由 outbox_relay 投递，请求不等待 Broker；
+          按文件大小与类型投递到小/大文档队列，大文档不阻塞小课件。
+          内容哈希命中已处理文档时直接复用结果并返回 ready，不再触发解析任务。
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Invalid file")
-
+    file_name = _safe_file_name(file.filename)
     document_id = str(uuid.uuid4())
-    object_name = f"uploads/{document_id}/{file.filename}"
-
-    tmp_path = Path(".build") / document_id
-    tmp_path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_file = tmp_path
-    content = await file.read()
-    tmp_file.write_bytes(content)
+    object_name = f"uploads/{document_id}/{file_name}"
 
     client = get_minio_client()
     ensure_bucket(client)
-    put_object_from_path(client, tmp_file, object_name)
+    # MinIO SDK 为同步阻塞调用，放入线程池避免阻塞事件循环
+    await file.seek(0)
+    uploaded = await run_in_threadpool(
+        put_object_stream,
+        client,
+        file.file,
+        object_name,
+        file.content_type or "application/octet-stream",
+    )
 
     doc = Document(
         id=document_id,
-        uploaderId=int(claims.get("sub", 0)) if str(claims.get("sub", "0")).isdigit() else None,
-        fileName=file.filename,
+        uploaderId=_uploader_id(claims),
+        fileName=file_name,
         objectPath=object_name,
         status="processing",
         knowledgeGraphId=None,
+        fileSize=uploaded.size,
+        contentHash=uploaded.sha256,
     )
     session.add(doc)
+
+    duplicate = await find_ready_duplicate(session, uploaded.sha256)
+    # 源文档图谱链接不完整（入图确认机制之前标记 ready 的历史数据）时不复用，按新文档处理
+    if duplicate is not None and (
+        await run_in_threadpool(count_document_mentions, duplicate.id)
+        >= await count_document_concepts(session, duplicate.id)
+    ):
+        await run_in_threadpool(clone_document_mentions, duplicate.id, document_id)
+        await session.flush()
+        knowledge_graph_id = duplicate.knowledgeGraphId
+        await reuse_duplicate(session, duplicate, document_id)
+        await cache_status_async(document_id, "ready", knowledge_graph_id)
+        return UploadResponse(documentId=document_id, status="ready", sha256=uploaded.sha256)
+
+    await enqueue_tasks(session, [outbox_entry(EXTRACT_TEXT_TASK, object_name, queue=document_queue(uploaded.size, object_name))])
     await session.commit()
+    await cache_status_async(document_id, "processing")
 
-    extract_text_task.delay(object_name)
+    return UploadResponse(documentId=document_id, status="processing", sha256=uploaded.sha256)
 
-    return UploadResponse(documentId=document_id, status="processing")
 
+@router.post("/batches", response_model=BatchUploadResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    session: AsyncSession = Depends(async_session),
+    claims: dict = Depends(jwt_auth),
+) -> BatchUploadResponse:
+    """批量上传课件（多个文件或 zip 压缩包），整批登记并触发解析。
+    输入: 多个 UploadFile（PPT/PDF 或包含课件的 .zip）。
+    输出: BatchUploadResponse(batchId, documents, skipped)。
+    作用: 逐个流式转存后在单个事务内插入全部文档记录与各自的发件箱任务，各文档仍按大小路由队列。
+          内容去重由 Worker 在下载后完成；事务提交失败时删除已转存的对象。
+    """
+    client = get_minio_client()
+    ensure_bucket(client)
+    for file in files:
+        await file.seek(0)
+    # 转存与 zip 展开均为同步阻塞操作，整体放入线程池
+    result = await run_in_threadpool(store_batch_files, client, [(file.filename or "", file.file) for file in files])
+    if not result.stored:
+        raise HTTPException(status_code=400, detail="No supported files")
 
-@router.get("/{document_id}/status", response_model=StatusResponse)
-async def get_document_status(document_id: str, session: AsyncSession = Depends(async_session)) -> StatusResponse:
-    """查询文档处理状态（从数据库读取）。
+    batch_id = str(uuid.uuid4())
+    uploader_id = _uploader_id(claims)
+    try:
+        session.add_all([
+            Document(
+                id=item.document_id,
+                uploaderId=uploader_id,
+                fileName=item.file_name,
+                objectPath=item.object_name,
+                status="processing",
+                knowledgeGraphId=None,
+                fileSize=item.size,
+                contentHash=item.sha256,
+                batchId=batch_id,
+            )
+            for item in result.stored
+        ])
+        await enqueue_tasks(session, [
+            outbox_entry(EXTRACT_TEXT_TASK, item.object_name, queue=document_queue(item.size, item.object_name))
+            for item in result.stored
+        ])
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        await run_in_threadpool(remove_stored_files, client, result.stored)
+        raise
+    await cache_statuses_async([item.document_id for item in result.stored], "processing")
+
+    return BatchUploadResponse(
+        batchId=batch_id,
+        documents=[
+            BatchDocument(documentId=item.document_id, fileName=item.file_name, status="processing", sha256=item.sha256)
+            for item in result.stored
+        ],
+        skipped=result.skipped,
+    )
+
+
+@router.get("/batches/{batch_id}/status", response_model=BatchStatusResponse)
+async def get_batch_status(
+    batch_id: str,
+    session: AsyncSession = Depends(async_read_session),
+    claims: dict = Depends(jwt_auth),
+) -> BatchStatusResponse:
+    """查询批次整体进度。
+    输入: batch_id。
+    输出: BatchStatusResponse（各状态计数、页数合计与逐文档状态）。
+    作用: 一次索引查询读取整批文档状态（只读副本，未命中时回源主库），页数进度从 Redis 批量读取。
+    """
+    query = (
+        select(Document.id, Document.fileName, Document.status)
+        .where(Document.batchId == batch_id, Document.uploaderId == _uploader_id(claims))
+    )
+    rows = (await session.execute(query)).all()
+    if not rows and is_replica_session(session):
+        async with primary_session() as primary:
+            rows = (await primary.execute(query)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    snapshots = await get_cached_snapshots([row.id for row in rows])
+    counts: Dict[str, int] = {}
+    pages_done = pages_total = 0
+    for row, snapshot in zip(rows, snapshots):
+        counts[row.status] = counts.get(row.status, 0) + 1
+        pages_done += int(snapshot.get("pagesDone", 0))
+        pages_total += int(snapshot.get("pagesTotal", 0))
+    return BatchStatusResponse(
+        batchId=batch_id,
+        total=len(rows),
+        statusCounts=counts,
+        pagesDone=pages_done,
+        pagesTotal=pages_total,
+        documents=[BatchDocument(documentId=row.id, fileName=row.fileName, status=row.status) for row in rows],
+    )
+
+
+@router.post("/presign", response_model=PresignResponse)
+async def presign_upload(
+    payload: PresignRequest,
+    session: AsyncSession = Depends(async_session),
+    claims: dict = Depends(jwt_auth),
+) -> PresignResponse:
+    """直传第一步：登记文档并签发预签名 PUT URL。
+    输入: PresignRequest(fileName, fileSize)。
+    输出: PresignResponse(documentId, uploadUrl, expiresIn)。
+    作用: 文件字节由客户端直接写入对象存储，API 吞吐不再受文件大小影响；
+          超时未完成的登记由 upload_sweeper 标记为 failed 并删除已上传的对象。
+    """
+    file_name = _safe_file_name(payload.fileName)
+    document_id = str(uuid.uuid4())
+    object_name = f"uploads/{document_id}/{file_name}"
+
+    client = get_minio_client()
+    ensure_bucket(client)
+    upload_url = await run_in_threadpool(presigned_put_url, object_name)
+
+    doc = Document(
+        id=document_id,
+        uploaderId=_uploader_id(claims),
+        fileName=file_name,
+        objectPath=object_name,
+        status="uploading",
+        knowledgeGraphId=None,
+        fileSize=payload.fileSize,
+    )
+    session.add(doc)
+    await session.commit()
+    await cache_status_async(document_id, "uploading")
+
+    return PresignResponse(documentId=document_id, uploadUrl=upload_url, expiresIn=settings.minioPresignExpireSeconds)
+
+
+@router.post("/{document_id}/complete", response_model=UploadResponse)
+async def complete_upload(
+    document_id: str,
+    session: AsyncSession = Depends(async_session),
+    claims: dict = Depends(jwt_auth),
+) -> UploadResponse:
+    """直传第二步：校验对象已上传且大小一致，随后触发解析任务。
     输入: document_id。
-    输出: StatusResponse。
-    作用: 前端轮询使用。
+    输出: UploadResponse(documentId, status)。
+    作用: 完成回调；重复调用对已进入处理的文档幂等返回当前状态。
+          状态以条件更新（仅 uploading -> processing）切换，并发的完成回调只有一个会登记解析任务。
+    """
+    result = await session.execute(select(Document).where(Document.id == document_id))
+    doc = result.scalar_one_or_none()
+    if doc is None or doc.uploaderId != _uploader_id(claims):
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc.status != "uploading":
+        return UploadResponse(documentId=doc.id, status=doc.status)
+
+    client = get_minio_client()
+    size = await run_in_threadpool(stat_object_size, client, doc.objectPath)
+    if size is None:
+        raise HTTPException(status_code=409, detail="Object not uploaded yet")
+    if doc.fileSize is not None and size != doc.fileSize:
+        raise HTTPException(status_code=409, detail="Uploaded size mismatch")
+
+    claimed = await session.execute(
+        update(Document)
+        .where(Document.id == document_id, Document.status == "uploading")
+        .values(status="processing", fileSize=size)
+        .returning(Document.id)
+    )
+    if claimed.scalar_one_or_none() is None:
+        await session.rollback()
+        current = await session.execute(select(Document.status).where(Document.id == document_id))
+        return UploadResponse(documentId=document_id, status=current.scalar_one())
+    await enqueue_tasks(session, [outbox_entry(EXTRACT_TEXT_TASK, doc.objectPath, queue=document_queue(size, doc.objectPath))])
+    await session.commit()
+    await cache_status_async(document_id, "processing")
+
+    return UploadResponse(documentId=doc.id, status="processing")
+
+
+@router.post("/{document_id}/revise", response_model=UploadResponse)
+async def revise_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(async_session),
+    claims: dict = Depends(jwt_auth),
+) -> UploadResponse:
+    """上传已有文档的修订版，按页指纹增量重新处理。
+    输入: document_id、UploadFile (PPT/PDF)。
+    输出: UploadResponse(documentId, status, sha256)。
+    作用: 修订版存为 uploads/<document_id>/v<version>/<file_name>，版本号递增；
+          先以条件更新（非 uploading/processing 且版本号未变）占用新版本号，并发的修订只有一个成功，其余返回 409；
+          内容与当前版本一致或上传失败时撤销占用并删除对象，不触发任务。
     """
+    file_name = _safe_file_name(file.filename)
     result = await session.execute(select(Document).where(Document.id == document_id))
     doc = result.scalar_one_or_none()
+    if doc is None or doc.uploaderId != _uploader_id(claims):
+        raise HTTPException(status_code=404, detail="Document not found")
+    previous_status = doc.status
+    previous_version = doc.version
+    previous_hash = doc.contentHash
+
+    version = previous_version + 1
+    claimed = await session.execute(
+        update(Document)
+        .where(
+            Document.id == document_id,
+            Document.status.not_in(("uploading", "processing")),
+            Document.version == previous_version,
+        )
+        .values(status="processing", version=version)
+        .returning(Document.id)
+    )
+    if claimed.scalar_one_or_none() is None:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Document is being processed")
+    await session.commit()
+
+    object_name = f"uploads/{document_id}/v{version}/{file_name}"
+    client = get_minio_client()
+    try:
+        ensure_bucket(client)
+        await file.seek(0)
+        uploaded = await run_in_threadpool(
+            put_object_stream,
+            client,
+            file.file,
+            object_name,
+            file.content_type or "application/octet-stream",
+        )
+    except Exception:
+        await _release_revision(session, document_id, version, previous_status)
+        raise
+    if uploaded.sha256 == previous_hash:
+        await run_in_threadpool(client.remove_object, settings.minioBucket, object_name)
+        await _release_revision(session, document_id, version, previous_status)
+        return UploadResponse(documentId=document_id, status=previous_status, sha256=uploaded.sha256)
+
+    await session.execute(
+        update(Document)
+        .where(Document.id == document_id)
+        .values(fileName=file_name, objectPath=object_name, fileSize=uploaded.size, contentHash=uploaded.sha256)
+    )
+    await enqueue_tasks(session, [outbox_entry(REVISE_TASK, object_name, queue=document_queue(uploaded.size, object_name))])
+    await session.commit()
+    await cache_status_async(document_id, "processing", reset_progress=True)
+
+    return UploadResponse(documentId=document_id, status="processing", sha256=uploaded.sha256)
+
+
+async def _release_revision(session: AsyncSession, document_id: str, version: int, status: str) -> None:
+    """撤销 revise_document 对新版本号的占用。
+    输入: 会话、document_id、占用的版本号、占用前的状态。
+    输出: 无。
+    作用: 仅当记录仍停留在本次占用（该版本号且 processing）时恢复原状态与版本号。
+    """
+    await session.rollback()
+    await session.execute(
+        update(Document)
+        .where(Document.id == document_id, Document.version == version, Document.status == "processing")
+        .values(status=status, version=version - 1)
+    )
+    await session.commit()
+
+
+async def _load_status(document_id: str, session: AsyncSession) -> Dict[str, str]:
+    """读取文档状态快照：优先 Redis 状态缓存，未命中时回源数据库并回填缓存。
+    输入: document_id、会话。
+    输出: 状态快照字典（status、knowledgeGraphId 及可选进度字段）。
+    作用: 处理期间的高频查询不再访问 Postgres；只读副本未命中（复制延迟）时回源主库，刚上传的文档不会误报 404。
+    """
+    snapshot = await get_cached_status(document_id)
+    if snapshot is not None:
+        return snapshot
+    query = select(Document).where(Document.id == document_id)
+    doc = (await session.execute(query)).scalar_one_or_none()
+    if doc is None and is_replica_session(session):
+        async with primary_session() as primary:
+            doc = (await primary.execute(query)).scalar_one_or_none()
     if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return StatusResponse(documentId=doc.id, status=doc.status, knowledgeGraphId=doc.knowledgeGraphId)
+    await backfill_status_async(doc.id, doc.status, doc.knowledgeGraphId)
+    snapshot = {"status": doc.status}
+    if doc.knowledgeGraphId is not None:
+        snapshot["knowledgeGraphId"] = doc.knowledgeGraphId
+    return snapshot
+
+
+@router.get("/{document_id}/status", response_model=StatusResponse)
+async def get_document_status(document_id: str, session: AsyncSession = Depends(async_read_session)) -> StatusResponse:
+    """查询文档处理状态（读取 Redis 状态缓存，未命中时回源数据库）。
+    输入: document_id。
+    输出: StatusResponse。
+    作用: 兼容轮询的前端；新前端应改用 /events 状态流。
+    """
+    snapshot = await _load_status(document_id, session)
+    return StatusResponse(
+        documentId=document_id,
+        status=snapshot["status"],
+        knowledgeGraphId=snapshot.get("knowledgeGraphId"),
+        stage=snapshot.get("stage"),
+        pagesDone=snapshot.get("pagesDone"),
+        pagesTotal=snapshot.get("pagesTotal"),
+    )
+
+
+def _sse(snapshot: Dict[str, str]) -> str:
+    return f"event: status\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+
+@router.get("/{document_id}/events")
+async def stream_document_status(document_id: str, session: AsyncSession = Depends(async_read_session)) -> StreamingResponse:
+    """以 Server-Sent Events 推送文档状态与处理进度。
+    输入: document_id。
+    输出: text/event-stream，每个 status 事件携带完整状态快照。
+    作用: 订阅 Worker 经 Redis pub/sub 发布的状态事件，替代轮询；文档进入终态（ready/failed）后结束，
+          空闲时发送心跳注释；存活超过 docStatusStreamMaxSeconds 时同样结束，避免连接无限占用订阅。
+    """
+    initial = await _load_status(document_id, session)
+
+    async def _events() -> AsyncIterator[str]:
+        async with status_subscription(document_id) as pubsub:
+            # 订阅后再读一次缓存，覆盖首次读取与订阅之间发生的变更
+            snapshot = await get_cached_status(document_id) or initial
+            yield _sse(snapshot)
+            if snapshot.get("status") in STREAM_END_STATUSES:
+                return
+            deadline = time.monotonic() + settings.docStatusStreamMaxSeconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = await next_status_event(pubsub, min(settings.docStatusHeartbeatSeconds, remaining))
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+                if event.get("status") in STREAM_END_STATUSES:
+                    return
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -5,25 +5,89 @@
 输出: 结构化响应。
 """
 
-from pydantic import BaseModel
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
 
 
 class UploadResponse(BaseModel):
     """上传响应体。
     输入: 无。
-    输出: documentId 与初始状态。
-    作用: 前端据此轮询状态。
+    输出: documentId、初始状态与内容摘要。
+    作用: 前端据此轮询状态，并可用 sha256 校验传输完整性。
     """
     documentId: str
     status: str
+    sha256: str | None = None
 
 
 class StatusResponse(BaseModel):
     """状态查询响应体。
     输入: 无。
-    输出: 状态与可选知识图谱ID。
-    作用: 前端判断是否可进入课堂互动。
+    输出: 状态、可选知识图谱ID与处理进度（阶段、已解析页数/总页数）。
+    作用: 前端判断是否可进入课堂互动并展示处理进度。
     """
     documentId: str
     status: str
     knowledgeGraphId: str | None = None
+    stage: str | None = None
+    pagesDone: int | None = None
+    pagesTotal: int | None = None
+
+
+class PresignRequest(BaseModel):
+    """直传预签名请求体。
+    输入: fileName, fileSize。
+    输出: 无（用于请求校验）。
+    作用: 预先登记文档并声明大小，供完成回调校验。
+    """
+    fileName: str = Field(min_length=1, max_length=255)
+    fileSize: int = Field(gt=0)
+
+
+class PresignResponse(BaseModel):
+    """直传预签名响应体。
+    输入: 无。
+    输出: documentId、预签名 PUT URL 与有效期。
+    作用: 客户端据此直接向对象存储上传，再调用 complete 接口。
+    """
+    documentId: str
+    uploadUrl: str
+    expiresIn: int
+
+
+class BatchDocument(BaseModel):
+    """批量上传中的单个文档。
+    输入: 无。
+    输出: documentId、文件名与状态。
+    作用: 前端据此展示每个课件的处理情况。
+    """
+    documentId: str
+    fileName: str
+    status: str
+    sha256: str | None = None
+
+
+class BatchUploadResponse(BaseModel):
+    """批量上传响应体。
+    输入: 无。
+    输出: batchId、已受理的文档列表与被跳过的文件名。
+    作用: 前端据此查询批次整体进度。
+    """
+    batchId: str
+    documents: List[BatchDocument]
+    skipped: List[str] = Field(default_factory=list)
+
+
+class BatchStatusResponse(BaseModel):
+    """批次状态响应体。
+    输入: 无。
+    输出: 文档总数、各状态计数、已解析页数/总页数合计与逐文档状态。
+    作用: 一次请求展示整批课件的处理进度。
+    """
+    batchId: str
+    total: int
+    statusCounts: Dict[str, int]
+    pagesDone: int
+    pagesTotal: int
+    documents: List[BatchDocument]
@@ -0,0 +1,182 @@
+"""
+模块: services.document_service.term_discovery
+职责: 基于后缀自动机的中文新词发现：在线线性构建，按频次、左右分支熵与内部凝固度（PMI）为候选打分。
+输入: 逐页文本（只取中文连续片段）。
+输出: SuffixAutomaton, TermDiscoverer。
+"""
+
+import math
+import re
+from array import array
+from typing import Dict, List, Tuple
+
+
+CJK_RUN_PATTERN = re.compile(r"[\u4e00-\u9fa5]{2,}")
+RUN_SEPARATOR = "\x00"
+TERM_MIN_LENGTH = 2
+TERM_MAX_LENGTH = 8
+TERM_MIN_FREQ = 3
+TERM_MIN_ENTROPY = 1.0
+TERM_MIN_PMI = 2.0
+
+
+class SuffixAutomaton:
+    """在线构建的后缀自动机。
+    作用: 状态数不超过 2n，构建摊还线性；每个状态代表一组 endpos 相同的子串，
+          其最长串的出现次数、右邻字符分布（转移）与左邻字符分布（后缀链接树子节点）均可直接读出。
+    结构: length/link/first_end/count 为紧凑整型数组，trans 为逐状态字符转移表。
+    """
+
+    def __init__(self) -> None:
+        self.length = array("l", [0])
+        self.link = array("l", [-1])
+        self.first_end = array("l", [-1])
+        self.count = array("l", [0])
+        self.trans: List[Dict[str, int]] = [{}]
+        self.last = 0
+        self.size = 0  # 已输入字符数
+
+    def _new_state(self, length: int, link: int, first_end: int, count: int, trans: Dict[str, int]) -> int:
+        self.length.append(length)
+        self.link.append(link)
+        self.first_end.append(first_end)
+        self.count.append(count)
+        self.trans.append(trans)
+        return len(self.trans) - 1
+
+    def extend(self, ch: str) -> None:
+        """追加一个字符。"""
+        length, link, trans = self.length, self.link, self.trans
+        pos = self.size
+        self.size += 1
+        cur = self._new_state(length[self.last] + 1, -1, pos, 1, {})
+        p = self.last
+        while p != -1 and ch not in trans[p]:
+            trans[p][ch] = cur
+            p = link[p]
+        if p == -1:
+            link[cur] = 0
+        else:
+            q = trans[p][ch]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = self._new_state(length[p] + 1, link[q], self.first_end[q], 0, dict(trans[q]))
+                while p != -1 and trans[p].get(ch) == q:
+                    trans[p][ch] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        self.last = cur
+
+    def finalize_counts(self) -> None:
+        """沿后缀链接按长度降序累加出现次数（计数排序，线性）。"""
+        max_len = max(self.length) if len(self.length) else 0
+        buckets: List[List[int]] = [[] for _ in range(max_len + 1)]
+        for state in range(1, len(self.trans)):
+            buckets[self.length[state]].append(state)
+        for size in range(max_len, 0, -1):
+            for state in buckets[size]:
+                self.count[self.link[state]] += self.count[state]
+
+    def occurrences(self, text: str) -> int:
+        """查询子串出现次数（需先 finalize_counts）。"""
+        state = 0
+        for ch in text:
+            state = self.trans[state].get(ch, -1)
+            if state == -1:
+                return 0
+        return self.count[state]
+
+
+class TermDiscoverer:
+    """中文新词发现器。
+    作用: 逐页吸收中文片段构建后缀自动机，文档结束时为每个状态的最长串打分，返回得分最高的候选词。
+    """
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self.sam = SuffixAutomaton()
+        self._chunks: List[str] = []
+        self._chars = 0  # 不含分隔符的中文字符数
+        self._full = False
+
+    @property
+    def saturated(self) -> bool:
+        """是否已达到 max_chars 上限（之后的页面不再参与新词统计）。"""
+        return self._full
+
+    def feed(self, page: str) -> None:
+        """吸收一页文本中的中文连续片段，片段之间以分隔符隔开；超过 max_chars 后不再吸收。"""
+        for match in CJK_RUN_PATTERN.finditer(page):
+            run = match.group()
+            if self._chars + len(run) > self.max_chars:
+                self._full = True
+                return
+            for ch in run:
+                self.sam.extend(ch)
+            self.sam.extend(RUN_SEPARATOR)
+            self._chunks.append(run)
+            self._chunks.append(RUN_SEPARATOR)
+            self._chars += len(run)
+
+    def top_terms(self, limit: int) -> List[Tuple[str, float]]:
+        """返回得分最高的候选词。
+        输入: 数量上限。
+        输出: [(词, 得分)]，得分 = 频次 × min(左熵, 右熵)，按得分降序。
+        作用: 过滤条件为频次、左右分支熵与最小切分点 PMI 均达到阈值。
+        """
+        if self._chars == 0:
+            return []
+        sam = self.sam
+        sam.finalize_counts()
+        text = "".join(self._chunks)
+        self._chunks = []
+        length, link, count, first_end, trans = sam.length, sam.link, sam.count, sam.first_end, sam.trans
+
+        # 左邻分布：后缀链接树中 v 的每个子节点 u 对应一个不同的左邻字符，出现次数为 count[u]；
+        # 左邻为片段分隔符或文本开头的出现视为互不相同的左邻字符（c·log c 贡献为 0）
+        states = len(trans)
+        left_clogc = [0.0] * states
+        for state in range(1, states):
+            parent = link[state]
+            if text[first_end[state] - length[parent]] == RUN_SEPARATOR:
+                continue
+            c = count[state]
+            left_clogc[parent] += c * math.log(c)
+
+        total_chars = self._chars
+        scored: List[Tuple[str, float]] = []
+        for state in range(1, states):
+            size = length[state]
+            freq = count[state]
+            if size < TERM_MIN_LENGTH or size > TERM_MAX_LENGTH or freq < TERM_MIN_FREQ:
+                continue
+            end = first_end[state]
+            term = text[end - size + 1:end + 1]
+            if RUN_SEPARATOR in term:
+                continue
+
+            # 右邻分布：转移 v --ch--> t 的出现次数为 count[t]；片段边界视为互不相同的右邻字符
+            right_clogc = 0.0
+            for ch, target in trans[state].items():
+                if ch != RUN_SEPARATOR:
+                    c = count[target]
+                    right_clogc += c * math.log(c)
+            right_entropy = math.log(freq) - right_clogc / freq
+            left_entropy = math.log(freq) - left_clogc[state] / freq
+            branching = min(left_entropy, right_entropy)
+            if branching < TERM_MIN_ENTROPY:
+                continue
+
+            # 内部凝固度：所有二分切点中最小的点互信息
+            cohesion = min(
+                math.log(freq * total_chars / (sam.occurrences(term[:i]) * sam.occurrences(term[i:])))
+                for i in range(1, size)
+            )
+            if cohesion < TERM_MIN_PMI:
+                continue
+            scored.append((term, freq * branching))
+
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
@@ -0,0 +1,83 @@
+"""
+模块: services.document_service.upload_sweeper
+职责: 清理超时未完成的直传：预签名过期且超过宽限期仍处于 uploading 的文档标记为 failed，并删除可能已上传的对象。
+输入: documents 表中的 uploading 记录。
+输出: 无（更新文档状态与状态缓存，删除对象）。
+用法: python -m services.document_service.upload_sweeper [--once]
+说明: 状态以条件更新（仅 uploading -> failed）切换，与并发的完成回调互斥；可并行运行多个实例。
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from common.config.settings import settings
+from common.db.postgres import get_async_engine, get_session_maker
+from common.storage.minio_client import get_minio_client
+from services.document_service.models import Document
+from services.document_service.progress import cache_status_async
+
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_stale_uploads(session_maker: sessionmaker[AsyncSession]) -> int:
+    """清理一轮超时直传。
+    输入: 会话工厂。
+    输出: 本轮标记为 failed 的文档数。
+    作用: 截止时间为 now - (minioPresignExpireSeconds + uploadStaleGraceSeconds)，此后预签名 URL 已失效，
+          记录不可能再完成；状态提交后删除对象（不存在时删除为空操作）并刷新状态缓存。
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.minioPresignExpireSeconds + settings.uploadStaleGraceSeconds
+    )
+    async with session_maker() as session:
+        result = await session.execute(
+            update(Document)
+            .where(Document.status == "uploading", Document.createdAt < cutoff)
+            .values(status="failed")
+            .returning(Document.id, Document.objectPath)
+        )
+        expired = result.all()
+        await session.commit()
+    client = get_minio_client()
+    for document_id, object_path in expired:
+        await asyncio.to_thread(client.remove_object, settings.minioBucket, object_path)
+        await cache_status_async(document_id, "failed")
+        logger.info("expired stale upload %s", document_id)
+    return len(expired)
+
+
+async def _sweep_loop(once: bool) -> None:
+    engine = get_async_engine()
+    session_maker = get_session_maker(engine)
+    try:
+        while True:
+            try:
+                await sweep_stale_uploads(session_maker)
+            except Exception:
+                if once:
+                    raise
+                logger.exception("upload sweep failed")
+            if once:
+                return
+            await asyncio.sleep(settings.uploadSweepSeconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KeShang stale direct-upload sweeper")
+    parser.add_argument("--once", action="store_true", help="清理一轮后退出")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.appLogLevel, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_sweep_loop(args.once))
+
+
+if __name__ == "__main__":
+    main()
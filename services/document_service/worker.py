@@ -5,151 +5,812 @@
 输出: 解析统计。
 """
 
-from pathlib import Path
-from typing import List, Tuple
+import gc
+import json
+from contextlib import contextmanager
+from pathlib import PurePosixPath
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
-from celery import shared_task
-from sqlalchemy import update
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine
+from celery import shared_task, group, chord, chain
+from celery.exceptions import Ignore
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, task_success
+from sqlalchemy import delete, update, select, tuple_
 
 import fitz  # PyMuPDF
 from pptx import Presentation  # python-pptx
 
-from common.mq.celery_app import celery_app
+from common.mq.celery_app import celery_app, DOC_QUEUE_SMALL, DOC_QUEUE_LARGE
 from common.config.settings import settings
-from common.storage.minio_client import get_minio_client, ensure_bucket, get_object_to_path
-from common.graph.neo4j_writer import ensure_document_and_concepts, create_related_edges
+from common.storage.minio_client import get_minio_client, ensure_bucket, open_object_buffer, ObjectBuffer
+from common.graph.neo4j_writer import (
+    ensure_document_and_concepts,
+    create_related_edges,
+    clone_document_mentions,
+    count_document_mentions,
+    replace_document_graph,
+    patch_document_graph,
+)
 from common.cache.redis_client import get_redis_client
-from services.document_service.models import Document, DocumentConcept, DocumentRelation
+from common.graph.neo4j_client import close_neo4j_driver
+from common.graph.ingest_queue import publish_graph_payload, supersede_graph_payloads
+from services.document_service.dedup import find_ready_duplicate, count_document_concepts, reuse_duplicate
+from services.document_service.models import Document, DocumentConcept, DocumentRelation, DocumentPage
+from services.document_service.artifacts import (
+    has_page_artifact,
+    iter_page_artifact,
+    PageArtifactWriter,
+    write_extract_result,
+    read_extract_result,
+)
+from services.document_service.concept_matcher import get_concept_matcher
+from services.document_service.pipeline import StreamingNerRe, WeightedRelation, PageRecord, RecordSpool, page_fingerprint
+from services.document_service.term_discovery import TermDiscoverer
+from services.document_service.pptx_text import PptxTextReader, PptxFormatError
+from services.document_service.progress import record_stage, advance_pages, cache_status
+from services.document_service.outbox import delivery_done, mark_delivery_done
+from services.document_service.dispatch import (
+    EXTRACT_TEXT_TASK,
+    PARSE_PAGE_RANGE_TASK,
+    FINISH_PAGES_TASK,
+    MARK_FAILED_TASK,
+    EXTRACT_STAGE_TASK,
+    PERSIST_SQL_TASK,
+    PERSIST_GRAPH_TASK,
+    REVISE_TASK,
+    REINDEX_TASK,
+)
+from services.document_service.worker_db import (
+    init_worker_db,
+    shutdown_worker_db,
+    run_async,
+    get_worker_engine,
+    get_worker_session_maker,
+    copy_records,
+)
 
 
-@shared_task(name="document.extract_text", autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
-def extract_text_task(object_path: str) -> dict:
-    """解析对象存储中的文件，使用可插拔 NER/RE 流水线抽取概念与关系，入库/入图并更新状态。
+@worker_init.connect
+def _on_worker_init(**kwargs) -> None:
+    """主进程启动（fork 子进程之前）：编译概念匹配器并冻结当前对象，子进程以写时复制共享同一份自动机，
+    不再各自加载与编译词表；加载词表用到的图数据库连接随即关闭，避免被子进程继承。
+    """
+    get_concept_matcher()
+    close_neo4j_driver()
+    gc.freeze()
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs) -> None:
+    """子进程启动：创建进程级数据库引擎与连接池（fork 之后创建，避免跨进程共享连接）。"""
+    init_worker_db()
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**kwargs) -> None:
+    """子进程退出：释放数据库与图数据库连接池。"""
+    shutdown_worker_db()
+    close_neo4j_driver()
+
+
+@task_success.connect
+def _on_task_success(sender=None, **kwargs) -> None:
+    """发件箱投递的入口任务成功后记录其 task_id（即去重键），之后的重复投递直接跳过。"""
+    if sender is not None and sender.name in (EXTRACT_TEXT_TASK, REVISE_TASK):
+        mark_delivery_done(sender.request.id)
+
+
+# 可安全重复执行的阶段任务：结果整体覆盖或 MERGE，Worker 失联（OOM、被杀）时消息重新入队；
+# 重投次数由 _guard_redelivery 限制，反复压垮 Worker 的任务不会无限循环。修订任务按差异增量更新，不在此列。
+STAGE_TASK_OPTIONS = {
+    "bind": True,
+    "reject_on_worker_lost": settings.celeryAcksLate,
+    "autoretry_for": (Exception,),
+    "retry_kwargs": {"max_retries": 3, "countdown": 5},
+}
+REDELIVERY_KEY = "task:redelivered:{task_id}"
+
+
+def _guard_redelivery(task, object_path: str) -> None:
+    """统计 Broker 重投（Worker 失联后重新入队）次数，超过 celeryMaxRedeliveries 时将文档标记为 failed 并忽略本次投递。
+    输入: 绑定的任务实例、对象键名。
+    输出: None；超限时抛出 Ignore（不触发自动重试，消息确认后丢弃）。
+    作用: 只计 redelivered 标记的投递；Celery 自身的重试以新消息发布，不计入。
+    """
+    if not (task.request.delivery_info or {}).get("redelivered"):
+        return
+    client = get_redis_client()
+    key = REDELIVERY_KEY.format(task_id=task.request.id)
+    with client.pipeline(transaction=True) as pipe:
+        pipe.incr(key)
+        pipe.expire(key, settings.outboxDedupTtlSeconds)
+        count, _ = pipe.execute()
+    if count > settings.celeryMaxRedeliveries:
+        _mark_failed(object_path, get_redis_client(db=2))
+        raise Ignore()
+
+
+@shared_task(name=EXTRACT_TEXT_TASK, **STAGE_TASK_OPTIONS)
+def extract_text_task(self, object_path: str) -> dict:
+    """分阶段流水线入口（fetch + parse）：下载、去重、解析并保存逐页文本产物，随后链式提交后续阶段。
     输入: object_path 对象存储键名。
+    输出: {document_id, num_concepts}；num_concepts 为 None 时由后续阶段或并行解析的 chord 继续处理。
+    作用: 阶段链 extract -> persist_sql -> persist_graph 各自保存中间结果并独立重试，
+          入图的瞬时失败只重试入图阶段，不再重新下载与解析。关闭产物时在本任务内完成全部处理。
+    """
+    _guard_redelivery(self, object_path)
+    if delivery_done(self.request.id):
+        return {"document_id": _derive_doc_id_from_object(object_path), "num_concepts": None, "duplicate": True}
+    metrics = get_redis_client(db=2)
+    try:
+        document_id = _derive_doc_id_from_object(object_path)
+        suffix = _object_suffix(object_path)
+        queue = _current_queue(self)
+
+        # 当前解析器版本的逐页文本产物已存在（重试或重新处理场景）：跳过下载与解析
+        if settings.docArtifactsEnabled and has_page_artifact(get_minio_client(), document_id):
+            return _start_stages(object_path, queue)
+
+        record_stage(document_id, "fetch")
+        with _fetch_object(object_path) as buffer:
+            # 内容去重：同内容文档已处理过则直接复用结果，跳过解析/抽取/入库/入图
+            if _try_reuse_duplicate(document_id, buffer.sha256):
+                record_stage(document_id, "done")
+                metrics.incr("metrics:document_deduplicated")
+                return {"document_id": document_id, "num_concepts": None, "deduplicated": True}
+
+            page_count = _count_pages(buffer, suffix)
+            record_stage(document_id, "parse", pages_total=page_count)
+
+            # 大文档按页区间扇出到多个 Worker 进程并行解析，由 chord 回调按序合并后继续后续阶段；
+            # 受下载量上限约束只剩一个区间时仍在本任务内解析
+            step = _parallel_chunk_pages(page_count, buffer.size)
+            if page_count >= settings.docParseParallelMinPages and step < page_count:
+                ranges = _dispatch_parallel_parse(object_path, page_count, step)
+                return {"document_id": document_id, "num_concepts": None, "pageRanges": ranges}
+
+            # 逐页生成文本，缓冲需在整个消费过程中保持打开
+            pages = _track_pages(document_id, _dispatch_parse(buffer, suffix))
+            if not settings.docArtifactsEnabled:
+                return _finish_document(document_id, pages, metrics)
+            _store_pages(document_id, pages)
+        return _start_stages(object_path, queue)
+    except Exception as exc:
+        # 标记失败并计数；Celery 会按装饰器策略重试
+        _mark_failed(object_path, metrics)
+        raise exc
+
+
+@shared_task(name=PARSE_PAGE_RANGE_TASK, **STAGE_TASK_OPTIONS)
+def parse_page_range_task(self, object_path: str, start: int, end: int) -> List[str]:
+    """解析文档的一个页区间 [start, end)。
+    输入: 对象键名、起止页下标。
+    输出: 该区间内逐页文本列表（保持页序）。
+    作用: chord 头部子任务，单个区间耗时远低于任务软超时；完成后累加已解析页数。
+          PDF 交叉引用表位于文件末尾、PPT 为复合文档，解析器需要完整文件，无法按字节区间只读取本区间；
+          逐页文本产物由解析生成，不能作为输入。因此每个子任务各下载一次完整对象，
+          区间数由 _parallel_chunk_pages 按 docParseMaxChunks 与 docParseMaxFetchBytes 限定。
+    """
+    _guard_redelivery(self, object_path)
+    with _fetch_object(object_path) as buffer:
+        pages = list(_dispatch_parse(buffer, _object_suffix(object_path), start, end))
+    advance_pages(_derive_doc_id_from_object(object_path), len(pages))
+    return pages
+
+
+@shared_task(name=FINISH_PAGES_TASK, **STAGE_TASK_OPTIONS)
+def finish_pages_task(self, chunks: List[List[str]], object_path: str) -> dict:
+    """chord 回调：按页区间顺序合并各子任务结果，保存逐页文本产物后提交后续阶段。
+    输入: 各页区间的文本列表（与 group 提交顺序一致）、对象键名。
+    输出: {document_id, num_concepts}。
+    作用: 汇总并行解析结果；关闭产物时在本任务内完成全部处理。
+    """
+    _guard_redelivery(self, object_path)
+    metrics = get_redis_client(db=2)
+    try:
+        document_id = _derive_doc_id_from_object(object_path)
+        pages = (page for chunk in chunks for page in chunk)
+        if not settings.docArtifactsEnabled:
+            return _finish_document(document_id, pages, metrics)
+        _store_pages(document_id, pages)
+        return _start_stages(object_path, DOC_QUEUE_LARGE)
+    except Exception as exc:
+        _mark_failed(object_path, metrics)
+        raise exc
+
+
+@shared_task(name=MARK_FAILED_TASK)
+def mark_failed_task(request, exc, traceback, object_path: str) -> None:
+    """chord 错误回调：任一页区间最终失败时将文档标记为 failed。"""
+    _mark_failed(object_path, get_redis_client(db=2))
+
+
+@shared_task(name=EXTRACT_STAGE_TASK, **STAGE_TASK_OPTIONS)
+def extract_stage_task(self, object_path: str) -> dict:
+    """extract 阶段：读取逐页文本产物执行 NER/RE，结果（实体、关系、逐页记录）存入对象存储。
+    输入: 对象键名。
     输出: {document_id, num_concepts}。
-    作用: 支撑 MVP 与后续替换为更强的管线（LLM/专用模型）。
+    作用: 重复执行覆盖同一中间结果，幂等。
     """
+    _guard_redelivery(self, object_path)
     metrics = get_redis_client(db=2)
     try:
+        document_id = _derive_doc_id_from_object(object_path)
+        record_stage(document_id, "extract")
         client = get_minio_client()
-        ensure_bucket(client)
-        tmp_dir = Path(".build/worker")
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-        local_path = tmp_dir / object_path.replace("/", "_")
-        get_object_to_path(client, object_path, local_path)
+        entities, relations, records = _pipeline_ner_re(iter_page_artifact(client, document_id))
+        write_extract_result(client, document_id, entities, relations, records)
+        return {"document_id": document_id, "num_concepts": len(entities)}
+    except Exception as exc:
+        _mark_failed(object_path, metrics)
+        raise exc
 
-        text: str = _dispatch_parse(local_path)
-        entities, relations = _pipeline_ner_re(text)
 
+@shared_task(name=PERSIST_SQL_TASK, **STAGE_TASK_OPTIONS)
+def persist_sql_task(self, object_path: str) -> dict:
+    """persist_sql 阶段：将抽取结果写入概念/关系/逐页记录明细（整体替换，幂等），文档仍保持 processing。"""
+    _guard_redelivery(self, object_path)
+    metrics = get_redis_client(db=2)
+    try:
         document_id = _derive_doc_id_from_object(object_path)
-        _persist_granular_results(document_id, entities, relations)
-        ensure_document_and_concepts(document_id, entities)
-        if relations:
-            create_related_edges(relations)
+        record_stage(document_id, "persist_sql")
+        entities, relations, records = _load_extract_result(document_id)
+        _persist_granular_results(document_id, entities, relations, status="processing", pages=records)
+        return {"document_id": document_id, "num_concepts": len(entities)}
+    except Exception as exc:
+        _mark_failed(object_path, metrics)
+        raise exc
+
 
-        _update_document_status(document_id, status="ready")
+@shared_task(name=PERSIST_GRAPH_TASK, **STAGE_TASK_OPTIONS)
+def persist_graph_task(self, object_path: str) -> dict:
+    """persist_graph 阶段：入图（MERGE 幂等）。直接写入时随即标记 ready；
+    写后入库时文档保持 processing，由 graph_sink 确认全部载荷写入后标记 ready。
+    """
+    _guard_redelivery(self, object_path)
+    metrics = get_redis_client(db=2)
+    try:
+        document_id = _derive_doc_id_from_object(object_path)
+        record_stage(document_id, "persist_graph")
+        entities, relations, _ = _load_extract_result(document_id)
+        if _write_graph(document_id, entities, relations):
+            _update_document_status(document_id, status="ready")
+            record_stage(document_id, "done")
         metrics.incr("metrics:document_processed")
         return {"document_id": document_id, "num_concepts": len(entities)}
     except Exception as exc:
-        # 标记失败并计数；Celery 会按装饰器策略重试
-        try:
-            document_id = _derive_doc_id_from_object(object_path)
-            _update_document_status(document_id, status="failed")
-        except Exception:
-            pass
-        metrics.incr("metrics:document_failed")
+        _mark_failed(object_path, metrics)
         raise exc
 
 
-def _dispatch_parse(path: Path) -> str:
-    suffix = path.suffix.lower()
+@shared_task(name=REINDEX_TASK, **STAGE_TASK_OPTIONS)
+def reindex_document_task(self, document_id: str, object_path: str) -> dict:
+    """重建单个文档的概念、关系与图谱（批量重建索引的 Celery 入口）。
+    输入: 文档ID、对象键名。
+    输出: {document_id, num_concepts}。
+    """
+    _guard_redelivery(self, object_path)
+    return {"document_id": document_id, "num_concepts": reindex_document(document_id, object_path)}
+
+
+def reindex_document(document_id: str, object_path: str) -> int:
+    """以当前流水线重建单个文档。
+    输入: 文档ID、对象键名。
+    输出: 概念数。
+    作用: 优先读取逐页文本产物，缺失时下载解析并补写产物；图谱子图与 SQL 明细（含状态）分别原子替换。
+    """
+    client = get_minio_client()
+    if settings.docArtifactsEnabled and has_page_artifact(client, document_id):
+        entities, relations, records = _pipeline_ner_re(iter_page_artifact(client, document_id))
+    else:
+        with _fetch_object(object_path) as buffer:
+            pages = _tee_to_artifact(document_id, _dispatch_parse(buffer, _object_suffix(object_path)))
+            entities, relations, records = _pipeline_ner_re(pages)
+    replace_document_graph(document_id, entities, relations)
+    _persist_granular_results(document_id, entities, relations, pages=records)
+    return len(entities)
+
+
+@shared_task(bind=True, name=REVISE_TASK, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def revise_document_task(self, object_path: str) -> dict:
+    """增量处理课件修订版：仅对内容指纹变化的页重新抽取，概念/关系与图谱按差异更新。
+    输入: 修订版对象键名 uploads/<document_id>/v<version>/<file_name>。
+    输出: {document_id, num_concepts, reusedPages, changedPages}。
+    作用: 只改动一页时抽取与写入量与改动页数成正比；解析仍需逐页读取以计算指纹。
+    """
+    if delivery_done(self.request.id):
+        return {"document_id": _derive_doc_id_from_object(object_path), "num_concepts": None, "duplicate": True}
+    metrics = get_redis_client(db=2)
+    try:
+        document_id = _derive_doc_id_from_object(object_path)
+        previous, old_concepts, old_relations = _load_previous_results(document_id)
+
+        with _fetch_object(object_path) as buffer:
+            pages = _tee_to_artifact(document_id, _dispatch_parse(buffer, _object_suffix(object_path)))
+            entities, relations, records = _pipeline_ner_re(pages, previous)
+
+        new_concepts = set(entities)
+        added = [name for name in entities if name not in old_concepts]
+        removed = sorted(old_concepts - new_concepts)
+        new_relations = {_pair_key(a, b): (a, b, weight) for a, b, weight in relations}
+        # PMI 依赖全文窗口数与边缘计数，任一页改动都会使几乎所有权重轻微漂移；
+        # 只重写新增/消失的关系、端点同现于改动页（新增或删除）的关系，以及漂移超过容差的关系
+        changed_pages = _changed_page_terms(previous, records)
+        rewrite = {
+            pair for pair in new_relations.keys() & old_relations.keys()
+            if _touches_changed_pages(pair, changed_pages)
+            or _weight_drifted(old_relations[pair], new_relations[pair][2])
+        }
+        stale_pairs = [pair for pair in old_relations if pair not in new_relations or pair in rewrite]
+        changed = [rel for pair, rel in new_relations.items() if pair not in old_relations or pair in rewrite]
+
+        # 修订需删除链接，不经写后入库队列（仅支持合并），差异量小，直接在单个事务内修补；
+        # 先提升载荷版本，队列中尚未写入的旧载荷由 graph_sink 丢弃，不会重新链接本次删除的概念
+        supersede_graph_payloads(document_id, _document_version(document_id))
+        patch_document_graph(document_id, added, removed, changed)
+        _persist_revision(document_id, added, removed, changed, stale_pairs, records)
+
+        reused = sum(1 for record in records if record["fp"] in previous)
+        metrics.incr("metrics:document_revised")
+        return {
+            "document_id": document_id,
+            "num_concepts": len(entities),
+            "reusedPages": reused,
+            "changedPages": len(records) - reused,
+        }
+    except Exception as exc:
+        _mark_failed(object_path, metrics)
+        raise exc
+
+
+def _pair_key(a: str, b: str) -> Tuple[str, str]:
+    """关系的无向键，修订前后端点顺序可能随频次排序变化。"""
+    return (a, b) if a <= b else (b, a)
+
+
+def _changed_page_terms(previous: Dict[str, PageRecord], records: RecordSpool) -> List[Set[str]]:
+    """返回新增页（指纹不在上一版本中）与被删除页（上一版本中不再出现的指纹）各自出现的词集合。"""
+    current = {record["fp"] for record in records}
+    changed = [record for record in records if record["fp"] not in previous]
+    changed.extend(record for fp, record in previous.items() if fp not in current)
+    return [{term for sentence in record["s"] for term in sentence} for record in changed]
+
+
+def _touches_changed_pages(pair: Tuple[str, str], changed_pages: List[Set[str]]) -> bool:
+    a, b = pair
+    return any(a in terms and b in terms for terms in changed_pages)
+
+
+def _weight_drifted(old: float | None, new: float | None) -> bool:
+    """权重变化是否超过 docRevisionWeightTolerance（缺失权重视为已变化）。"""
+    if old is None or new is None:
+        return old is not new
+    return abs(old - new) > settings.docRevisionWeightTolerance
+
+
+def _load_previous_results(document_id: str) -> Tuple[Dict[str, PageRecord], Set[str], Dict[Tuple[str, str], float | None]]:
+    """读取上一版本的逐页记录（按指纹索引）、概念集合与关系权重。"""
+
+    async def _do_load() -> Tuple[Dict[str, PageRecord], Set[str], Dict[Tuple[str, str], float | None]]:
+        async with get_worker_engine().connect() as conn:
+            page_rows = await conn.execute(
+                select(DocumentPage.fingerprint, DocumentPage.mentions).where(DocumentPage.documentId == document_id)
+            )
+            previous = {fingerprint: json.loads(mentions) for fingerprint, mentions in page_rows}
+            concept_rows = await conn.execute(
+                select(DocumentConcept.conceptName).where(DocumentConcept.documentId == document_id)
+            )
+            concepts = {name for (name,) in concept_rows}
+            relation_rows = await conn.execute(
+                select(DocumentRelation.sourceConcept, DocumentRelation.targetConcept, DocumentRelation.weight)
+                .where(DocumentRelation.documentId == document_id)
+            )
+            relations = {_pair_key(a, b): weight for a, b, weight in relation_rows}
+        return previous, concepts, relations
+
+    return run_async(_do_load())
+
+
+def _parallel_chunk_pages(page_count: int, object_size: int) -> int:
+    """计算并行解析每个页区间的页数。
+    输入: 总页数、对象字节数。
+    输出: 每个区间的页数（>= page_count 表示不拆分）。
+    作用: 默认按 docParseChunkPages 切分；每个子任务都下载完整对象，区间数不超过 docParseMaxChunks，
+          且区间数 × 对象大小不超过 docParseMaxFetchBytes，超出时放大区间。
+    """
+    max_chunks = min(settings.docParseMaxChunks, settings.docParseMaxFetchBytes // max(1, object_size))
+    step = max(1, settings.docParseChunkPages)
+    if max_chunks <= 1:
+        return max(1, page_count)
+    return max(step, -(-page_count // max_chunks))
+
+
+def _dispatch_parallel_parse(object_path: str, page_count: int, step: int) -> int:
+    """按给定页数切分页区间并以 chord 提交。
+    输入: 对象键名、总页数、每个区间的页数。
+    输出: 提交的页区间数量。
+    作用: 解析墙钟时间随可用 Worker 进程数近似线性下降（上限为区间数）；子任务与回调进入大文档队列。
+    """
+    subtasks = [
+        parse_page_range_task.s(object_path, start, min(start + step, page_count)).set(queue=DOC_QUEUE_LARGE)
+        for start in range(0, page_count, step)
+    ]
+    body = (
+        finish_pages_task.s(object_path)
+        .set(queue=DOC_QUEUE_LARGE)
+        .on_error(mark_failed_task.s(object_path).set(queue=DOC_QUEUE_LARGE))
+    )
+    chord(group(subtasks))(body)
+    return len(subtasks)
+
+
+def _start_stages(object_path: str, queue: str) -> dict:
+    """链式提交 extract -> persist_sql -> persist_graph，各阶段与入口任务在同一队列执行。"""
+    stages = [
+        extract_stage_task.si(object_path),
+        persist_sql_task.si(object_path),
+        persist_graph_task.si(object_path),
+    ]
+    chain(*(stage.set(queue=queue) for stage in stages)).apply_async()
+    return {"document_id": _derive_doc_id_from_object(object_path), "num_concepts": None}
+
+
+def _current_queue(task) -> str:
+    """返回当前任务消息的投递队列（直连交换机下路由键即队列名），未知时为小文档队列。"""
+    delivery_info = task.request.delivery_info or {}
+    return delivery_info.get("routing_key") or DOC_QUEUE_SMALL
+
+
+def _load_extract_result(document_id: str) -> Tuple[List[str], List[WeightedRelation], RecordSpool]:
+    result = read_extract_result(get_minio_client(), document_id)
+    relations = [(a, b, weight) for a, b, weight in result["relations"]]
+    return result["entities"], relations, result["pages"]
+
+
+def _finish_document(document_id: str, pages: Iterable[str], metrics) -> dict:
+    """关闭产物时的单任务处理：NER/RE、明细入库、入图、状态更新与计数。"""
+    record_stage(document_id, "extract")
+    entities, relations, records = _pipeline_ner_re(pages)
+
+    if settings.graphWriteBehind:
+        # 先以 processing 写入明细再投递载荷，graph_sink 确认写入后标记 ready，不会被明细事务覆盖
+        _persist_granular_results(document_id, entities, relations, status="processing", pages=records)
+        record_stage(document_id, "persist_graph")
+        if _write_graph(document_id, entities, relations):
+            _update_document_status(document_id, status="ready")
+            record_stage(document_id, "done")
+    else:
+        _write_graph(document_id, entities, relations)
+        _persist_granular_results(document_id, entities, relations, pages=records)
+        record_stage(document_id, "done")
+
+    metrics.incr("metrics:document_processed")
+    return {"document_id": document_id, "num_concepts": len(entities)}
+
+
+def _track_pages(document_id: str, pages: Iterable[str]) -> Iterator[str]:
+    """原样产出页面，每 docProgressEveryPages 页累加一次已解析页数。"""
+    step = max(1, settings.docProgressEveryPages)
+    pending = 0
+    for page in pages:
+        yield page
+        pending += 1
+        if pending >= step:
+            advance_pages(document_id, pending)
+            pending = 0
+    if pending:
+        advance_pages(document_id, pending)
+
+
+def _store_pages(document_id: str, pages: Iterable[str]) -> None:
+    """完整消费页面流并保存逐页文本产物（parse 阶段的中间结果）。"""
+    for _ in _tee_to_artifact(document_id, pages):
+        pass
+
+
+def _tee_to_artifact(document_id: str, pages: Iterable[str]) -> Iterator[str]:
+    """在页面流向 NER/RE 的同时写入逐页文本产物；页面流完整消费后才上传。"""
+    if not settings.docArtifactsEnabled:
+        yield from pages
+        return
+    with PageArtifactWriter(document_id) as writer:
+        yield from writer.tee(pages)
+        writer.commit(get_minio_client())
+
+
+def _write_graph(document_id: str, entities: List[str], relations: List[WeightedRelation]) -> bool:
+    """入图：默认投递到写后入库队列（载荷携带文档版本号），由 graph_sink 合并排序后统一写入；
+    关闭时直接写入（MERGE 幂等，可安全重试）。
+    输出: 图谱已写入（可立即标记 ready）时为 True；载荷已投递、待 graph_sink 确认时为 False。
+    """
+    if settings.graphWriteBehind:
+        return publish_graph_payload(document_id, entities, relations, _document_version(document_id)) == 0
+    ensure_document_and_concepts(document_id, entities)
+    if relations:
+        create_related_edges(relations)
+    return True
+
+
+def _mark_failed(object_path: str, metrics) -> None:
+    """尽力将文档标记为 failed 并计数，自身异常不向外抛出。"""
+    try:
+        document_id = _derive_doc_id_from_object(object_path)
+        _update_document_status(document_id, status="failed")
+    except Exception:
+        pass
+    metrics.incr("metrics:document_failed")
+
+
+@contextmanager
+def _fetch_object(object_path: str) -> Iterator[ObjectBuffer]:
+    """获取对象内容缓冲：小对象留在内存，大对象溢写到私有临时文件，退出时保证清理。"""
+    client = get_minio_client()
+    ensure_bucket(client)
+    with open_object_buffer(
+        client,
+        object_path,
+        spill_threshold=settings.docSpillThresholdBytes,
+        spill_dir=settings.docSpillDir,
+    ) as buffer:
+        yield buffer
+
+
+def _object_suffix(object_path: str) -> str:
+    """返回对象键名的小写扩展名，用于解析分发。"""
+    return PurePosixPath(object_path).suffix.lower()
+
+
+def _derive_doc_id_from_object(object_path: str) -> str:
+    """从对象键名 uploads/<document_id>/<file_name> 中解析文档ID。"""
+    parts = object_path.split("/")
+    if len(parts) < 3 or parts[0] != "uploads":
+        raise ValueError(f"Unexpected object path: {object_path}")
+    return parts[1]
+
+
+def _try_reuse_duplicate(document_id: str, content_hash: str) -> bool:
+    """记录内容哈希并尝试复用已处理的同内容文档。
+    输入: 文档ID、内容哈希。
+    输出: 命中并完成复用返回 True，否则 False。
+    作用: 覆盖直传等 API 侧无法提前计算哈希的上传路径。
+    """
+    async def _do_reuse() -> Tuple[bool, str | None]:
+        async with get_worker_session_maker()() as session:
+            await session.execute(update(Document).where(Document.id == document_id).values(contentHash=content_hash))
+            duplicate = await find_ready_duplicate(session, content_hash, exclude_id=document_id)
+            # 源文档图谱链接不完整时不复用（见 find_ready_duplicate）
+            if duplicate is None or count_document_mentions(duplicate.id) < await count_document_concepts(session, duplicate.id):
+                await session.commit()
+                return False, None
+            clone_document_mentions(duplicate.id, document_id)
+            knowledge_graph_id = duplicate.knowledgeGraphId
+            await reuse_duplicate(session, duplicate, document_id)
+            return True, knowledge_graph_id
+
+    reused, knowledge_graph_id = run_async(_do_reuse())
+    if reused:
+        cache_status(document_id, "ready", knowledge_graph_id)
+    return reused
+
+
+def _count_pages(buffer: ObjectBuffer, suffix: str) -> int:
+    """返回 PDF 页数或演示文稿幻灯片数；不支持的格式返回 0。"""
     if suffix == ".pdf":
-        return _parse_pdf(path)
+        with _open_pdf(buffer) as doc:
+            return doc.page_count
     if suffix in (".ppt", ".pptx"):
-        return _parse_ppt(path)
-    return ""
-
-
-def _parse_pdf(path: Path) -> str:
-    doc = fitz.open(str(path))
-    parts: List[str] = []
-    for page in doc:
-        parts.append(page.get_text())
-    return "\n".join(parts)
-
-
-def _parse_ppt(path: Path) -> str:
-    prs = Presentation(str(path))
-    parts: List[str] = []
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                parts.append(shape.text)
-    return "\n".join(parts)
-
-
-def _pipeline_ner_re(text: str) -> Tuple[List[str], List[Tuple[str, str]]]:
-    """可插拔 NER/RE 流水线（占位）：
-    - NER: 规则分词 + 频次/长度过滤
-    - RE: 相邻共现形成临时边
-    输入: 文本。
-    输出: (实体列表, 关系列表)。
-    作用: 后续可替换为 spaCy/Transformers/LLM。
-    """
-    if not text:
-        return [], []
-    import re
-    tokens = re.split(r"[^\w\u4e00-\u9fa5]+", text)
-    tokens = [t.strip() for t in tokens if len(t.strip()) >= 2]
-    # 频次过滤
-    freq = {}
-    for t in tokens:
-        freq[t] = freq.get(t, 0) + 1
-    entities = [t for t, c in freq.items() if c >= 2][:100]
-    relations: List[Tuple[str, str]] = []
-    for i in range(len(entities) - 1):
-        relations.append((entities[i], entities[i + 1]))
-    return entities, relations
-
-
-def _persist_granular_results(document_id: str, entities: List[str], relations: List[Tuple[str, str]]) -> None:
-    database_url = (
-        f"postgresql+asyncpg://{settings.postgresUser}:{settings.postgresPassword}"
-        f"@{settings.postgresHost}:{settings.postgresPort}/{settings.postgresDb}"
-    )
-    engine = create_async_engine(database_url, future=True, echo=False)
-    async_session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        with buffer.open() as fh:
+            try:
+                with PptxTextReader(fh) as reader:
+                    return len(reader)
+            except PptxFormatError:
+                fh.seek(0)
+                return len(Presentation(fh).slides)
+    return 0
+
+
+def _dispatch_parse(buffer: ObjectBuffer, suffix: str, start: int = 0, end: int | None = None) -> Iterator[str]:
+    if suffix == ".pdf":
+        return _parse_pdf(buffer, start, end)
+    if suffix in (".ppt", ".pptx"):
+        return _parse_ppt(buffer, start, end)
+    return iter(())
+
+
+def _open_pdf(buffer: ObjectBuffer) -> "fitz.Document":
+    """内存缓冲直接以 stream 打开，溢写文件按路径打开（由 MuPDF 按需读取，不整体载入内存）。"""
+    if buffer.data is not None:
+        return fitz.open(stream=buffer.data, filetype="pdf")
+    return fitz.open(str(buffer.path))
+
+
+def _parse_pdf(buffer: ObjectBuffer, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """逐页产出 PDF 文本，每次只持有一页。"""
+    with _open_pdf(buffer) as doc:
+        stop = doc.page_count if end is None else min(end, doc.page_count)
+        for index in range(start, stop):
+            yield doc.load_page(index).get_text()
+
+
+def _parse_ppt(buffer: ObjectBuffer, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """逐张产出幻灯片文本：默认流式读取 zip 内幻灯片/备注 XML；包结构异常时回退到 python-pptx，
+    逐张读取中途出错时从出错的一张起回退，已产出的幻灯片不重复。
+    """
+    with buffer.open() as fh:
+        try:
+            reader = PptxTextReader(fh)
+        except PptxFormatError:
+            fh.seek(0)
+            yield from _parse_ppt_fallback(fh, start, end)
+            return
+        produced = 0
+        with reader:
+            try:
+                for text in reader.iter_texts(start, end):
+                    yield text
+                    produced += 1
+            except PptxFormatError:
+                pass
+            else:
+                return
+        fh.seek(0)
+        yield from _parse_ppt_fallback(fh, start + produced, end)
+
+
+def _parse_ppt_fallback(fh, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """python-pptx 回退解析（同一幻灯片内各形状文本以换行拼接）。"""
+    prs = Presentation(fh)
+    for slide in islice(prs.slides, start, end):
+        texts = [shape.text for shape in slide.shapes if hasattr(shape, "text")]
+        yield "\n".join(texts)
+
+
+def _pipeline_ner_re(
+    pages: Iterable[str],
+    previous: Dict[str, PageRecord] | None = None,
+) -> Tuple[List[str], List[WeightedRelation], RecordSpool]:
+    """可插拔 NER/RE 流水线（占位），逐页增量消费：
+    - NER: 词典概念匹配 + 中文新词发现 + 规则分词 + 频次/长度过滤
+    - RE: 滑动句窗共现 + PMI 权重
+    输入: 逐页文本的可迭代对象、可选的上一版本逐页记录（按指纹索引）。
+    输出: (实体列表, 带权关系列表 [(a, b, weight)], 逐页记录列表)。
+    作用: 后续可替换为 spaCy/Transformers/LLM；指纹命中的页直接重放旧记录，不再抽取；
+          本篇新识别的概念只经图数据库回流到匹配器（达到 conceptMinDocuments 后随词表刷新加入），不逐篇累积。
+    """
+    matcher = get_concept_matcher()
+    discoverer = TermDiscoverer(settings.termDiscoveryMaxChars) if settings.termDiscoveryMaxChars > 0 else None
+    stage = StreamingNerRe(matcher=matcher, discoverer=discoverer)
+    for page in pages:
+        record = previous.get(page_fingerprint(page)) if previous else None
+        if record is not None:
+            stage.feed_record(record, page)
+        else:
+            stage.feed(page)
+    entities, relations = stage.result(settings.nerMaxEntities, settings.nerMaxRelations)
+    return entities, relations, stage.page_records()
+
+
+def _persist_granular_results(
+    document_id: str,
+    entities: List[str],
+    relations: List[WeightedRelation],
+    status: str = "ready",
+    pages: Iterable[PageRecord] | None = None,
+) -> None:
+    """以 COPY 批量写入概念与关系明细（及可选的逐页记录），并在同一事务内更新文档状态。
+    输入: 文档ID、实体列表、关系列表、目标状态、逐页记录。
+    输出: None。
+    作用: 单次往返写入整批明细；状态与明细原子可见。先清除该文档旧明细，重试或基于产物重新处理时不产生重复行。
+    """
 
     async def _do_persist() -> None:
-        async with async_session_factory() as session:
-            for name in entities:
-                session.add(DocumentConcept(documentId=document_id, conceptName=name))
-            for a, b in relations:
-                session.add(DocumentRelation(documentId=document_id, sourceConcept=a, targetConcept=b))
-            await session.commit()
+        async with get_worker_engine().begin() as conn:
+            await conn.execute(delete(DocumentConcept).where(DocumentConcept.documentId == document_id))
+            await conn.execute(delete(DocumentRelation).where(DocumentRelation.documentId == document_id))
+            await copy_records(
+                conn,
+                DocumentConcept.__tablename__,
+                ["documentId", "conceptName"],
+                ((document_id, name) for name in entities),
+            )
+            await copy_records(
+                conn,
+                DocumentRelation.__tablename__,
+                ["documentId", "sourceConcept", "targetConcept", "weight"],
+                ((document_id, a, b, weight) for a, b, weight in relations),
+            )
+            if pages is not None:
+                await _replace_page_records(conn, document_id, pages)
+            await conn.execute(update(Document).where(Document.id == document_id).values(status=status))
 
-    import asyncio
-    asyncio.get_event_loop().run_until_complete(_do_persist())
+    run_async(_do_persist())
+    cache_status(document_id, status)
 
 
-def _update_document_status(document_id: str, status: str) -> None:
-    database_url = (
-        f"postgresql+asyncpg://{settings.postgresUser}:{settings.postgresPassword}"
-        f"@{settings.postgresHost}:{settings.postgresPort}/{settings.postgresDb}"
+def _persist_revision(
+    document_id: str,
+    added: List[str],
+    removed: List[str],
+    changed: List[WeightedRelation],
+    stale_pairs: List[Tuple[str, str]],
+    pages: Iterable[PageRecord],
+) -> None:
+    """在单个事务内按差异更新概念与关系明细，替换逐页记录并将文档标记为 ready。
+    输入: 文档ID、新增/移除概念、新增或权重变化的关系、需删除的旧关系端点对、逐页记录。
+    输出: None。
+    作用: 未变化的行保持不动，写入量与差异成正比。
+    """
+
+    async def _do_persist() -> None:
+        async with get_worker_engine().begin() as conn:
+            if removed:
+                await conn.execute(
+                    delete(DocumentConcept).where(
+                        DocumentConcept.documentId == document_id,
+                        DocumentConcept.conceptName.in_(removed),
+                    )
+                )
+            if stale_pairs:
+                # 旧行的端点顺序未知，两个方向都匹配
+                endpoints = stale_pairs + [(b, a) for a, b in stale_pairs]
+                await conn.execute(
+                    delete(DocumentRelation).where(
+                        DocumentRelation.documentId == document_id,
+                        tuple_(DocumentRelation.sourceConcept, DocumentRelation.targetConcept).in_(endpoints),
+                    )
+                )
+            await copy_records(
+                conn,
+                DocumentConcept.__tablename__,
+                ["documentId", "conceptName"],
+                ((document_id, name) for name in added),
+            )
+            await copy_records(
+                conn,
+                DocumentRelation.__tablename__,
+                ["documentId", "sourceConcept", "targetConcept", "weight"],
+                ((document_id, a, b, weight) for a, b, weight in changed),
+            )
+            await _replace_page_records(conn, document_id, pages)
+            await conn.execute(update(Document).where(Document.id == document_id).values(status="ready"))
+
+    run_async(_do_persist())
+    cache_status(document_id, "ready")
+
+
+async def _replace_page_records(conn, document_id: str, pages: Iterable[PageRecord]) -> None:
+    """以文档当前版本号替换逐页指纹与提及记录（调用方负责事务）。"""
+    version = (await conn.execute(select(Document.version).where(Document.id == document_id))).scalar_one_or_none()
+    await conn.execute(delete(DocumentPage).where(DocumentPage.documentId == document_id))
+    await copy_records(
+        conn,
+        DocumentPage.__tablename__,
+        ["documentId", "version", "pageIndex", "fingerprint", "mentions"],
+        (
+            (document_id, version or 1, index, record["fp"], json.dumps(record, ensure_ascii=False))
+            for index, record in enumerate(pages)
+        ),
     )
-    engine = create_async_engine(database_url, future=True, echo=False)
-    async_session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+
+def _document_version(document_id: str) -> int:
+    """读取文档当前版本号（行不存在时为 1）。"""
+
+    async def _do_load() -> int | None:
+        async with get_worker_engine().connect() as conn:
+            return (await conn.execute(select(Document.version).where(Document.id == document_id))).scalar_one_or_none()
+
+    return run_async(_do_load()) or 1
+
+
+def _update_document_status(document_id: str, status: str) -> None:
+    """更新数据库状态，提交后写入 Redis 状态缓存并推送事件。"""
     async def _do_update() -> None:
-        async with async_session_factory() as session:
-            await session.execute(update(Document).where(Document.id == document_id).values(status=status))
-            await session.commit()
+        async with get_worker_engine().begin() as conn:
+            await conn.execute(update(Document).where(Document.id == document_id).values(status=status))
 
-    import asyncio
-    asyncio.get_event_loop().run_until_complete(_do_update())
+    run_async(_do_update())
+    cache_status(document_id, status)
 
 
 # 确保模块被导入时 Celery 应用载入
@@ -0,0 +1,94 @@
+"""
+模块: services.document_service.worker_db
+职责: Worker 进程级数据库运行时：每个进程一个事件循环与一个带连接池的 AsyncEngine，以及批量写入工具。
+输入: settings 中的数据库配置（经 common.db.postgres）。
+输出: init_worker_db, shutdown_worker_db, run_async, get_worker_engine, get_worker_session_maker, copy_records。
+"""
+
+import asyncio
+import itertools
+from typing import Any, Awaitable, Iterable, Sequence, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from common.db.postgres import get_async_engine, get_session_maker
+
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_engine: AsyncEngine | None = None
+_session_maker: sessionmaker[AsyncSession] | None = None
+
+
+def init_worker_db() -> None:
+    """初始化进程级事件循环与引擎。
+    输入: 无。
+    输出: None。
+    作用: 在 worker_process_init 中调用；asyncpg 连接绑定事件循环，故循环与引擎同生命周期复用。
+    """
+    global _loop, _engine, _session_maker
+    if _engine is not None:
+        return
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _engine = get_async_engine()
+    _session_maker = get_session_maker(_engine)
+
+
+def shutdown_worker_db() -> None:
+    """释放连接池并关闭事件循环。
+    输入: 无。
+    输出: None。
+    作用: 在 worker_process_shutdown 中调用，避免连接泄漏。
+    """
+    global _loop, _engine, _session_maker
+    if _engine is not None and _loop is not None:
+        _loop.run_until_complete(_engine.dispose())
+    if _loop is not None:
+        _loop.close()
+    _loop, _engine, _session_maker = None, None, None
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """在进程级事件循环上同步执行协程。
+    输入: 协程对象。
+    输出: 协程返回值。
+    作用: 供同步的 Celery 任务调用异步数据库代码；未经信号初始化（如 solo 池）时懒初始化。
+    """
+    init_worker_db()
+    return _loop.run_until_complete(coro)
+
+
+def get_worker_engine() -> AsyncEngine:
+    """返回进程级引擎（必要时懒初始化）。"""
+    init_worker_db()
+    return _engine
+
+
+def get_worker_session_maker() -> sessionmaker[AsyncSession]:
+    """返回绑定进程级引擎的会话工厂（必要时懒初始化）。"""
+    init_worker_db()
+    return _session_maker
+
+
+async def copy_records(
+    conn: AsyncConnection,
+    table_name: str,
+    columns: Sequence[str],
+    records: Iterable[Sequence[Any]],
+) -> None:
+    """在当前连接与事务内以 COPY 协议批量写入记录。
+    输入: SQLAlchemy 异步连接、表名、列名序列、记录迭代器。
+    输出: None。
+    作用: 替代逐行 ORM add；asyncpg 会对表名与列名加引号，驼峰列名可直接使用。
+          记录按迭代器流式送入 COPY，不整体物化为列表。
+    """
+    iterator = iter(records)
+    first = next(iterator, None)
+    if first is None:
+        return
+    rows = itertools.chain((first,), iterator)
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table_name, records=rows, columns=list(columns))
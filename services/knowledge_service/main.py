@@ -5,11 +5,24 @@
 输出: JSON 响应。
 """
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
+
 from common.config.settings import settings
+from common.graph.neo4j_client import neo4j_lifespan
 from services.knowledge_service.routes import router as knowledge_router
 
-app = FastAPI(title="Knowledge Service", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """应用生命周期：创建进程级共享的 Neo4j 异步驱动，关闭时释放连接池。"""
+    async with neo4j_lifespan():
+        yield
+
+
+app = FastAPI(title="Knowledge Service", version="0.1.0", lifespan=lifespan)
 app.include_router(knowledge_router)
 
 
@@ -5,8 +5,10 @@
 输出: 概念节点与关系（占位）。
 """
 
+import asyncio
+
 from fastapi import APIRouter, Query, Depends, HTTPException
-from common.graph.neo4j_client import run_query
+from common.graph.neo4j_client import run_query_async
 from common.security.deps import jwt_auth
 
 router = APIRouter(prefix="/knowledge", tags=["knowledge"]) 
@@ -14,26 +16,31 @@ router = APIRouter(prefix="/knowledge", tags=["knowledge"])
 
 @router.get("/concepts")
 async def list_related_concepts(concept: str = Query(..., min_length=1), claims: dict = Depends(jwt_auth)) -> dict:
-    """查询与指定概念相关的概念列表（占位）。
+    """查询与指定概念相关的概念列表，按关系权重降序。
     输入: concept 概念名称。
-    输出: 相关概念数组。
+    输出: 相关概念数组与对应权重。
     作用: 支撑前端展示知识邻接。
     """
     cypher = """
-    MATCH (c:Concept {name: $name})-[:RELATED_TO]->(other:Concept)
-    RETURN other.name AS name
+    MATCH (c:Concept {name: $name})-[r:RELATED_TO]->(other:Concept)
+    RETURN other.name AS name, r.weight AS weight
+    ORDER BY coalesce(r.weight, 0) DESC
     LIMIT 50
     """
-    names = [row["name"] for row in run_query(cypher, {"name": concept})]
-    return {"concept": concept, "related": names}
+    rows = await run_query_async(cypher, {"name": concept})
+    return {
+        "concept": concept,
+        "related": [row["name"] for row in rows],
+        "weights": [row["weight"] for row in rows],
+    }
 
 
 @router.get("/documents/{document_id}/graph")
 async def get_document_graph(document_id: str, claims: dict = Depends(jwt_auth)) -> dict:
     """按文档ID返回图谱子图（概念节点与边）。
     输入: document_id。
-    输出: { nodes: [{id,name}], edges: [{source,target}] }。
-    作用: 供前端可视化文档关联概念与关系。
+    输出: { nodes: [{id,name}], edges: [{source,target,weight}] }，边按权重降序。
+    作用: 供前端可视化文档关联概念与关系；节点与边两次查询并发执行。
     """
     # 查询属于该文档的概念节点
     node_query = """
@@ -41,19 +48,24 @@ async def get_document_graph(document_id: str, claims: dict = Depends(jwt_auth))
     RETURN c.name AS name
     LIMIT 200
     """
-    nodes = [row["name"] for row in run_query(node_query, {"doc": document_id})]
-    if not nodes:
-        # 文档不存在或尚未入图
-        raise HTTPException(status_code=404, detail="Graph not found for document")
-
     # 查询这些概念之间的关系边
     edge_query = """
     MATCH (a:Concept)-[:MENTIONED_IN]->(d:Document {id: $doc}),
           (b:Concept)-[:MENTIONED_IN]->(d:Document {id: $doc}),
-          (a)-[:RELATED_TO]->(b)
-    RETURN a.name AS source, b.name AS target
+          (a)-[r:RELATED_TO]->(b)
+    RETURN a.name AS source, b.name AS target, r.weight AS weight
+    ORDER BY coalesce(r.weight, 0) DESC
     LIMIT 1000
     """
-    edges = [{"source": r["source"], "target": r["target"]} for r in run_query(edge_query, {"doc": document_id})]
+    node_rows, edge_rows = await asyncio.gather(
+        run_query_async(node_query, {"doc": document_id}),
+        run_query_async(edge_query, {"doc": document_id}),
+    )
+    nodes = [row["name"] for row in node_rows]
+    if not nodes:
+        # 文档不存在或尚未入图
+        raise HTTPException(status_code=404, detail="Graph not found for document")
+
+    edges = [{"source": r["source"], "target": r["target"], "weight": r["weight"]} for r in edge_rows]
     node_objs = [{"id": n, "name": n} for n in nodes]
     return {"documentId": document_id, "nodes": node_objs, "edges": edges}
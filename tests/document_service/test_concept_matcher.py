@@ -0,0 +1,49 @@
+"""ConceptMatcher / AhoCorasick：重叠命中、最左最长选择与增量词表。"""
+
+from services.document_service.concept_matcher import AhoCorasick, ConceptMatcher
+
+
+def test_iter_matches_reports_overlapping_hits():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(1, 4), (2, 4), (2, 6)]
+
+
+def test_iter_matches_follows_failure_links():
+    automaton = AhoCorasick(["abcd", "bc", "c"])
+    assert sorted(automaton.iter_matches("abce")) == [(1, 3), (2, 3)]
+
+
+def test_duplicate_terms_counted_once():
+    assert AhoCorasick(["图论", "图论", "算法"]).size == 2
+
+
+def test_find_prefers_leftmost_longest_non_overlapping():
+    matcher = ConceptMatcher(["数据", "数据结构", "结构", "算法"])
+    text = "数据结构与算法"
+    assert matcher.find(text) == [(0, 4), (5, 7)]
+
+
+def test_find_resolves_overlap_by_leftmost_start():
+    matcher = ConceptMatcher(["机器学习", "学习算法"])
+    assert matcher.find("机器学习算法") == [(0, 4)]
+
+
+def test_single_character_terms_are_ignored():
+    matcher = ConceptMatcher(["图", "图论"])
+    assert "图" not in matcher
+    assert matcher.find("图论与图") == [(0, 2)]
+
+
+def test_add_terms_uses_delta_then_rebuilds_base():
+    matcher = ConceptMatcher(["图论"], rebuild_threshold=2)
+    assert matcher.add_terms(["拓扑", "图论"]) == 1
+    assert matcher.find("图论拓扑") == [(0, 2), (2, 4)]
+    assert matcher.add_terms(["排序"]) == 1
+    assert len(matcher) == 3
+    assert matcher.find("拓扑排序") == [(0, 2), (2, 4)]
+
+
+def test_extra_automaton_merges_with_dictionary_hits():
+    matcher = ConceptMatcher(["排序"])
+    extra = AhoCorasick(["拓扑排序"])
+    assert matcher.find("拓扑排序", extra) == [(0, 4)]
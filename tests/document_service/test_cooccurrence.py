@@ -0,0 +1,74 @@
+"""StreamingNerRe 共现关系：滑动句窗 PMI 与手工计算结果一致，窗口不跨页。"""
+
+import math
+
+from services.document_service.pipeline import RecordSpool, StreamingNerRe, run_ner_re
+
+
+def _run(pages, window):
+    stage = StreamingNerRe(window=window)
+    for page in pages:
+        stage.feed(page)
+    return stage.result()
+
+
+def test_single_sentence_windows():
+    # 4 个窗口：alpha 出现于 3 个，beta 2 个，共现 2 个 -> PMI = ln(2 * 4 / (3 * 2))
+    entities, relations = _run(["alpha beta。alpha beta。alpha gamma。delta"], window=1)
+    assert entities == ["alpha", "beta"]
+    assert relations == [("alpha", "beta", round(math.log(4 / 3), 6))]
+
+
+def test_sliding_windows_within_a_page():
+    # 句子 alpha | beta | alpha | beta | delta，窗口 2 句：
+    # W0={alpha,beta} W1={beta,alpha} W2={alpha,beta} W3={beta,delta} W4={delta}
+    # alpha 3 个窗口，beta 4 个，共现 3 个 -> PMI = ln(3 * 5 / (3 * 4))
+    entities, relations = _run(["alpha。beta。alpha。beta。delta"], window=2)
+    assert entities == ["alpha", "beta"]
+    assert relations == [("alpha", "beta", round(math.log(5 / 4), 6))]
+
+
+def test_windows_do_not_cross_pages():
+    entities, relations = _run(["alpha", "beta", "alpha", "beta"], window=3)
+    assert entities == ["alpha", "beta"]
+    assert relations == []
+
+
+def test_pairs_below_min_co_occurrence_are_dropped():
+    # 7 个单句窗口，alpha、beta 各 2 个，共现 1 个：PMI = ln(7 / 4) > 0，但 1 < MIN_CO_OCCURRENCE
+    entities, relations = _run(["alpha beta。alpha。beta。gamma。delta。epsilon。zeta"], window=1)
+    assert entities == ["alpha", "beta"]
+    assert relations == []
+
+
+def test_run_ner_re_uses_default_window():
+    # 默认 3 句窗口，前两页 alpha | 单次词 | beta：W0={alpha,beta} W1={beta} W2={beta}；第三页 3 个窗口均无入选概念
+    # 共 9 个窗口，alpha 2 个，beta 6 个，共现 2 个 -> PMI = ln(2 * 9 / (2 * 6))
+    _, relations = run_ner_re(["alpha。gamma。beta", "alpha。delta。beta", "epsilon。zeta。eta"])
+    assert relations == [("alpha", "beta", round(math.log(1.5), 6))]
+
+
+def test_record_spool_iterates_in_page_order():
+    spool = RecordSpool(max_memory=16)
+    spool.put(2, {"fp": "c"})
+    spool.put(0, {"fp": "a"})
+    spool.put(1, {"fp": "b"})
+    assert [record["fp"] for record in spool] == ["a", "b", "c"]
+    assert len(spool) == 3
+    assert spool.get(1) == {"fp": "b"}
+
+
+def test_ten_thousand_concepts():
+    # 10k 个概念各出现于 4 页（每页 1 句），相邻编号两两同句：共现对恰为 (2i, 2i+1)，
+    # 共 20000 个单句窗口，每对 4 个窗口共现 -> PMI = ln(4 * 20000 / (4 * 4))
+    concepts = [f"c{i:05d}" for i in range(10_000)]
+    sentences = [f"{concepts[i]} {concepts[i + 1]}" for i in range(0, len(concepts), 2)]
+    page = "。".join(sentences)
+    stage = StreamingNerRe(window=1)
+    for _ in range(4):
+        stage.feed(page)
+    entities, relations = stage.result(max_entities=10_000, max_relations=20_000)
+    assert len(entities) == 10_000
+    assert len(relations) == 5_000
+    assert {(a, b) for a, b, _ in relations} == {(concepts[i], concepts[i + 1]) for i in range(0, len(concepts), 2)}
+    assert {weight for _, _, weight in relations} == {round(math.log(5_000), 6)}
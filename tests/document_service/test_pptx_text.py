@@ -0,0 +1,73 @@
+"""PptxTextReader：幻灯片顺序、备注与包结构异常。"""
+
+import io
+import zipfile
+
+import pytest
+
+from services.document_service.pptx_text import PptxFormatError, PptxTextReader
+
+
+_NS = (
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+_RELS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+_NOTES_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+
+def _slide(*paragraphs: str) -> str:
+    body = "".join(f"<a:p><a:r><a:t>{text}</a:t></a:r></a:p>" for text in paragraphs)
+    return f"<p:sld {_NS}><p:cSld><p:spTree><p:sp><p:txBody>{body}</p:txBody></p:sp></p:spTree></p:cSld></p:sld>"
+
+
+def _package(slides, notes=None, order=None) -> io.BytesIO:
+    """按 order（幻灯片下标）写入 sldIdLst，各幻灯片可附带备注。"""
+    order = order if order is not None else list(range(len(slides)))
+    notes = notes or {}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as package:
+        ids = "".join(f'<p:sldId id="{256 + i}" r:id="rId{i + 1}"/>' for i in order)
+        package.writestr("ppt/presentation.xml", f"<p:presentation {_NS}><p:sldIdLst>{ids}</p:sldIdLst></p:presentation>")
+        rels = "".join(
+            f'<Relationship Id="rId{i + 1}" Type="slide" Target="slides/slide{i + 1}.xml"/>' for i in range(len(slides))
+        )
+        package.writestr("ppt/_rels/presentation.xml.rels", f"<Relationships {_RELS}>{rels}</Relationships>")
+        for i, xml in enumerate(slides):
+            if xml is not None:
+                package.writestr(f"ppt/slides/slide{i + 1}.xml", xml)
+            if i in notes:
+                package.writestr(
+                    f"ppt/slides/_rels/slide{i + 1}.xml.rels",
+                    f'<Relationships {_RELS}><Relationship Id="rId1" Type="{_NOTES_TYPE}" '
+                    f'Target="../notesSlides/notesSlide{i + 1}.xml"/></Relationships>',
+                )
+                package.writestr(f"ppt/notesSlides/notesSlide{i + 1}.xml", notes[i])
+    buffer.seek(0)
+    return buffer
+
+
+def test_reads_slides_in_presentation_order_with_notes():
+    package = _package([_slide("第一页"), _slide("第二页", "要点")], notes={0: _slide("讲稿")}, order=[1, 0])
+    with PptxTextReader(package) as reader:
+        assert len(reader) == 2
+        assert list(reader.iter_texts()) == ["第二页\n要点", "第一页\n讲稿"]
+        assert list(reader.iter_texts(1)) == ["第一页\n讲稿"]
+
+
+def test_rejects_non_zip():
+    with pytest.raises(PptxFormatError):
+        PptxTextReader(io.BytesIO(b"not a zip"))
+
+
+def test_wraps_errors_raised_during_iteration():
+    package = _package([_slide("完好"), "<p:sld " + _NS + "><a:p><a:t>截断", None])
+    reader = PptxTextReader(package)
+    texts = reader.iter_texts()
+    assert next(texts) == "完好"
+    with pytest.raises(PptxFormatError, match="slide2.xml"):
+        next(texts)
+    with pytest.raises(PptxFormatError, match="slide3.xml"):
+        next(reader.iter_texts(2))
+    reader.close()
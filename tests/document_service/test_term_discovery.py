@@ -0,0 +1,70 @@
+"""SuffixAutomaton / TermDiscoverer：出现次数、候选打分与字符上限。"""
+
+import math
+
+from services.document_service.concept_matcher import ConceptMatcher
+from services.document_service.pipeline import StreamingNerRe
+from services.document_service.term_discovery import SuffixAutomaton, TermDiscoverer
+
+
+def _filler(count: int, start: int = 0x5000) -> str:
+    """互不重复的中文字符，只增加总字符数，不构成候选。"""
+    return "".join(chr(start + i) for i in range(count))
+
+
+def test_suffix_automaton_counts_occurrences():
+    sam = SuffixAutomaton()
+    for ch in "abab":
+        sam.extend(ch)
+    sam.finalize_counts()
+    assert sam.occurrences("ab") == 2
+    assert sam.occurrences("b") == 2
+    assert sam.occurrences("ba") == 1
+    assert sam.occurrences("abc") == 0
+
+
+def test_discovers_term_with_varied_neighbours():
+    discoverer = TermDiscoverer(max_chars=10_000)
+    discoverer.feed("，".join(f"{left}拓扑排序{right}" for left, right in zip("甲丙戊庚壬", "乙丁己辛癸")))
+    discoverer.feed(_filler(200))
+    # 左右邻各 5 种、各出现 1 次：熵均为 ln5；子串“拓扑排”“扑排序”一侧邻字固定，熵为 0 被过滤
+    assert discoverer.top_terms(10) == [("拓扑排序", 5 * math.log(5))]
+
+
+def test_low_cohesion_candidates_are_rejected():
+    discoverer = TermDiscoverer(max_chars=10_000)
+    # 无填充文本时总字符数仅 30，最小切分点 PMI = ln(5 * 30 / (5 * 5)) = ln6 < TERM_MIN_PMI
+    discoverer.feed("，".join(f"{left}拓扑排序{right}" for left, right in zip("甲丙戊庚壬", "乙丁己辛癸")))
+    assert discoverer.top_terms(10) == []
+
+
+def test_saturates_at_max_chars():
+    discoverer = TermDiscoverer(max_chars=5)
+    discoverer.feed("拓扑排序")
+    assert not discoverer.saturated
+    discoverer.feed("图论算法")
+    assert discoverer.saturated
+
+
+def test_pages_past_the_cap_keep_regex_tokens():
+    stage = StreamingNerRe(discoverer=TermDiscoverer(max_chars=4))
+    stage.feed("拓扑排序")
+    stage.feed("数据结构")  # 超出上限的一页使发现器饱和，本页仍按参与发现处理
+    stage.feed("图论算法。图论算法")
+    entities, _ = stage.result()
+    first, saturating, after = stage.page_records()
+    assert first["d"] and first["s"] == [[]]
+    assert saturating["d"]
+    assert not after["d"] and after["s"] == [["图论算法"], ["图论算法"]]
+    assert entities == ["图论算法"]
+
+
+def test_entities_rank_known_then_discovered_then_tokens():
+    stage = StreamingNerRe(matcher=ConceptMatcher(["算法"]), discoverer=TermDiscoverer(max_chars=10_000))
+    stage.feed("，".join(f"{left}拓扑排序{right}" for left, right in zip("甲丙戊庚壬", "乙丁己辛癸")))
+    stage.feed(_filler(200))
+    stage.feed("算法。" + " ".join(["alpha"] * 9))
+    # alpha 频次最高，但截断时词典命中优先、新词（按发现得分）次之
+    entities, _ = stage.result(max_entities=2)
+    assert entities == ["算法", "拓扑排序"]
+    assert stage.term_scores == {"拓扑排序": 5 * math.log(5)}